@@ -0,0 +1,95 @@
+"""气泡分割基准
+
+生成带网点背景、分镜边框和对话气泡（椭圆，内有文字笔画）的合成页面，
+统计 segment_bubbles 每百万像素的耗时，以及检出的气泡数和与真实气泡的平均 IoU。
+只使用 CPU（OpenCV 的 CPU 实现），可用 --threads 限制 OpenCV 的线程数。
+
+用法（在仓库根目录）：
+    python benchmarks/bubble_segmentation_benchmark.py [--megapixels 0.5,1,2,4,8] [--width 1000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.bubble_segmentation import segment_bubbles  # noqa: E402
+
+
+def make_page(width, height, rng):
+    """返回合成页面和每个气泡的真实掩码"""
+    page = rng.normal(150, 25, (height, width)).clip(0, 255).astype(np.uint8)
+    page = cv2.cvtColor(page, cv2.COLOR_GRAY2BGR)
+    # 分镜边框：按纵向每 600 像素左右一格
+    for top in range(20, height - 100, 600):
+        cv2.rectangle(page, (20, top), (width - 20, min(top + 560, height - 20)), (0, 0, 0), 4)
+
+    truths = []
+    occupied = np.zeros((height, width), dtype=np.uint8)
+    for _ in range(max(1, width * height // 250000)):
+        axes = (int(rng.integers(60, 180)), int(rng.integers(40, 120)))
+        center = (int(rng.integers(axes[0] + 30, width - axes[0] - 30)),
+                  int(rng.integers(axes[1] + 30, height - axes[1] - 30)))
+        truth = np.zeros((height, width), dtype=np.uint8)
+        cv2.ellipse(truth, center, axes, 0, 0, 360, 255, -1)
+        if (truth & occupied).any():
+            continue
+        occupied |= cv2.dilate(truth, np.ones((15, 15), np.uint8))
+        cv2.ellipse(page, center, axes, 0, 0, 360, (255, 255, 255), -1)
+        cv2.ellipse(page, center, axes, 0, 0, 360, (0, 0, 0), 3)
+        for line in range(-1, 2):
+            origin = (center[0] - axes[0] // 2, center[1] + line * axes[1] // 3)
+            cv2.putText(page, 'TEXT', origin, cv2.FONT_HERSHEY_SIMPLEX, axes[1] / 80, (0, 0, 0), 2)
+        truths.append(truth > 0)
+    return page, truths
+
+
+def mean_iou(bubbles, truths):
+    """每个真实气泡与其中心处检出气泡的 IoU 的平均值（未检出计为 0）"""
+    scores = []
+    for truth in truths:
+        ys, xs = np.nonzero(truth)
+        bubble_id = bubbles.lookup([[xs.mean(), ys.mean()]])[0]
+        if not bubble_id:
+            scores.append(0.0)
+            continue
+        detected = bubbles.labels == bubble_id
+        scores.append((detected & truth).sum() / (detected | truth).sum())
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--megapixels', default='0.5,1,2,4,8')
+    parser.add_argument('--width', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=None, help='OpenCV 线程数，默认不限制')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+    rng = np.random.default_rng(args.seed)
+    print(f"{'页面尺寸':>12} {'百万像素':>8} {'耗时':>10} {'每百万像素':>10} {'气泡':>9} {'平均 IoU':>8}")
+    for megapixels in (float(value) for value in args.megapixels.split(',')):
+        height = int(megapixels * 1_000_000 / args.width)
+        page, truths = make_page(args.width, height, rng)
+
+        segment_bubbles(page)  # 预热
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            bubbles = segment_bubbles(page)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        pixels = args.width * height / 1_000_000
+
+        print(f"{args.width:>5}×{height:<6} {pixels:>8.2f} {elapsed * 1000:>7.1f} ms "
+              f"{elapsed * 1000 / pixels:>7.1f} ms {bubbles.count:>4}/{len(truths):<4} "
+              f"{mean_iou(bubbles, truths):>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
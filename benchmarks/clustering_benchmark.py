@@ -0,0 +1,97 @@
+"""OCR 文本块聚类基准
+
+在模拟的长条漫画上生成 10 ~ 5000 个文本行（每个气泡 1~6 行，气泡沿纵向排列），比较：
+- reference: 原实现，OPTICS + Python 加权 L1 度量函数
+- optics: OPTICS + 缩放坐标后的 cityblock 度量（默认引擎，分组与 reference 相同）
+- grid: 网格分桶并查集（需显式开启），按距离阈值连通，只是 OPTICS 分组的近似
+
+输出各实现的耗时、默认引擎 optics 相对 reference 的加速比及分组是否一致、optics 与 grid
+与真实气泡划分的调整兰德指数（ARI，1 为完全一致），以及 grid 与 optics 分组的 ARI。
+reference 在大规模时非常慢，默认只跑到 --max-reference 行，超过后不计算加速比。
+
+用法（在仓库根目录）：
+    python benchmarks/clustering_benchmark.py [--sizes 10,100,500,1000,5000] [--max-reference 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import OPTICS
+from sklearn.metrics import adjusted_rand_score
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.clustering import cluster_centers  # noqa: E402
+
+# 横排文本的轴权重（与 merge_ocr_results 相同）
+X_WEIGHT = 0.75
+Y_WEIGHT = 1.5
+LINE_HEIGHT = 32
+
+
+def make_strip(size, rng):
+    """生成 size 行文本的中心点及其所属气泡"""
+    centers = []
+    bubbles = []
+    y = 0.0
+    bubble = 0
+    while len(centers) < size:
+        lines = int(rng.integers(1, 7))
+        x = rng.uniform(100, 700)
+        y += rng.uniform(60, 250)
+        for line in range(lines):
+            centers.append((x + rng.normal(0, 8), y + line * LINE_HEIGHT + rng.normal(0, 3)))
+            bubbles.append(bubble)
+        y += lines * LINE_HEIGHT
+        bubble += 1
+    return np.array(centers[:size]), np.array(bubbles[:size])
+
+
+def reference_labels(centers):
+    def custom_metric(a, b):
+        return abs(a[0] - b[0]) * X_WEIGHT + abs(a[1] - b[1]) * Y_WEIGHT
+
+    if len(centers) < 2:
+        return np.zeros(len(centers), dtype=np.int64)
+    return OPTICS(min_samples=2, metric=custom_metric, max_eps=100, xi=0.05).fit(centers).labels_
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,50,100,500,1000,2000,5000')
+    parser.add_argument('--max-reference', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'行数':>6} {'reference':>11} {'optics':>9} {'grid':>9} {'加速比':>7} {'分组一致':>8} "
+          f"{'ARI optics':>10} {'ARI grid':>8} {'grid/optics':>11}")
+    for size in (int(value) for value in args.sizes.split(',')):
+        centers, bubbles = make_strip(size, rng)
+
+        reference, reference_time = None, None
+        if size <= args.max_reference:
+            reference, reference_time = timed(lambda: reference_labels(centers))
+        optics, optics_time = timed(lambda: cluster_centers(centers, X_WEIGHT, Y_WEIGHT, engine='optics'))
+        grid, grid_time = timed(lambda: cluster_centers(centers, X_WEIGHT, Y_WEIGHT, engine='grid'))
+
+        # 加速比只针对默认引擎 optics；grid 的分组与 OPTICS 不同，不与 reference 比较速度
+        speedup = f'{reference_time / optics_time:.1f}x' if reference_time is not None else '-'
+        print(f"{size:>6} "
+              f"{(f'{reference_time * 1000:.1f} ms') if reference_time is not None else '-':>11} "
+              f"{optics_time * 1000:>6.1f} ms {grid_time * 1000:>6.1f} ms {speedup:>7} "
+              f"{('是' if np.array_equal(reference, optics) else '否') if reference is not None else '-':>8} "
+              f"{adjusted_rand_score(bubbles, optics):>10.3f} {adjusted_rand_score(bubbles, grid):>8.3f} "
+              f"{adjusted_rand_score(optics, grid):>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""近似翻译记忆微基准
+
+向 FuzzyMemory 写入大量随机台词，再用带 OCR 噪声（替换/插入/删除个别字符、多余标点）
+的副本查询，统计单次查询耗时和复用/示例/未命中的比例。
+
+用法（在仓库根目录）：
+    python benchmarks/fuzzy_memory_benchmark.py [--entries 300000] [--queries 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.fuzzy_memory import FuzzyMemory  # noqa: E402
+
+KANA = [chr(code) for code in range(0x3041, 0x3094)] + [chr(code) for code in range(0x30A1, 0x30F6)]
+NOISE = ['・', '.', '、', '…', ' ']
+
+
+def make_line(rng):
+    return ''.join(rng.choice(KANA) for _ in range(rng.randint(8, 30)))
+
+
+def add_noise(line, rng):
+    chars = list(line)
+    for _ in range(rng.randint(1, 2)):
+        op = rng.random()
+        pos = rng.randrange(len(chars))
+        if op < 0.4:
+            chars[pos] = rng.choice(KANA)  # 认错字
+        elif op < 0.7:
+            chars.insert(pos, rng.choice(NOISE))  # 多余的标点
+        elif len(chars) > 8:
+            del chars[pos]  # 漏字
+    return ''.join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    memory = FuzzyMemory(max_entries=args.entries)
+    lines = [make_line(rng) for _ in range(args.entries)]
+
+    start = time.perf_counter()
+    for i, line in enumerate(lines):
+        memory.add(line, f"T{i}")
+    elapsed = time.perf_counter() - start
+    print(f"索引 {len(memory)} 条: {elapsed:.1f} s ({elapsed / len(lines) * 1e6:.1f} us/条)")
+
+    for label, queries in (
+        ('带噪声的已知台词', [add_noise(rng.choice(lines), rng) for _ in range(args.queries)]),
+        ('全新台词', [make_line(rng) for _ in range(args.queries)]),
+    ):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            memory.lookup(query)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        mean = sum(latencies) / len(latencies)
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(f"{label}: 平均 {mean * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us")
+
+    stats = memory.stats()
+    print(f"复用 {stats['hits']}, 示例 {stats['hints']}, 未命中 {stats['misses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""术语表匹配微基准
+
+对比 Aho-Corasick 自动机与逐条 `term in text` 扫描在不同规模术语表上的单文本框匹配耗时。
+
+用法（在仓库根目录）：
+    python benchmarks/glossary_benchmark.py [--terms 10000] [--bubbles 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.glossary import Glossary  # noqa: E402
+
+KATAKANA = [chr(code) for code in range(0x30A1, 0x30F6)]
+HIRAGANA = [chr(code) for code in range(0x3041, 0x3094)]
+
+
+def make_terms(count, rng):
+    terms = {}
+    while len(terms) < count:
+        term = ''.join(rng.choice(KATAKANA) for _ in range(rng.randint(2, 8)))
+        terms[term] = f"T{len(terms)}"
+    return terms
+
+
+def make_bubbles(count, terms, rng):
+    term_list = list(terms)
+    bubbles = []
+    for _ in range(count):
+        parts = [''.join(rng.choice(HIRAGANA) for _ in range(rng.randint(5, 20)))]
+        for _ in range(rng.randint(0, 2)):
+            parts.append(rng.choice(term_list))
+            parts.append(''.join(rng.choice(HIRAGANA) for _ in range(rng.randint(3, 10))))
+        bubbles.append(''.join(parts))
+    return bubbles
+
+
+def naive_match(terms, text):
+    return {term: target for term, target in terms.items() if term in text}
+
+
+def bench(label, func, bubbles):
+    start = time.perf_counter()
+    matched = 0
+    for text in bubbles:
+        matched += len(func(text))
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<14} {elapsed / len(bubbles) * 1e6:9.1f} us/bubble   命中 {matched}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--terms', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--bubbles', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for count in args.terms:
+        terms = make_terms(count, rng)
+        bubbles = make_bubbles(args.bubbles, terms, rng)
+
+        start = time.perf_counter()
+        glossary = Glossary(terms)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{count} 条术语（构建自动机 {build_ms:.1f} ms）")
+        bench('aho-corasick', lambda text: glossary.match(text, max_terms=count), bubbles)
+        bench('naive scan', lambda text: naive_match(terms, text), bubbles)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,8 @@ function getMimeType(url) {
 }
 
 // 发送图片到服务器的函数
-function sendImageToServer(base64Data, serverUrl = 'http://127.0.0.1:11451/translate') {
+// pageUrl 用于让服务器按页面来源区分翻译上下文会话
+function sendImageToServer(base64Data, serverUrl = 'http://127.0.0.1:11451/translate', pageUrl = '') {
     console.log('Sending image data to:', serverUrl);
     
     // 检查 base64Data 格式
@@ -33,7 +34,8 @@ function sendImageToServer(base64Data, serverUrl = 'http://127.0.0.1:11451/trans
         method: 'POST',
         headers: headers,
         body: JSON.stringify({
-            image: base64Data
+            image: base64Data,
+            page_url: pageUrl
         })
     })
     .then(async response => {
@@ -113,7 +115,7 @@ chrome.runtime.onInstalled.addListener(() => {
 chrome.contextMenus.onClicked.addListener((info, tab) => {
     if (info.menuItemId === "translateImage") {
         console.log('Right-click menu clicked, URL:', info.srcUrl);
-        processAndSendImage(info.srcUrl);
+        processAndSendImage(info.srcUrl, undefined, info.pageUrl || (tab && tab.url));
     }
 });
 
@@ -121,7 +123,7 @@ chrome.contextMenus.onClicked.addListener((info, tab) => {
 chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
     if (request.action === 'sendToServer') {
         // 使用已有的 sendImageToServer 函数处理
-        sendImageToServer(request.base64Data, request.serverUrl)
+        sendImageToServer(request.base64Data, request.serverUrl, request.pageUrl)
             .then(() => {
                 sendResponse({ success: true });
             })
@@ -134,7 +136,7 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
 });
 
 // 处理单个图片
-async function processAndSendImage(url, serverUrl) {
+async function processAndSendImage(url, serverUrl, pageUrl) {
     try {
         console.log('Processing image:', url);
         const response = await fetch(url);
@@ -145,7 +147,7 @@ async function processAndSendImage(url, serverUrl) {
             reader.onerror = reject;
             reader.readAsDataURL(blob);
         });
-        await sendImageToServer(base64Data, serverUrl);
+        await sendImageToServer(base64Data, serverUrl, pageUrl);
         
         chrome.notifications.create({
             type: 'basic',
@@ -1,4 +1,5 @@
 let foundImages = [];
+let pageUrl = '';  // 当前标签页地址，用于区分上下文会话
 
 // 加载保存的设置
 document.addEventListener('DOMContentLoaded', () => {
@@ -16,6 +17,7 @@ document.addEventListener('DOMContentLoaded', () => {
             statusElement.textContent = "无法访问当前页面";
             return;
         }
+        pageUrl = tabs[0].url;
 
         chrome.scripting.executeScript({
             target: { tabId: tabs[0].id },
@@ -164,7 +166,8 @@ async function sendImages() {
                     chrome.runtime.sendMessage({
                         action: 'sendToServer',
                         base64Data: base64Data,
-                        serverUrl: serverUrl
+                        serverUrl: serverUrl,
+                        pageUrl: pageUrl
                     }, response => {
                         if (chrome.runtime.lastError) {
                             reject(chrome.runtime.lastError);
@@ -1,5 +1,6 @@
 import os
 import json
+from ..core.http_client import HttpClient
 
 class SettingsManager:
     def __init__(self):
@@ -17,7 +18,25 @@ class SettingsManager:
             'umiocr_api': 'http://localhost:1224/api/ocr',
             'source_lang': '日文',
             'target_lang': '中文',
-            'interface_language': 'zh_CN'
+            'extra_target_langs': [],  # 额外的目标语言（如 ['English']），与 target_lang 共用一次 OCR，每个文本框一次请求得到全部译文
+            'interface_language': 'zh_CN',
+            'translation_memory': True,  # 启用持久化翻译记忆
+            'max_retries': 3,  # OCR 请求失败时的重试次数
+            # 每页处理时限（秒），按输入来源区分，0 为不限时；超时后未翻译的文本框显示原文
+            'page_deadlines': {'clipboard': 60, 'extension': 90, 'crawler': 300, 'streamlit': 600, 'default': 180},
+            'translation_memory_max_entries': 50000,
+            'glossary': '',  # 默认术语表名（~/.config/manga_translator/glossaries 下的文件名）
+            'session_glossaries': {},  # 会话 ID 前缀 -> 术语表名，用于按系列选择术语表
+            'glossary_max_terms': 20,  # 每个文本框最多注入的术语数
+            'clustering_engine': 'optics',  # 文本块合并的聚类方式：optics（默认，分组与原实现相同）或 grid（网格并查集，更快但分组可能不同）
+            'cluster_eps': 80,  # grid 聚类的连接距离（按文本方向加权后的像素距离）
+            'bubble_segmentation': True,  # 按分割出的对话气泡合并文本行，渲染时只擦除气泡内部
+            'panel_detection': True,  # 检测分镜，按阅读顺序排列文本框，不同分镜的文本框可并发翻译
+            'reading_direction': 'auto',  # 分镜阅读方向：auto（日语从右到左，其他从左到右）、rtl 或 ltr
+            'fast_path': True,  # 标点、数字、常见拟声词在本地处理，不调用 LLM
+            'fuzzy_memory': True,  # 近似翻译记忆，容忍 OCR 噪声
+            'fuzzy_reuse_threshold': 0.9,  # 相似度达到该值时直接复用历史译文
+            'fuzzy_hint_threshold': 0.6  # 相似度在两个阈值之间时作为示例提供给模型
         }
         
         # 默认preset
@@ -27,14 +46,56 @@ class SettingsManager:
                 'type': 'Ollama',
                 'api_url': 'http://localhost:11434/api/chat',
                 'model': 'qwen2.5:14b',
-                'bearer_token': ''
+                'bearer_token': '',
+                'batch_mode': False,  # 整页批量翻译
+                'batch_token_budget': 2048,  # 单次批量请求的 token 预算
+                'cross_page_batching': False,  # 跨页面动态批处理：多页的文本框攒批后一起请求
+                'batch_max_items': 16,  # 跨页面批次的最大文本框数
+                'batch_max_wait_ms': 50,  # 有请求在途时，批次最多等待的毫秒数
+                'max_pages_in_flight': 1,  # 同时处理的页面数
+                'max_concurrency': 1,  # 同时在途的翻译请求数，与 OLLAMA_NUM_PARALLEL 对应
+                'stream': False,  # 流式输出，边生成边显示译文
+                'hedging': False,  # 对冲请求：超过观测到的 p95 仍未返回时再发一份
+                'hedge_preset': '',  # 对冲请求使用的备用预设，留空则使用当前预设
+                'rpm_limit': 0,  # 每分钟请求数上限，0 为不限制
+                'tpm_limit': 0,  # 每分钟 token 数上限，0 为不限制
+                'adaptive_concurrency': False,  # AIMD 并发控制：429/5xx 时减半，成功时逐步恢复到 max_concurrency
+                'max_retries': 3,  # 连接失败、超时、429/5xx 时的重试次数（指数退避 + 抖动）
+                'warm_up': True,  # 启动或切换预设时预热 Ollama 模型
+                'keep_alive_idle': 300,  # 队列空闲后 Ollama 模型继续驻留显存的秒数
+                'output_mode': 'full',  # full: 完整输出结构; lean: 只输出译文，减少解码 token
+                'cascade_models': [],  # 模型级联：按成本从低到高排列的模型，留空则只用 model
+                'cascade_length_threshold': 40,  # 超过该长度的文本框跳过第一级模型
+                'context_token_budget': 512,  # 参考上下文的 token 预算
+                'context_top_k': 8  # 每次最多注入的相关历史翻译条数
             },
             'openai-siliconflow': {
                 'name': 'openai-siliconflow',
                 'type': 'Remote API',
                 'api_url': 'https://api.siliconflow.cn/v1/chat/completions',
                 'model': 'Qwen/Qwen2.5-32B-Instruct',
-                'bearer_token': ''
+                'bearer_token': '',
+                'batch_mode': False,
+                'batch_token_budget': 2048,
+                'cross_page_batching': False,
+                'batch_max_items': 16,
+                'batch_max_wait_ms': 50,
+                'max_pages_in_flight': 1,
+                'max_concurrency': 1,
+                'stream': False,
+                'hedging': False,
+                'hedge_preset': '',
+                'rpm_limit': 0,
+                'tpm_limit': 0,
+                'adaptive_concurrency': True,
+                'max_retries': 3,
+                'warm_up': True,
+                'keep_alive_idle': 300,
+                'output_mode': 'full',
+                'cascade_models': [],
+                'cascade_length_threshold': 40,
+                'context_token_budget': 512,
+                'context_top_k': 8
             }
         }
         
@@ -69,12 +130,15 @@ class SettingsManager:
         name = preset_data['name']
         self.presets[name] = preset_data
         self.save_presets()
+        # 预设变化后重建对应端点的连接池
+        HttpClient.reset(preset_data.get('api_url') or None)
 
     def update_preset(self, name, preset_data):
         """更新现有的API预设"""
         if name in self.presets:
             self.presets[name].update(preset_data)
             self.save_presets()
+            HttpClient.reset(self.presets[name].get('api_url') or None)
 
     def delete_preset(self, name):
         """删除API预设"""
@@ -104,10 +168,15 @@ class SettingsManager:
                     self.settings.update(loaded)
         except Exception as e:
             print(f"加载设置失败: {str(e)}")
+        self._saved_preset = self.settings.get('current_preset', 'default')
         return self.settings
 
     def save_settings(self, settings):
         """保存设置"""
+        # 切换预设时重建连接池
+        if settings.get('current_preset', 'default') != self._saved_preset:
+            HttpClient.reset()
+            self._saved_preset = settings.get('current_preset', 'default')
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,180 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class DynamicBatcher:
+    """跨页面的动态微批处理器（类似推理服务器的 dynamic batching）
+
+    多个页面的翻译线程把待翻译的文本框提交进来，按分组键（语言对、上下文会话等）
+    攒成批次，由 process_func(items) 一次处理，结果通过各条目的 Future 返回给提交方。
+
+    批次在以下任一条件满足且有空闲并发槽位时发出：
+    - 条目数达到 max_items，或累计开销达到 max_cost
+    - 最早的条目已等待 max_wait_ms
+    - 当前没有批次在途：队列较浅时立即发出，优先延迟；
+      有批次在途时继续攒批，队列越深批次越满，优先吞吐
+    """
+
+    DEFAULT_MAX_ITEMS = 16
+    DEFAULT_MAX_WAIT_MS = 50
+    DEFAULT_MAX_INFLIGHT = 1
+
+    def __init__(self, process_func, max_items=DEFAULT_MAX_ITEMS, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 max_inflight=DEFAULT_MAX_INFLIGHT, max_cost=None):
+        self.process_func = process_func
+        self.max_items = max_items
+        self.max_wait_ms = max_wait_ms
+        self.max_inflight = max_inflight
+        self.max_cost = max_cost
+
+        self._groups = {}  # 分组键 -> [(提交时间, 条目, 开销, Future)]
+        self._inflight = 0
+        self._condition = threading.Condition()
+        self._executor = None
+        self._dispatcher = None
+        self._stopped = False
+
+        self.batches = 0
+        self.items = 0
+
+    def configure(self, max_items=None, max_wait_ms=None, max_inflight=None, max_cost=None):
+        """更新批处理参数（例如切换预设后）"""
+        with self._condition:
+            if max_items is not None:
+                self.max_items = max(1, int(max_items))
+            if max_wait_ms is not None:
+                self.max_wait_ms = max(0.0, float(max_wait_ms))
+            if max_inflight is not None:
+                self.max_inflight = max(1, int(max_inflight))
+            if max_cost is not None:
+                self.max_cost = max_cost
+            self._condition.notify_all()
+
+    def submit(self, key, item, cost=1):
+        """提交一个条目，返回 Future，其结果为 process_func 为该条目给出的返回值"""
+        return self.submit_many(key, [item], [cost])[0]
+
+    def submit_many(self, key, items, costs=None):
+        """一次提交多个条目（如一整页的文本框），保持它们在批次中的相对顺序"""
+        costs = costs or [1] * len(items)
+        futures = [Future() for _ in items]
+        now = time.monotonic()
+        with self._condition:
+            self._ensure_started()
+            group = self._groups.setdefault(key, [])
+            for item, cost, future in zip(items, costs, futures):
+                group.append((now, item, cost, future))
+            self._condition.notify_all()
+        return futures
+
+    def pending(self):
+        """排队中（尚未发出）的条目数"""
+        with self._condition:
+            return sum(len(group) for group in self._groups.values())
+
+    def stats(self):
+        with self._condition:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+                'pending': sum(len(group) for group in self._groups.values()),
+                'inflight': self._inflight
+            }
+
+    def cancel_all(self):
+        """取消所有排队中的条目"""
+        with self._condition:
+            for group in self._groups.values():
+                for _, _, _, future in group:
+                    future.cancel()
+            self._groups.clear()
+
+    def shutdown(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _ensure_started(self):
+        # 调用方需持有 self._condition
+        if self._dispatcher is None:
+            self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='batch')
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='batch-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        with self._condition:
+            while not self._stopped:
+                timeout = None
+                while self._inflight < self.max_inflight:
+                    key, wait = self._next_ready(time.monotonic())
+                    if key is None:
+                        timeout = wait
+                        break
+                    batch = self._take_batch(key)
+                    if not batch:
+                        continue
+                    self._inflight += 1
+                    self.batches += 1
+                    self.items += len(batch)
+                    self._executor.submit(self._run_batch, batch)
+                self._condition.wait(timeout)
+
+    def _next_ready(self, now):
+        """返回可以发出的分组键；都未就绪时返回 (None, 距最近一个分组超时的秒数)"""
+        wait = None
+        max_wait = self.max_wait_ms / 1000
+        for key, group in self._groups.items():
+            if not group:
+                continue
+            if self._inflight == 0 or self._is_full(group):
+                return key, None
+            remaining = group[0][0] + max_wait - now
+            if remaining <= 0:
+                return key, None
+            wait = remaining if wait is None else min(wait, remaining)
+        return None, wait
+
+    def _is_full(self, group):
+        if len(group) >= self.max_items:
+            return True
+        if self.max_cost is not None:
+            return sum(cost for _, _, cost, _ in group) >= self.max_cost
+        return False
+
+    def _take_batch(self, key):
+        group = self._groups[key]
+        batch = []
+        used = 0
+        while group and len(batch) < self.max_items:
+            _, item, cost, future = group[0]
+            if batch and self.max_cost is not None and used + cost > self.max_cost:
+                break
+            group.pop(0)
+            if future.set_running_or_notify_cancel():
+                batch.append((item, future))
+                used += cost
+        if not group:
+            del self._groups[key]
+        return batch
+
+    def _run_batch(self, batch):
+        try:
+            results = list(self.process_func([item for item, _ in batch]))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            # process_func 漏掉的条目结果为 None，由提交方自行补翻
+            for _, future in batch[len(results):]:
+                future.set_result(None)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._condition:
+                self._inflight -= 1
+                self._condition.notify_all()
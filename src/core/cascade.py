@@ -0,0 +1,137 @@
+import json
+import threading
+import unicodedata
+
+from .json_stream import StreamingFieldParser
+
+
+def _count_scripts(text):
+    """统计文本中各类文字的字符数"""
+    counts = {'han': 0, 'kana': 0, 'hangul': 0, 'latin': 0}
+    for ch in text:
+        code = ord(ch)
+        if 0x3040 <= code <= 0x30FF or 0x31F0 <= code <= 0x31FF or 0xFF66 <= code <= 0xFF9D:
+            counts['kana'] += 1
+        elif 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+            counts['hangul'] += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF or 0xF900 <= code <= 0xFAFF:
+            counts['han'] += 1
+        elif ch.isalpha() and code < 0x0250:
+            counts['latin'] += 1
+    return counts
+
+
+def is_wrong_language(text, target_lang):
+    """根据文字类型粗略判断译文是否不是目标语言；字母过少（如纯标点、拟声词）时不做判断"""
+    counts = _count_scripts(text)
+    letters = sum(counts.values())
+    if letters < 2:
+        return False
+    target = (target_lang or '').lower()
+    if 'chinese' in target or '中文' in target:
+        # 中文译文里残留较多假名或谚文，说明没有翻译完整
+        return counts['kana'] + counts['hangul'] > letters * 0.2
+    if 'japanese' in target or '日文' in target:
+        return counts['hangul'] > 0 or counts['kana'] + counts['han'] == 0
+    if 'korean' in target or '韩文' in target:
+        return counts['hangul'] == 0 or counts['kana'] > 0
+    if 'english' in target or '英文' in target:
+        return counts['latin'] < letters * 0.5
+    return False
+
+
+class ModelCascade:
+    """模型级联：先用最便宜的模型翻译，结果不合格时逐级升级
+
+    预设的 cascade_models 为按成本从低到高排列的模型列表。以下情况升级到下一级模型：
+    - 输出无法解析出完整的 translation 字段
+    - 译文不是目标语言，或与原文相同
+    长度超过 cascade_length_threshold 的文本框直接从第二级开始。
+    """
+
+    DEFAULT_LENGTH_THRESHOLD = 40
+
+    _stats = {'tiers': {}, 'escalations': {}}  # 模型 -> 最终采用次数；升级原因 -> 次数
+    _stats_lock = threading.Lock()
+
+    @staticmethod
+    def models(preset):
+        """预设中的级联模型列表，未启用级联时返回空列表
+
+        负载均衡池的成员各自使用自己的模型，池预设不支持级联，返回空列表。
+        """
+        if preset.get('type') == 'Pool':
+            return []
+        models = preset.get('cascade_models') or []
+        return [model for model in models if model]
+
+    @classmethod
+    def start_tier(cls, text, preset):
+        """文本框起始的级联层级"""
+        try:
+            threshold = int(preset.get('cascade_length_threshold', cls.DEFAULT_LENGTH_THRESHOLD))
+        except (TypeError, ValueError):
+            threshold = cls.DEFAULT_LENGTH_THRESHOLD
+        if len(''.join((text or '').split())) > threshold and len(cls.models(preset)) > 1:
+            return 1
+        return 0
+
+    @staticmethod
+    def escalation_reason(response, translated, source, target_lang):
+        """判断是否需要升级，返回原因（'parse' / 'language' / 'unchanged'），合格时返回 None"""
+        text = (response or '').strip()
+        if text.startswith('```'):
+            text = text.split('\n', 1)[1] if '\n' in text else ''
+            text = text.rstrip().rstrip('`').strip()
+        try:
+            parsed = json.loads(text)
+            if not isinstance(parsed, dict) or not isinstance(parsed.get('translation'), str):
+                return 'parse'
+        except json.JSONDecodeError:
+            # 流式提前结束时 JSON 不完整，只要 translation 字段完整即可
+            parser = StreamingFieldParser('translation')
+            parser.feed(text)
+            if not parser.complete:
+                return 'parse'
+
+        if not translated:
+            # 空译文是提示词允许的结果（该句已在上下文中翻译过）
+            return None
+        if is_wrong_language(translated, target_lang):
+            return 'language'
+        if _normalize(translated) == _normalize(source) and sum(_count_scripts(source).values()) >= 2:
+            return 'unchanged'
+        return None
+
+    @classmethod
+    def record(cls, model, reasons=()):
+        """记录一个文本框最终采用的模型及途中的升级原因"""
+        with cls._stats_lock:
+            cls._stats['tiers'][model] = cls._stats['tiers'].get(model, 0) + 1
+            for reason in reasons:
+                cls._stats['escalations'][reason] = cls._stats['escalations'].get(reason, 0) + 1
+
+    @classmethod
+    def stats(cls):
+        """返回各级模型处理的文本框数量与占比"""
+        with cls._stats_lock:
+            tiers = dict(cls._stats['tiers'])
+            escalations = dict(cls._stats['escalations'])
+        total = sum(tiers.values())
+        return {
+            'total': total,
+            'tiers': {model: {'count': count, 'share': count / total if total else 0.0}
+                      for model, count in tiers.items()},
+            'escalations': escalations
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._stats_lock:
+            cls._stats['tiers'].clear()
+            cls._stats['escalations'].clear()
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKC', text or '')
+    return ''.join(ch for ch in text if ch.isalnum()).casefold()
@@ -0,0 +1,169 @@
+import heapq
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from .prompt_builder import estimate_tokens
+
+
+class ContextStore:
+    """按相关性挑选的共享翻译上下文
+
+    历史的 "原文 -> 译文" 保存在定长环形缓冲区中；每次翻译时按
+    字符 n-gram 重合度和新近程度为历史条目打分，只注入得分最高、
+    且能放进 token 预算的前 top_k 条。
+    """
+
+    DEFAULT_HISTORY_SIZE = 500  # 环形缓冲区保留的历史条目数
+    DEFAULT_TOP_K = 8  # 每次最多注入的条目数
+    NGRAM_SIZE = 2
+    RECENCY_WEIGHT = 0.3  # 新近程度在总分中的权重
+    RECENCY_HALF_LIFE = 20  # 每隔多少条，新近得分减半
+
+    def __init__(self, history_size=DEFAULT_HISTORY_SIZE):
+        # 每个条目为 (序号, 原文, 译文, n-gram 集合)
+        self._entries = deque(maxlen=history_size)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def add(self, source, translation):
+        """记录一条翻译结果"""
+        if not source or not translation or source == translation:
+            return
+        grams = self._ngrams(source)
+        with self._lock:
+            self._seq += 1
+            self._entries.append((self._seq, source, translation, grams))
+
+    def select(self, query, budget, top_k=DEFAULT_TOP_K):
+        """挑选与 query 最相关的历史条目，返回上下文文本
+
+        结果按得分从低到高排列，最相关的条目紧挨着当前文本，
+        后续按行裁剪时也会优先保留它们。
+        """
+        if budget <= 0 or top_k <= 0:
+            return ''
+        query_grams = self._ngrams(query or '')
+
+        with self._lock:
+            entries = list(self._entries)
+            latest = self._seq
+        if not entries:
+            return ''
+
+        scored = (
+            (self._score(query_grams, grams, latest - seq), seq, source, translation)
+            for seq, source, translation, grams in entries
+        )
+        best = heapq.nlargest(top_k, scored)
+
+        lines = []
+        used = 0
+        for score, seq, source, translation in best:
+            line = f"{source} -> {translation}".replace('\n', ' ')
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                continue
+            lines.append(line)
+            used += cost
+        lines.reverse()
+        return '\n'.join(lines)
+
+    def clear(self):
+        """清空历史"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _score(self, query_grams, grams, age):
+        # Dice 系数衡量字符 n-gram 重合度
+        if query_grams and grams:
+            relevance = 2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+        else:
+            relevance = 0.0
+        recency = 0.5 ** (age / self.RECENCY_HALF_LIFE)
+        return relevance + self.RECENCY_WEIGHT * recency
+
+    @classmethod
+    def _ngrams(cls, text):
+        text = ''.join(text.split())
+        if len(text) < cls.NGRAM_SIZE:
+            return frozenset([text]) if text else frozenset()
+        return frozenset(text[i:i + cls.NGRAM_SIZE] for i in range(len(text) - cls.NGRAM_SIZE + 1))
+
+
+class ContextSessionManager:
+    """按来源隔离的上下文会话
+
+    每个会话（如爬虫章节 URL、浏览器扩展的页面来源、Streamlit 用户）
+    拥有独立的 ContextStore，避免不同漫画的上下文互相污染。
+    会话数量有上限，长时间未使用的会话会被淘汰。
+    """
+
+    DEFAULT_SESSION = 'default'
+    DEFAULT_MAX_SESSIONS = 32
+    DEFAULT_IDLE_TIMEOUT = 3600  # 会话空闲多少秒后被淘汰
+
+    def __init__(self, history_size=ContextStore.DEFAULT_HISTORY_SIZE,
+                 max_sessions=DEFAULT_MAX_SESSIONS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.history_size = history_size
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}  # 会话 ID -> [ContextStore, 最近使用时间]
+        self._lock = threading.Lock()
+
+    def get(self, session_id=None):
+        """获取（必要时创建）会话的上下文存储"""
+        session_id = session_id or self.DEFAULT_SESSION
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                # 超出数量上限时淘汰最久未使用的会话
+                while self._sessions and len(self._sessions) >= self.max_sessions:
+                    oldest = min(self._sessions, key=lambda sid: self._sessions[sid][1])
+                    del self._sessions[oldest]
+                entry = [ContextStore(self.history_size), now]
+                self._sessions[session_id] = entry
+            entry[1] = now
+            return entry[0]
+
+    def clear(self, session_id=None):
+        """清除指定会话；不指定时清除所有会话"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def sessions(self):
+        """返回当前存在的会话 ID"""
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def _evict_idle(self, now):
+        # 淘汰空闲会话
+        expired = [sid for sid, (_, last_used) in self._sessions.items()
+                   if now - last_used > self.idle_timeout]
+        for sid in expired:
+            del self._sessions[sid]
+
+
+def session_id_from_url(url, prefix='web'):
+    """由页面 URL 生成会话 ID
+
+    浏览器扩展（prefix='extension'）按标签页来源（协议 + 域名）划分会话，
+    其他来源保留路径以区分不同章节。
+    """
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return f"{prefix}:{url}"
+    if prefix == 'extension':
+        return f"{prefix}:{parts.scheme}://{parts.netloc}"
+    return f"{prefix}:{parts.netloc}{parts.path.rstrip('/')}"
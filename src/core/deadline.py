@@ -0,0 +1,82 @@
+import time
+from contextlib import contextmanager
+
+from .hedging import RequestCancelled
+
+
+class DeadlineExceeded(RequestCancelled):
+    """页面处理超出时限，尚未完成的请求被放弃
+
+    继承 RequestCancelled：超时是调用方放弃请求，不计入端点失败、熔断和延迟统计。
+    """
+
+    def __init__(self, stage=''):
+        super().__init__(f"处理超时（{stage}）" if stage else "处理超时")
+        self.stage = stage
+
+
+class Deadline:
+    """一页的处理时限，记录预处理、OCR、气泡分割、合并、分镜检测和翻译各阶段的耗时
+
+    发起外部请求的阶段最多使用总时限的 STAGE_SHARES 比例（且不超过整页剩余时间），
+    阶段内的每个外部请求的超时都被限制在剩余时间内。本地计算的阶段无法中途打断，不单独分配时限，
+    只记录耗时。翻译阶段使用整页剩余的全部时间，超时后尚未翻译的文本框显示原文。
+    budget 为 None 时不限时。
+    """
+
+    STAGE_SHARES = {'ocr': 0.4, 'translate': 1.0}  # 未列出的阶段使用整页剩余时间
+    # 按输入来源（会话 ID 前缀）的默认时限（秒）：剪贴板需要即时反馈，爬虫批量处理可以更宽松
+    DEFAULT_BUDGETS = {'clipboard': 60, 'extension': 90, 'crawler': 300, 'streamlit': 600, 'default': 180}
+
+    def __init__(self, budget=None, name='page', expires_at=None):
+        self.name = name
+        self.budget = budget
+        if expires_at is None and budget:
+            expires_at = time.monotonic() + budget
+        self.expires_at = expires_at
+        self.timings = {}  # 阶段 -> 耗时（秒）
+
+    @classmethod
+    def for_source(cls, session_id, settings):
+        """按会话 ID 的来源前缀（clipboard / extension / crawler / streamlit）取设置中的时限"""
+        source = (session_id or 'default').split(':', 1)[0]
+        budgets = dict(cls.DEFAULT_BUDGETS)
+        budgets.update(settings.get('page_deadlines') or {})
+        try:
+            budget = float(budgets.get(source, budgets.get('default')) or 0)
+        except (TypeError, ValueError):
+            budget = 0
+        return cls(budget if budget > 0 else None, source)
+
+    def remaining(self):
+        """剩余秒数，不限时返回 None"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(self.name)
+
+    def timeout(self, connect_timeout, read_timeout):
+        """把 requests 的 (连接, 读取) 超时限制在剩余时间内；已超时时抛出 DeadlineExceeded"""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return (connect_timeout, read_timeout)
+        return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+    @contextmanager
+    def stage(self, name):
+        """进入一个处理阶段，产出该阶段的 Deadline，并记录阶段耗时"""
+        start = time.monotonic()
+        expires_at = self.expires_at
+        if expires_at is not None:
+            expires_at = min(expires_at, start + self.budget * self.STAGE_SHARES.get(name, 1.0))
+        try:
+            yield Deadline(self.budget, name, expires_at)
+        finally:
+            self.timings[name] = time.monotonic() - start
@@ -0,0 +1,239 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+
+
+# 内置拟声词词典：源语言 -> {规范化后的拟声词: (中文, 英文)}
+# 条目是重复拟声词的基本单位，ドキドキ 按 ドキ × 2 查询；英文为 None 表示源语言就是英文
+# 日语条目只收片假名且至少两拍：单拍或两拍的片假名常与普通词语、人名相同（如 ゴ、シン、バン），
+# 较短的条目只在重复或带促音、长音、感叹号时才按拟声词处理（见 FastPath._lookup）
+BUILTIN_SFX = {
+    'Japanese': {
+        'ドキ': ('怦', 'THUMP'),
+        'ドン': ('咚', 'BAM'),
+        'ドカン': ('轰', 'KABOOM'),
+        'バン': ('砰', 'BANG'),
+        'ガン': ('咣', 'CLANG'),
+        'ゴゴゴ': ('轰隆隆', 'RUMBLE'),
+        'ザワ': ('骚动', 'MURMUR'),
+        'シン': ('寂静', 'SILENCE'),
+        'ニヤ': ('嘿', 'GRIN'),
+        'ニヤリ': ('坏笑', 'SMIRK'),
+        'ガタ': ('哐当', 'CLATTER'),
+        'バタ': ('啪嗒', 'THUD'),
+        'ドサ': ('咚', 'THUD'),
+        'パチ': ('啪', 'CLAP'),
+        'ピンポン': ('叮咚', 'DING DONG'),
+        'ゴク': ('咕嘟', 'GULP'),
+        'キラ': ('闪', 'SPARKLE'),
+        'ビク': ('哆嗦', 'FLINCH'),
+        'ポン': ('啵', 'POP'),
+        'カチャ': ('咔嚓', 'CLICK'),
+        'ガシャン': ('哐啷', 'CRASH'),
+        'ズドン': ('轰', 'BOOM'),
+        'ヒュン': ('嗖', 'WHOOSH'),
+        'ゴロ': ('咕噜', 'RUMBLE'),
+        'ワイワイ': ('热闹', 'CHATTER'),
+    },
+    'Korean': {
+        '쾅': ('轰', 'BOOM'),
+        '꽝': ('轰', 'BANG'),
+        '두근': ('怦', 'THUMP'),
+        '쿵': ('咚', 'THUD'),
+        '탁': ('啪', 'TAP'),
+        '휙': ('嗖', 'WHOOSH'),
+        '쨍': ('锵', 'CLANG'),
+        '스윽': ('唰', 'SWISH'),
+        '덜컥': ('咔嗒', 'CLICK'),
+        '꿀꺽': ('咕嘟', 'GULP'),
+    },
+    'English': {
+        'BOOM': ('轰', None),
+        'BANG': ('砰', None),
+        'BAM': ('砰', None),
+        'CRASH': ('哗啦', None),
+        'THUMP': ('咚', None),
+        'THUD': ('咚', None),
+        'WHOOSH': ('嗖', None),
+        'SLAM': ('砰', None),
+        'CLICK': ('咔嗒', None),
+        'KNOCK': ('咚', None),
+        'POW': ('嘭', None),
+        'SPLASH': ('哗啦', None),
+        'GULP': ('咕嘟', None),
+        'CLANG': ('锵', None),
+    },
+}
+
+_TRADITIONAL = str.maketrans('轰哗骚动闪当坏静', '轟嘩騷動閃噹壞靜')
+
+# 不承载语义的字符：促音、长音、波浪线、小写元音（如 ドキッ、ハァ）
+_NON_LINGUISTIC = set('ーっッ～〜ぁぃぅぇぉァィゥェォ')
+# 表明文本是拟声词的标记：促音、长音、波浪线、感叹号（NFKC 规范化后）
+_SFX_MARKS = set('っッー～〜!')
+# 与前一个假名合成一拍的小写假名
+_COMBINING_KANA = set('ャュョヮ')
+# 内置条目按源语言的最小长度（日语按拍、韩语按音节）：
+# 重复展开的基本单位至少 _MIN_REPEAT_UNIT，不重复也没有标记时整词至少 _MIN_BARE
+_MIN_REPEAT_UNIT = {'Japanese': 2, 'Korean': 1}
+_MIN_BARE = {'Japanese': 3, 'Korean': 2}
+_PAGE_NUMBER = re.compile(r'^\W*(?:p\.?|pg\.?|page)?\s*\d+\s*\W*$', re.IGNORECASE)
+_REPEATED_LETTERS = re.compile(r'(\w)\1{2,}')
+_MAX_REPEAT = 8
+
+
+def _is_symbolic(ch):
+    """标点、符号、数字、空白及控制字符"""
+    return unicodedata.category(ch)[0] in 'PSNZC' or ch in _NON_LINGUISTIC
+
+
+class FastPath:
+    """翻译前的本地快速通道：不需要 LLM 的文本框直接在本地得到结果
+
+    - 纯标点、符号、数字、页码（如 "…"、"!?"、"- 12 -"）原样保留
+    - 常见拟声词按源语言词典查出预先给定的译文，保留原有的标点（如 "ドキドキッ!!" -> "怦怦!!"）
+      日语只匹配片假名；较短的内置条目只在重复或带促音、长音、感叹号时匹配，避免把普通词语当成拟声词
+
+    用户词典 sfx_lexicon.json 格式为 {源语言: {拟声词: {目标语言: 译文}}}（日语拟声词用片假名），
+    会覆盖内置条目；用户条目不受长度限制，不重复、无标记时也会匹配。
+    """
+
+    DEFAULT_LEXICON_PATH = '~/.config/manga_translator/sfx_lexicon.json'
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, lexicon_path=None):
+        self.lexicon_path = os.path.expanduser(lexicon_path or self.DEFAULT_LEXICON_PATH)
+        self._lexicon = self._builtin_lexicon()
+        self._user_keys = set()  # 用户词典中的 (源语言, 拟声词)
+        self._load_user_lexicon()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def classify(self, text, source_lang, target_lang):
+        """判断文本框能否在本地处理
+
+        Returns:
+            tuple: (类别 'symbols' / 'sfx', 译文)；需要交给 LLM 时返回 None
+        """
+        normalized = unicodedata.normalize('NFKC', text or '').strip()
+        if not normalized or all(_is_symbolic(ch) for ch in normalized) or _PAGE_NUMBER.match(normalized):
+            return 'symbols', text
+
+        key = ''.join(ch for ch in normalized if not _is_symbolic(ch))
+        marked = any(ch in _SFX_MARKS for ch in normalized)
+        translated = self._lookup(key, source_lang, target_lang, marked)
+        if translated is None:
+            return None
+        return 'sfx', translated + self._trailing_punctuation(text.strip())
+
+    def _lookup(self, key, source_lang, target_lang, marked=False):
+        """查询拟声词；词典中没有整词时按基本单位的重复（如 ドキドキドキ）查询
+
+        marked 表示原文带促音、长音或感叹号等拟声词标记。
+        """
+        lexicon = self._lexicon.get(source_lang)
+        if not lexicon:
+            return None
+        if source_lang == 'Japanese':
+            # 平假名多为普通词语（ごご、しん），只匹配片假名
+            if not all(0x30A1 <= ord(ch) <= 0x30FA for ch in key):
+                return None
+        elif source_lang == 'English':
+            key = key.upper()
+
+        min_unit = _MIN_REPEAT_UNIT.get(source_lang, 1)
+        candidates = [key]
+        if source_lang == 'English':
+            # BOOOOM -> BOOM / BOM
+            candidates += [_REPEATED_LETTERS.sub(r'\1\1', key), _REPEATED_LETTERS.sub(r'\1', key)]
+        for candidate in candidates:
+            if (source_lang, candidate) not in self._user_keys:
+                length = self._length(candidate, source_lang)
+                if length < min_unit or (not marked and length < _MIN_BARE.get(source_lang, 1)):
+                    continue
+            translation = self._translation_of(lexicon, candidate, target_lang)
+            if translation is not None:
+                return translation
+
+        separator = ' ' if target_lang == 'English' else ''
+        for size in range(1, len(key) // 2 + 1):
+            if len(key) % size:
+                continue
+            count = len(key) // size
+            unit = key[:size]
+            if count > _MAX_REPEAT or unit * count != key:
+                continue
+            if self._length(unit, source_lang) < min_unit and (source_lang, unit) not in self._user_keys:
+                continue
+            translation = self._translation_of(lexicon, unit, target_lang)
+            if translation is not None:
+                return separator.join([translation] * count)
+        return None
+
+    @staticmethod
+    def _length(key, source_lang):
+        """拟声词的长度：日语按拍（拗音的小写假名不单独计拍），其他语言按字符"""
+        if source_lang == 'Japanese':
+            return sum(1 for ch in key if ch not in _COMBINING_KANA)
+        return len(key)
+
+    @staticmethod
+    def _translation_of(lexicon, key, target_lang):
+        entry = lexicon.get(key)
+        if entry is None:
+            return None
+        return entry.get(target_lang)
+
+    @staticmethod
+    def _trailing_punctuation(text):
+        """取出末尾的标点（跳过促音、长音等），翻译后重新接上"""
+        tail = []
+        for ch in reversed(text):
+            if not _is_symbolic(ch):
+                break
+            if unicodedata.category(ch)[0] in 'PS' and ch not in _NON_LINGUISTIC:
+                tail.append(ch)
+        return ''.join(reversed(tail))
+
+    @staticmethod
+    def _builtin_lexicon():
+        lexicon = {}
+        for source_lang, entries in BUILTIN_SFX.items():
+            table = lexicon[source_lang] = {}
+            for key, (chinese, english) in entries.items():
+                translations = {
+                    'Simplified Chinese': chinese,
+                    'Traditional Chinese': chinese.translate(_TRADITIONAL)
+                }
+                if english:
+                    translations['English'] = english
+                table[key] = translations
+        return lexicon
+
+    def _load_user_lexicon(self):
+        if not os.path.exists(self.lexicon_path):
+            return
+        try:
+            with open(self.lexicon_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for source_lang, entries in data.items():
+                table = self._lexicon.setdefault(source_lang, {})
+                for sfx, translations in entries.items():
+                    key = unicodedata.normalize('NFKC', sfx)
+                    key = ''.join(ch for ch in key if not _is_symbolic(ch))
+                    if source_lang == 'English':
+                        key = key.upper()
+                    if key:
+                        table.setdefault(key, {}).update(translations)
+                        self._user_keys.add((source_lang, key))
+        except Exception as e:
+            print(f"加载拟声词词典失败: {str(e)}")
@@ -0,0 +1,199 @@
+import re
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FuzzyMemory:
+    """近似翻译记忆：用字符 shingle 的 MinHash + LSH 索引历史 (原文, 译文)
+
+    OCR 噪声（多余的标点、认错的假名）使相同台词很少逐字节重复，精确缓存无法命中。
+    这里对去掉标点和空白后的原文取字符 n-gram，计算 MinHash 签名并分段（band）
+    放入 LSH 桶；查询只比较与其落入同一桶的候选，再用精确 Jaccard 相似度确认。
+    查询耗时与候选数量相关，与索引总量基本无关。
+
+    - 相似度 >= reuse_threshold：直接复用已有译文
+    - hint_threshold <= 相似度 < reuse_threshold：作为 few-shot 示例提供给模型
+    """
+
+    SHINGLE_SIZE = 2
+    NUM_PERM = 64  # MinHash 签名长度
+    BANDS = 16  # LSH 分段数，每段 NUM_PERM / BANDS 行；相似度约 0.5 以上的条目大概率成为候选
+    MIN_LENGTH = 4  # 短于此长度的文本只走精确缓存，一个字的差别就可能改变含义
+    MAX_CANDIDATES = 256  # 每次查询最多精确比较的候选数
+    DEFAULT_MAX_ENTRIES = 300000
+    DEFAULT_REUSE_THRESHOLD = 0.9
+    DEFAULT_HINT_THRESHOLD = 0.6
+
+    _IGNORED = re.compile(r'[\W_]+', re.UNICODE)  # 标点、符号和空白
+    _DIGITS = re.compile(r'\d+')
+
+    _instances = {}  # (源语言, 目标语言) -> FuzzyMemory
+    _instances_lock = threading.Lock()
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, seed=1):
+        self.max_entries = max_entries
+        rng = np.random.RandomState(seed)
+        # multiply-shift 哈希族：((a * x + b) mod 2^64) >> 32，a 为奇数
+        self._a = rng.randint(1, 2 ** 63 - 1, size=self.NUM_PERM, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, 2 ** 63 - 1, size=self.NUM_PERM, dtype=np.int64).astype(np.uint64)
+        self._rows = self.NUM_PERM // self.BANDS
+
+        self._entries = OrderedDict()  # 条目 ID -> (键, 原文, 译文, shingle 集合, 桶键列表)
+        self._by_key = {}  # 规范化原文 -> 条目 ID
+        self._buckets = [{} for _ in range(self.BANDS)]  # 每段: 桶键 -> 条目 ID 集合
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0  # 直接复用
+        self.hints = 0  # 作为示例提供
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls, source_lang, target_lang, loader=None):
+        """获取语言对对应的索引；首次创建时用 loader() 产出的 (原文, 译文) 预热"""
+        key = (source_lang or '', target_lang or '')
+        with cls._instances_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = cls()
+                if loader is not None:
+                    try:
+                        for source, translation in loader():
+                            instance.add(source, translation)
+                    except Exception as e:
+                        print(f"近似翻译记忆预热失败: {str(e)}")
+                cls._instances[key] = instance
+            return instance
+
+    @classmethod
+    def reset_instances(cls):
+        with cls._instances_lock:
+            cls._instances.clear()
+
+    def add(self, source, translation):
+        """索引一条翻译结果，相同原文以最新译文为准"""
+        key = self._normalize(source)
+        if len(key) < self.MIN_LENGTH or not translation or translation == source:
+            return
+        shingles = self._shingles(key)
+        band_keys = self._band_keys(self._signature(shingles))
+
+        with self._lock:
+            old_id = self._by_key.get(key)
+            if old_id is not None:
+                self._remove(old_id)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (key, source, translation, shingles, band_keys)
+            self._by_key[key] = entry_id
+            for band, band_key in enumerate(band_keys):
+                self._buckets[band].setdefault(band_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def query(self, text):
+        """返回最相似的历史条目 (相似度, 原文, 译文)，没有候选时返回 None"""
+        key = self._normalize(text)
+        if len(key) < self.MIN_LENGTH:
+            return None
+        shingles = self._shingles(key)
+        band_keys = self._band_keys(self._signature(shingles))
+
+        with self._lock:
+            candidates = set()
+            for band, band_key in enumerate(band_keys):
+                bucket = self._buckets[band].get(band_key)
+                if bucket:
+                    candidates.update(bucket)
+                    if len(candidates) >= self.MAX_CANDIDATES:
+                        break
+
+            best = None
+            for entry_id in candidates:
+                _, source, translation, entry_shingles, _ = self._entries[entry_id]
+                union = len(shingles | entry_shingles)
+                score = len(shingles & entry_shingles) / union if union else 0.0
+                if best is None or score > best[0]:
+                    best = (score, source, translation)
+        return best
+
+    def lookup(self, text, reuse_threshold=DEFAULT_REUSE_THRESHOLD, hint_threshold=DEFAULT_HINT_THRESHOLD):
+        """按阈值判断近似匹配的用途
+
+        Returns:
+            tuple: (译文或 None, 示例列表)。相似度达到 reuse_threshold 时返回可直接复用的译文；
+            落在中间区间时返回 [{"original": ..., "translation": ...}] 作为 few-shot 示例。
+        """
+        match = self.query(text)
+        if match is None or match[0] < hint_threshold:
+            self._count('misses')
+            return None, []
+        score, source, translation = match
+        # 数字不同（如 "3人" 与 "4人"）时不直接复用，只作为示例
+        if score >= reuse_threshold and self._DIGITS.findall(source) == self._DIGITS.findall(text):
+            self._count('hits')
+            return translation, []
+        self._count('hints')
+        return None, [{'original': source, 'translation': translation}]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.hints + self.misses
+            return {
+                'hits': self.hits,
+                'hints': self.hints,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries)
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_key.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, entry_id):
+        # 调用方需持有 self._lock
+        key, _, _, _, band_keys = self._entries.pop(entry_id)
+        if self._by_key.get(key) == entry_id:
+            del self._by_key[key]
+        for band, band_key in enumerate(band_keys):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _signature(self, shingles):
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return values.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [signature[band * self._rows:(band + 1) * self._rows].tobytes() for band in range(self.BANDS)]
+
+    @classmethod
+    def _normalize(cls, text):
+        text = unicodedata.normalize('NFKC', text or '').casefold()
+        return cls._IGNORED.sub('', text)
+
+    @classmethod
+    def _shingles(cls, key):
+        if len(key) <= cls.SHINGLE_SIZE:
+            return frozenset([key])
+        return frozenset(key[i:i + cls.SHINGLE_SIZE] for i in range(len(key) - cls.SHINGLE_SIZE + 1))
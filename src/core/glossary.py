@@ -0,0 +1,260 @@
+import csv
+import json
+import os
+import threading
+import unicodedata
+from collections import deque
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机
+
+    所有术语构建成一个自动机后，一次扫描即可找出文本中出现的全部术语，
+    耗时只与文本长度和命中数有关，与术语表大小无关。
+    """
+
+    def __init__(self):
+        self._goto = [{}]  # 状态 -> {字符: 下一状态}
+        self._fail = [0]
+        self._output = [()]  # 状态 -> 在此结束的模式序号
+        self._patterns = []
+        self._built = False
+
+    def add(self, pattern):
+        """加入一个模式，返回其序号"""
+        if not pattern:
+            raise ValueError("pattern must not be empty")
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        index = len(self._patterns)
+        self._patterns.append(pattern)
+        self._output[state] = self._output[state] + (index,)
+        self._built = False
+        return index
+
+    def build(self):
+        """按 BFS 计算失败指针，并把失败链上的输出合并到各状态"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail_target = self._goto[fail].get(ch, 0)
+                self._fail[next_state] = fail_target if fail_target != next_state else 0
+                if self._output[self._fail[next_state]]:
+                    self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """逐个产出 (结束位置, 模式序号)"""
+        if not self._built:
+            self.build()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in output[state]:
+                yield position, index
+
+    def pattern(self, index):
+        return self._patterns[index]
+
+    def __len__(self):
+        return len(self._patterns)
+
+
+class Glossary:
+    """术语表：原文术语 -> 固定译法
+
+    术语在加载时建成 Aho-Corasick 自动机；每个文本框只取出实际出现的术语，
+    因此注入提示词的内容与术语表总量无关。匹配前对原文和术语做 NFKC 规范化并忽略大小写。
+    """
+
+    DEFAULT_MAX_TERMS = 20  # 每个文本框最多注入的术语数
+
+    def __init__(self, entries=None, name=''):
+        self.name = name
+        self._automaton = AhoCorasick()
+        self._entries = []  # 模式序号 -> (原文术语, 译法)
+        self._index = {}  # 规范化术语 -> 模式序号
+        for source, target in (entries.items() if isinstance(entries, dict) else entries or []):
+            self.add(source, target)
+        self._automaton.build()
+
+    def add(self, source, target):
+        """加入一条术语，重复的术语以后加入的为准"""
+        key = self.normalize(source)
+        if not key or not target:
+            return
+        entry = (source.strip(), target.strip())
+        if key in self._index:
+            self._entries[self._index[key]] = entry
+            return
+        self._index[key] = self._automaton.add(key)
+        self._entries.append(entry)
+
+    def match(self, text, max_terms=DEFAULT_MAX_TERMS):
+        """返回文本中出现的术语 {原文术语: 译法}
+
+        重叠时优先较长的术语（如 "うずまきナルト" 优先于 "ナルト"），
+        按在文本中首次出现的位置排序。
+        """
+        if not text or not self._entries or max_terms <= 0:
+            return {}
+
+        found = {}  # 模式序号 -> 起始位置
+        for end, index in self._automaton.iter_matches(self.normalize(text)):
+            start = end - len(self._automaton.pattern(index)) + 1
+            if index not in found:
+                found[index] = start
+
+        # 去掉被更长的命中术语完整覆盖的短术语
+        spans = sorted(
+            ((start, start + len(self._automaton.pattern(index)), index) for index, start in found.items()),
+            key=lambda span: (span[0], -span[1])
+        )
+        kept = []
+        covered_until = -1
+        for start, end, index in spans:
+            if end <= covered_until:
+                continue
+            kept.append(index)
+            covered_until = max(covered_until, end)
+
+        result = {}
+        for index in kept:
+            source, target = self._entries[index]
+            result[source] = target
+            if len(result) >= max_terms:
+                break
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def normalize(text):
+        text = unicodedata.normalize('NFKC', text or '')
+        return ' '.join(text.split()).casefold()
+
+    @classmethod
+    def load(cls, path):
+        """从文件加载术语表
+
+        支持 .json（{"原文": "译法"} 或 [{"source":..., "target":...}]）
+        以及 .csv / .tsv / .txt（每行 "原文<分隔符>译法"，# 开头为注释）。
+        """
+        name = os.path.splitext(os.path.basename(path))[0]
+        ext = os.path.splitext(path)[1].lower()
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            if ext == '.json':
+                data = json.load(f)
+                if isinstance(data, dict):
+                    entries = list(data.items())
+                else:
+                    entries = [(item.get('source', ''), item.get('target', '')) for item in data]
+            else:
+                delimiter = ',' if ext == '.csv' else '\t'
+                entries = [
+                    (row[0], row[1]) for row in csv.reader(f, delimiter=delimiter)
+                    if len(row) >= 2 and row[0] and not row[0].startswith('#')
+                ]
+        return cls(entries, name=name)
+
+
+class GlossaryManager:
+    """按系列管理术语表
+
+    术语表文件放在 glossaries 目录下，文件名（不含扩展名）即术语表名。
+    加载后的自动机按文件修改时间缓存，文件更新后下次使用时自动重建。
+    """
+
+    DEFAULT_DIR = '~/.config/manga_translator/glossaries'
+    EXTENSIONS = ('.json', '.tsv', '.csv', '.txt')
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, directory=None):
+        self.directory = os.path.expanduser(directory or self.DEFAULT_DIR)
+        self._cache = {}  # 术语表名 -> (修改时间, Glossary)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def available(self):
+        """返回目录中可用的术语表名"""
+        names = set()
+        for filename in os.listdir(self.directory):
+            base, ext = os.path.splitext(filename)
+            if ext.lower() in self.EXTENSIONS:
+                names.add(base)
+        return sorted(names)
+
+    def get(self, name):
+        """获取术语表，不存在或加载失败时返回 None"""
+        if not name:
+            return None
+        path = self._find(name)
+        if path is None:
+            return None
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        try:
+            glossary = Glossary.load(path)
+        except Exception as e:
+            print(f"加载术语表失败 {path}: {str(e)}")
+            return None
+        with self._lock:
+            self._cache[name] = (mtime, glossary)
+        return glossary
+
+    def for_session(self, session_id, settings):
+        """按会话选择术语表
+
+        settings['session_glossaries'] 把会话 ID 前缀映射到术语表名
+        （如 {"crawler:example.com/comic/123": "one_piece"}），取最长的匹配前缀；
+        没有匹配时使用 settings['glossary']。
+        """
+        mapping = settings.get('session_glossaries') or {}
+        best = None
+        if session_id:
+            for prefix, name in mapping.items():
+                if session_id.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+                    best = (prefix, name)
+        return self.get(best[1] if best else settings.get('glossary', ''))
+
+    def _find(self, name):
+        for ext in self.EXTENSIONS:
+            path = os.path.join(self.directory, name + ext)
+            if os.path.exists(path):
+                return path
+        return None
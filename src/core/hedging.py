@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+
+class RequestCancelled(Exception):
+    """请求被调用方主动取消（如对冲请求中落败的一方）"""
+
+
+class CancelToken:
+    """请求的取消标记
+
+    处理器发出流式请求后用 bind() 登记响应对象；cancel() 会立即关闭该响应，
+    阻塞在读取上的线程随之退出，服务端也会因连接断开而停止生成。
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._response = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def bind(self, response):
+        with self._lock:
+            self._response = response
+            cancelled = self.cancelled
+        if cancelled:
+            response.close()
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise RequestCancelled()
+
+    def wait(self, timeout):
+        """最多等待 timeout 秒，期间被取消时立即返回；返回是否已取消"""
+        return self._cancelled.wait(timeout)
+
+
+class LatencyTracker:
+    """按预设记录最近若干次请求耗时，用于估计分位数"""
+
+    DEFAULT_WINDOW = 200
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._samples = {}  # 键 -> deque[耗时]
+        self._lock = threading.Lock()
+
+    def record(self, key, latency):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, key, q, min_samples=1):
+        """返回第 q 分位数（0~1），样本不足 min_samples 时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(q * len(samples)))
+        return samples[index]
+
+
+class Hedger:
+    """对冲请求：主请求超过该预设观测到的 p95 仍未返回时，向备用预设/端点再发一份，
+    取先返回的结果并取消另一份
+
+    样本不足时不对冲，直接在当前线程执行主请求。
+    """
+
+    DEFAULT_PERCENTILE = 0.95
+    DEFAULT_MIN_DELAY = 0.5  # 对冲前至少等待的秒数，避免对本来就很快的请求加倍负载
+    MIN_SAMPLES = 20
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_workers=32):
+        self.tracker = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0  # 备用请求先返回的次数
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def call(self, key, primary, secondary, secondary_key=None,
+             percentile=DEFAULT_PERCENTILE, min_delay=DEFAULT_MIN_DELAY):
+        """执行 primary(token)，必要时对冲 secondary(token)
+
+        Args:
+            key: 主请求的延迟统计键（通常为预设名）
+            primary, secondary: 接收 CancelToken 的可调用对象
+            secondary_key: 备用请求的延迟统计键，默认与 key 相同
+        """
+        with self._lock:
+            self.calls += 1
+        delay = self.tracker.percentile(key, percentile, self.MIN_SAMPLES)
+        if delay is None:
+            return self._timed(key, primary, CancelToken())
+
+        primary_token = CancelToken()
+        primary_future = self._executor.submit(self._timed, key, primary, primary_token)
+        try:
+            return primary_future.result(timeout=max(delay, min_delay))
+        except FutureTimeoutError:
+            pass
+
+        with self._lock:
+            self.hedges_fired += 1
+        secondary_token = CancelToken()
+        secondary_future = self._executor.submit(
+            self._timed, secondary_key or key, secondary, secondary_token
+        )
+        tokens = {primary_future: primary_token, secondary_future: secondary_token}
+
+        pending = set(tokens)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 一方失败时继续等待另一方
+                    error = error or e
+                    continue
+                for other in pending:
+                    tokens[other].cancel()
+                if future is secondary_future:
+                    with self._lock:
+                        self.hedges_won += 1
+                return result
+        raise error
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'hedges_fired': self.hedges_fired,
+                'hedges_won': self.hedges_won,
+                'hedge_rate': self.hedges_fired / self.calls if self.calls else 0.0
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.hedges_fired = 0
+            self.hedges_won = 0
+
+    def _timed(self, key, func, token):
+        start = time.monotonic()
+        result = func(token)
+        # 被取消的请求耗时不具代表性，不计入统计
+        if not token.cancelled:
+            self.tracker.record(key, time.monotonic() - start)
+        return result
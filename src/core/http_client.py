@@ -0,0 +1,98 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpClient:
+    """共享的 HTTP 客户端层，为每个端点维护一个带连接池的 requests.Session
+
+    同一端点（scheme + host + port）的请求复用 keep-alive 连接，
+    避免每个文本框、每张图片都重新建立 TCP / TLS 连接。
+    """
+
+    DEFAULT_OPTIONS = {
+        'pool_size': 8,  # 每个端点保留的连接数
+        'connect_timeout': 5.0,  # 建立连接超时（秒）
+        'read_timeout': 120.0,  # 等待响应超时（秒）
+        'keep_alive': True,
+        'gzip': True
+    }
+
+    _sessions = {}  # 端点 -> (options, Session)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_session(cls, url, options=None):
+        """获取端点对应的 Session，连接池参数变化时自动重建"""
+        options = cls.resolve_options(options)
+        endpoint = cls._endpoint_of(url)
+        key = tuple(sorted(options.items()))
+
+        with cls._lock:
+            cached = cls._sessions.get(endpoint)
+            if cached and cached[0] == key:
+                return cached[1]
+            if cached:
+                cached[1].close()
+
+            session = cls._create_session(options)
+            cls._sessions[endpoint] = (key, session)
+            return session
+
+    @classmethod
+    def post(cls, url, options=None, **kwargs):
+        """通过端点的连接池发送 POST 请求，未指定 timeout 时使用配置的超时"""
+        options = cls.resolve_options(options)
+        kwargs.setdefault('timeout', (options['connect_timeout'], options['read_timeout']))
+        return cls.get_session(url, options).post(url, **kwargs)
+
+    @classmethod
+    def get(cls, url, options=None, **kwargs):
+        """通过端点的连接池发送 GET 请求"""
+        options = cls.resolve_options(options)
+        kwargs.setdefault('timeout', (options['connect_timeout'], options['read_timeout']))
+        return cls.get_session(url, options).get(url, **kwargs)
+
+    @classmethod
+    def reset(cls, url=None):
+        """关闭并丢弃连接池；不指定 url 时重建全部端点（如切换预设后）"""
+        with cls._lock:
+            if url is None:
+                endpoints = list(cls._sessions.keys())
+            else:
+                endpoints = [cls._endpoint_of(url)]
+            for endpoint in endpoints:
+                cached = cls._sessions.pop(endpoint, None)
+                if cached:
+                    cached[1].close()
+
+    @classmethod
+    def resolve_options(cls, options=None):
+        """合并默认参数与预设/设置中的 http_* 参数"""
+        resolved = dict(cls.DEFAULT_OPTIONS)
+        for name in cls.DEFAULT_OPTIONS:
+            if options and options.get(f'http_{name}') is not None:
+                resolved[name] = options[f'http_{name}']
+        resolved['pool_size'] = max(1, int(resolved['pool_size']))
+        resolved['connect_timeout'] = float(resolved['connect_timeout'])
+        resolved['read_timeout'] = float(resolved['read_timeout'])
+        resolved['keep_alive'] = bool(resolved['keep_alive'])
+        resolved['gzip'] = bool(resolved['gzip'])
+        return resolved
+
+    @staticmethod
+    def _endpoint_of(url):
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    @staticmethod
+    def _create_session(options):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=options['pool_size'])
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Connection'] = 'keep-alive' if options['keep_alive'] else 'close'
+        session.headers['Accept-Encoding'] = 'gzip, deflate' if options['gzip'] else 'identity'
+        return session
@@ -0,0 +1,147 @@
+import json
+
+
+class StreamingFieldParser:
+    """增量 JSON 解析器：在模型逐 token 输出 JSON 时提取某个字符串字段的当前值
+
+    只关心一个字段（默认 "translation"），不需要完整 JSON 即可得到部分译文。
+    支持转义字符（包括被切断在两个分片之间的 \\uXXXX），字段的值闭合后 complete 为 True。
+    """
+
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field='translation'):
+        self.key = json.dumps(field)
+        self.buffer = ''
+        self.value = ''
+        self.complete = False
+        self._pos = None  # 字段值中下一个待解码字符在 buffer 中的位置
+
+    def feed(self, chunk):
+        """追加一段输出，返回字段当前的（可能不完整的）值"""
+        self.buffer += chunk
+        if self.complete:
+            return self.value
+
+        if self._pos is None:
+            self._pos = self._find_value_start()
+            if self._pos is None:
+                return self.value
+
+        self._decode()
+        return self.value
+
+    def _find_value_start(self):
+        """定位字段值起始引号之后的位置，尚未出现时返回 None"""
+        start = 0
+        while True:
+            index = self.buffer.find(self.key, start)
+            if index < 0:
+                return None
+            i = index + len(self.key)
+            # 跳过空白和冒号
+            while i < len(self.buffer) and self.buffer[i] in ' \t\r\n':
+                i += 1
+            if i >= len(self.buffer):
+                return None
+            if self.buffer[i] != ':':
+                # 这是某个值里出现的同名字符串，继续向后找
+                start = index + 1
+                continue
+            i += 1
+            while i < len(self.buffer) and self.buffer[i] in ' \t\r\n':
+                i += 1
+            if i >= len(self.buffer):
+                return None
+            if self.buffer[i] != '"':
+                # 值不是字符串（例如 null），视为空值结束
+                self.complete = True
+                return None
+            return i + 1
+
+    def _decode(self):
+        buffer = self.buffer
+        i = self._pos
+        decoded = []
+        while i < len(buffer):
+            ch = buffer[i]
+            if ch == '"':
+                self.complete = True
+                i += 1
+                break
+            if ch != '\\':
+                decoded.append(ch)
+                i += 1
+                continue
+
+            # 转义序列可能被截断，等待更多数据
+            if i + 1 >= len(buffer):
+                break
+            esc = buffer[i + 1]
+            if esc == 'u':
+                if i + 6 > len(buffer):
+                    break
+                try:
+                    code = int(buffer[i + 2:i + 6], 16)
+                except ValueError:
+                    code = ord('?')
+                # 代理对需要两个 \uXXXX 才能组成一个字符
+                if 0xD800 <= code < 0xDC00:
+                    if i + 12 > len(buffer):
+                        break
+                    if buffer[i + 6:i + 8] == '\\u':
+                        try:
+                            low = int(buffer[i + 8:i + 12], 16)
+                        except ValueError:
+                            low = 0
+                        if 0xDC00 <= low < 0xE000:
+                            code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                            decoded.append(chr(code))
+                            i += 12
+                            continue
+                decoded.append(chr(code))
+                i += 6
+            else:
+                decoded.append(self._ESCAPES.get(esc, esc))
+                i += 2
+
+        self.value += ''.join(decoded)
+        self._pos = i
+
+
+def extract_field(response, field='translation', default=''):
+    """容错地从模型输出中提取字符串字段
+
+    依次尝试：完整 JSON 解析 → 去掉 Markdown 代码块后解析 → 增量解析器
+    （可处理被截断或提前终止的 JSON）→ 非 JSON 输出时直接使用原文本。
+    """
+    if not response:
+        return default
+    text = response.strip()
+
+    # 去掉 ```json ... ``` 包裹
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        if text.rstrip().endswith('```'):
+            text = text.rstrip()[:-3]
+        text = text.strip()
+
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict):
+            value = result.get(field, default)
+            return value if isinstance(value, str) else default
+        if isinstance(result, str):
+            return result
+    except json.JSONDecodeError:
+        pass
+
+    parser = StreamingFieldParser(field)
+    parser.feed(text)
+    if parser.complete or parser.value:
+        return parser.value
+
+    # 模型没有按 JSON 输出，直接把文本当作译文
+    if not text.startswith('{'):
+        return text
+    return default
@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+
+class PageLayout:
+    """一页的 OCR 文本框布局
+
+    boxes 为 N×8 的 float32 数组（四个角点 x1,y1,...,x4,y4），texts / scores 与之一一对应。
+    OCR 返回的三种边界框格式只在 from_ocr 中规范化一次，之后的矩形、中心点、
+    合并边界框都用 numpy 按整页计算。合并后的文本框在 hulls 中保留组内角点的凸包，
+    渲染时按凸包填充背景；boxes 中对应位置为凸包的外接四边形。
+    bubbles 为每个文本框所在的气泡编号（见 bubble_segmentation），0 表示不在已识别的气泡内。
+    """
+
+    __slots__ = ('boxes', 'texts', 'scores', 'hulls', 'bubbles')
+
+    def __init__(self, boxes=None, texts=None, scores=None, hulls=None, bubbles=None):
+        self.boxes = np.asarray(boxes if boxes is not None else [], dtype=np.float32).reshape(-1, 8)
+        self.texts = list(texts or [])
+        if scores is None:
+            scores = np.ones(len(self.texts), dtype=np.float32)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.hulls = list(hulls) if hulls is not None else [None] * len(self.texts)  # None 表示就是 boxes 的四边形
+        if bubbles is None:
+            bubbles = np.zeros(len(self.texts), dtype=np.int32)
+        self.bubbles = np.asarray(bubbles, dtype=np.int32).reshape(-1)
+
+    def __len__(self):
+        return len(self.texts)
+
+    @classmethod
+    def from_ocr(cls, data, min_score=0.0):
+        """从 UmiOCR 的 data 列表构建，丢弃置信度低于 min_score 的文本框"""
+        boxes = []
+        texts = []
+        scores = []
+        for line in data or []:
+            score = line.get('score', 1.0)
+            if score < min_score:
+                continue
+            box = cls.normalize_box(line['box'])
+            if box is None:
+                continue
+            boxes.append(box)
+            texts.append(line['text'])
+            scores.append(score)
+        return cls(boxes, texts, scores)
+
+    @staticmethod
+    def normalize_box(box):
+        """把 [x1,y1,...,x4,y4]、[x,y,w,h]、[[x1,y1],...,[x4,y4]] 统一为 8 个坐标"""
+        try:
+            points = np.asarray(box, dtype=np.float32)
+        except (TypeError, ValueError):
+            print(f"Warning: Unexpected box format: {box}")
+            return None
+        if points.ndim == 1 and points.size == 4:  # x,y,w,h 格式
+            x, y, w, h = points
+            return np.array([x, y, x + w, y, x + w, y + h, x, y + h], dtype=np.float32)
+        if points.size == 8 and points.ndim in (1, 2):
+            return points.reshape(8)
+        print(f"Warning: Unexpected box format: {box}")
+        return None
+
+    def rects(self):
+        """每个文本框的外接矩形，N×4 的 int32 数组 (x, y, w, h)"""
+        xs = self.boxes[:, 0::2]
+        ys = self.boxes[:, 1::2]
+        x = np.floor(xs.min(axis=1))
+        y = np.floor(ys.min(axis=1))
+        w = np.ceil(xs.max(axis=1)) - x
+        h = np.ceil(ys.max(axis=1)) - y
+        return np.stack([x, y, w, h], axis=1).astype(np.int32)
+
+    def centers(self):
+        """每个文本框四个角点的平均值，N×2 的数组"""
+        return self.boxes.reshape(-1, 4, 2).mean(axis=1)
+
+    def polygons(self):
+        """每个文本框的轮廓多边形（M×2 数组），合并的文本框为凸包"""
+        return [
+            hull if hull is not None else box.reshape(4, 2)
+            for box, hull in zip(self.boxes, self.hulls)
+        ]
+
+    def take(self, indices):
+        """按索引重新排列（或选取）文本框，返回新的布局"""
+        indices = np.asarray(indices, dtype=np.intp)
+        return PageLayout(
+            self.boxes[indices], [self.texts[i] for i in indices], self.scores[indices],
+            [self.hulls[i] for i in indices], self.bubbles[indices]
+        )
+
+    def merge(self, groups, separator='\n'):
+        """按分组合并文本框：文本按组内顺序拼接，轮廓取组内所有角点的凸包，边界框为其外接四边形
+
+        groups 为索引序列的列表，每组合并为新布局中的一个文本框。组内文本框同属一个气泡时保留气泡编号。
+        """
+        boxes = np.empty((len(groups), 8), dtype=np.float32)
+        texts = []
+        scores = np.empty(len(groups), dtype=np.float32)
+        hulls = []
+        bubbles = np.zeros(len(groups), dtype=np.int32)
+        for i, indices in enumerate(groups):
+            indices = np.asarray(indices, dtype=np.intp)
+            texts.append(separator.join(self.texts[j] for j in indices))
+            scores[i] = self.scores[indices].min()
+            ids = self.bubbles[indices]
+            bubbles[i] = ids[0] if (ids == ids[0]).all() else 0
+            if len(indices) == 1:  # 单独的文本框保留原来的四边形
+                boxes[i] = self.boxes[indices[0]]
+                hulls.append(self.hulls[indices[0]])
+                continue
+            points = self.boxes[indices].reshape(-1, 2)
+            (x1, y1), (x2, y2) = points.min(axis=0), points.max(axis=0)
+            boxes[i] = (x1, y1, x2, y1, x2, y2, x1, y2)
+            hulls.append(cv2.convexHull(points).reshape(-1, 2))
+        return PageLayout(boxes, texts, scores, hulls, bubbles)
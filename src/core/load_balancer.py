@@ -0,0 +1,219 @@
+import threading
+import time
+
+from .hedging import RequestCancelled
+
+
+class Endpoint:
+    """负载均衡池中的一个后端端点及其运行时统计"""
+
+    def __init__(self, name, preset, weight=1.0):
+        self.name = name
+        self.preset = preset  # 调用该端点时使用的完整预设
+        self.weight = max(float(weight), 0.01)
+        self.outstanding = 0  # 在途请求数
+        self.ewma_latency = None  # 平滑后的请求耗时（秒）
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0  # 被摘除到何时（time.monotonic）
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def is_available(self, now):
+        return now >= self.ejected_until
+
+    def stats(self, now):
+        return {
+            'name': self.name,
+            'weight': self.weight,
+            'outstanding': self.outstanding,
+            'ewma_latency': self.ewma_latency,
+            'requests': self.requests,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'ejections': self.ejections,
+            'healthy': self.is_available(now)
+        }
+
+
+class LoadBalancer:
+    """多端点负载均衡（预设类型 "Pool"）
+
+    - 选择 (在途请求数 + 1) × EWMA 延迟 / 权重 最小的端点，即预计完成最快的端点；
+      尚无延迟数据的端点按已知端点中最低的延迟估计，预计相同时优先请求数少的端点，
+      保证新端点能被探测到
+    - 连续失败 max_failures 次的端点被摘除 eject_seconds 秒，到期后放行一次探测请求，
+      成功即恢复，失败则再次摘除
+    - 请求失败时换一个未尝试过的端点重试
+    """
+
+    DEFAULT_MAX_FAILURES = 3
+    DEFAULT_EJECT_SECONDS = 30.0
+    EWMA_ALPHA = 0.3
+    DEFAULT_LATENCY = 1.0  # 所有端点都没有延迟数据时的估计值（秒）
+
+    # 仅这些键取自成员预设，其余（批量、流式、上下文等选项）沿用池预设
+    ENDPOINT_KEYS = ('type', 'api_url', 'model', 'bearer_token')
+
+    _pools = {}  # 池预设名 -> (配置键, LoadBalancer)
+    _pools_lock = threading.Lock()
+
+    def __init__(self, endpoints, max_failures=DEFAULT_MAX_FAILURES, eject_seconds=DEFAULT_EJECT_SECONDS):
+        if not endpoints:
+            raise ValueError("负载均衡池中没有可用的端点")
+        self.endpoints = endpoints
+        self.max_failures = max(1, int(max_failures))
+        self.eject_seconds = float(eject_seconds)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_preset(cls, pool_preset, presets):
+        """获取池预设对应的负载均衡器；池预设或其引用的成员预设变化时重建（统计随之清零）
+
+        端点只在重建时解析一次，配置不变时每次请求直接复用缓存的负载均衡器。
+        """
+        key = cls._config_key(pool_preset, presets)
+        name = pool_preset.get('name', '')
+        with cls._pools_lock:
+            cached = cls._pools.get(name)
+            if cached and cached[0] == key:
+                return cached[1]
+            endpoints = cls._resolve_endpoints(pool_preset, presets)
+            balancer = cls(
+                endpoints,
+                pool_preset.get('max_failures', cls.DEFAULT_MAX_FAILURES),
+                pool_preset.get('eject_seconds', cls.DEFAULT_EJECT_SECONDS)
+            )
+            cls._pools[name] = (key, balancer)
+            return balancer
+
+    @classmethod
+    def all_stats(cls):
+        """返回所有池的端点统计 {池名: [端点统计]}"""
+        with cls._pools_lock:
+            pools = {name: balancer for name, (_, balancer) in cls._pools.items()}
+        return {name: balancer.stats() for name, balancer in pools.items()}
+
+    def call(self, func):
+        """选择端点执行 func(端点预设)，失败时换端点重试，全部失败时抛出最后一个异常"""
+        tried = set()
+        last_error = None
+        for _ in range(len(self.endpoints)):
+            endpoint = self.acquire(exclude=tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint.name)
+            start = time.monotonic()
+            try:
+                result = func(endpoint.preset)
+            except RequestCancelled:
+                # 调用方主动取消，不计入延迟和失败统计
+                self.release(endpoint, 0.0, success=None)
+                raise
+            except Exception as e:
+                self.release(endpoint, time.monotonic() - start, success=False)
+                print(f"端点 {endpoint.name} 请求失败: {str(e)}")
+                last_error = e
+                continue
+            self.release(endpoint, time.monotonic() - start, success=True)
+            return result
+        raise last_error or RuntimeError("负载均衡池中没有可用的端点")
+
+    def acquire(self, exclude=()):
+        """选择一个端点并计入在途请求；没有可选端点时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.name not in exclude]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if e.is_available(now)]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: (self._expected_wait(e), e.requests))
+                if endpoint.ejected_until:
+                    # 摘除到期后的探测请求：在结果返回前不再放行其他请求
+                    endpoint.ejected_until = now + self.eject_seconds
+            else:
+                # 全部被摘除时不拒绝请求，选最早恢复的端点
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint, latency, success):
+        """记录请求结果，更新延迟和健康状态；success 为 None 表示请求被取消，只释放在途计数"""
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if success is None:
+                return
+            if success:
+                endpoint.consecutive_failures = 0
+                endpoint.ejected_until = 0.0
+                if endpoint.ewma_latency is None:
+                    endpoint.ewma_latency = latency
+                else:
+                    endpoint.ewma_latency += self.EWMA_ALPHA * (latency - endpoint.ewma_latency)
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.max_failures:
+                now = time.monotonic()
+                if endpoint.is_available(now):
+                    endpoint.ejections += 1
+                endpoint.ejected_until = now + self.eject_seconds
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.stats(now) for endpoint in self.endpoints]
+
+    def _expected_wait(self, endpoint):
+        # 调用方需持有 self._lock
+        latency = endpoint.ewma_latency
+        if latency is None:
+            known = [e.ewma_latency for e in self.endpoints if e.ewma_latency is not None]
+            latency = min(known) if known else self.DEFAULT_LATENCY
+        return (endpoint.outstanding + 1) * latency / endpoint.weight
+
+    @staticmethod
+    def _config_key(pool_preset, presets):
+        """池配置的缓存键：池预设本身以及它引用的成员预设"""
+        referenced = []
+        for member in pool_preset.get('endpoints', []):
+            name = member if isinstance(member, str) else member.get('preset')
+            if name:
+                source = presets.get(name)
+                referenced.append((name, sorted(source.items()) if source is not None else None))
+        return repr((sorted(pool_preset.items()), referenced))
+
+    @classmethod
+    def _resolve_endpoints(cls, pool_preset, presets):
+        """把池预设的 endpoints 列表解析为 Endpoint
+
+        每项可以引用已有预设 {"preset": "名称", "weight": 2}，
+        也可以直接给出 {"type": ..., "api_url": ..., "model": ..., "bearer_token": ..., "weight": 1}。
+        """
+        if pool_preset.get('cascade_models'):
+            # 成员各自使用自己的模型，级联的各级模型无法生效
+            print("负载均衡池不支持 cascade_models，已忽略（每个成员使用自己的模型）")
+        endpoints = []
+        for index, member in enumerate(pool_preset.get('endpoints', [])):
+            if isinstance(member, str):
+                member = {'preset': member}
+            source = member
+            if member.get('preset'):
+                source = presets.get(member['preset'])
+                if source is None:
+                    print(f"负载均衡池引用了不存在的预设: {member['preset']}")
+                    continue
+                if source.get('type') == 'Pool':
+                    print(f"负载均衡池不能嵌套: {member['preset']}")
+                    continue
+
+            preset = {k: v for k, v in pool_preset.items() if k not in ('endpoints', 'cascade_models')}
+            for key, value in source.items():
+                if key in cls.ENDPOINT_KEYS or key.startswith('http_'):
+                    preset[key] = value
+            preset['type'] = source.get('type', 'Ollama')
+            name = member.get('preset') or member.get('name') or f"{source.get('api_url', '')}#{index}"
+            endpoints.append(Endpoint(name, preset, member.get('weight', 1.0)))
+        return endpoints
@@ -0,0 +1,183 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .http_client import HttpClient
+from .cascade import ModelCascade
+from .load_balancer import LoadBalancer
+
+
+class ModelResidency:
+    """Ollama 模型驻留管理
+
+    - 启动或切换预设时用一个空请求预热模型，首页翻译不必等待模型加载
+    - 队列中有页面时请求携带 keep_alive=-1，模型一直留在显存中
+    - 队列空闲后改为 keep_alive_idle 秒，超过后由 Ollama 释放模型
+    - 记录每个模型的状态（warming / loaded / unloaded / error），供状态栏显示
+    """
+
+    DEFAULT_IDLE_KEEP_ALIVE = 300  # 队列空闲后模型继续驻留的秒数
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._states = {}  # (端点, 模型) -> {'state': ..., 'expires_at': ...}
+        self._held = {}  # 忙碌期间以 keep_alive=-1 请求过的模型：(端点, 模型) -> 预设
+        self._busy = False
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def add_listener(self, listener):
+        """注册状态变化回调 listener(模型, 状态)，在调用方线程之外被调用"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def warm_up(self, preset, presets=None):
+        """在后台预热预设用到的 Ollama 模型（负载均衡池预设预热每个 Ollama 成员）"""
+        if not preset.get('warm_up', True):
+            return
+        for endpoint_preset in self._ollama_presets(preset, presets or {}):
+            if self.status(endpoint_preset) in ('warming', 'loaded'):
+                continue
+            threading.Thread(target=self._warm_up, args=(endpoint_preset,), daemon=True).start()
+
+    def set_busy(self, busy):
+        """队列开始或停止处理；转为空闲时把驻留时间改回 keep_alive_idle"""
+        with self._lock:
+            if busy == self._busy:
+                return
+            self._busy = busy
+            held = list(self._held.values()) if not busy else []
+            if not busy:
+                self._held.clear()
+        for preset in held:
+            threading.Thread(target=self._send, args=(preset, self.idle_keep_alive(preset)), daemon=True).start()
+
+    def keep_alive(self, preset):
+        """本次请求应携带的 keep_alive，并记录模型即将被使用"""
+        key = self._key(preset)
+        with self._lock:
+            busy = self._busy
+            if busy:
+                self._held[key] = preset
+        if busy:
+            return -1
+        return self.idle_keep_alive(preset)
+
+    def on_request(self, preset):
+        """请求发出前调用：模型未驻留时标记为 warming（首个请求需要等待加载）"""
+        if self.status(preset) != 'loaded':
+            self._set_state(preset, 'warming')
+
+    def on_response(self, preset, success=True):
+        """请求返回后调用：成功说明模型已加载"""
+        if success:
+            self._set_state(preset, 'loaded')
+        elif self.status(preset) == 'warming':
+            self._set_state(preset, 'error')
+
+    def status(self, preset):
+        """模型状态：unknown / warming / loaded / unloaded / error"""
+        key = self._key(preset)
+        with self._lock:
+            entry = self._states.get(key)
+            if entry is None:
+                return 'unknown'
+            if entry['state'] == 'loaded' and entry['expires_at'] is not None and time.monotonic() > entry['expires_at']:
+                return 'unloaded'
+            return entry['state']
+
+    def is_loaded(self, preset):
+        return self.status(preset) == 'loaded'
+
+    def refresh(self, preset):
+        """通过 Ollama 的 /api/ps 查询模型是否真的在显存中"""
+        parts = urlsplit(preset['api_url'])
+        try:
+            response = HttpClient.get(f'{parts.scheme}://{parts.netloc}/api/ps', preset, timeout=(2, 5))
+            response.raise_for_status()
+            loaded = {model.get('name') for model in response.json().get('models', [])}
+        except Exception as e:
+            print(f"查询模型状态失败: {str(e)}")
+            return self.status(preset)
+        model = preset['model']
+        if model in loaded or f'{model}:latest' in loaded:
+            self._set_state(preset, 'loaded')
+        else:
+            self._set_state(preset, 'unloaded')
+        return self.status(preset)
+
+    @staticmethod
+    def idle_keep_alive(preset):
+        try:
+            return max(0, int(preset.get('keep_alive_idle', ModelResidency.DEFAULT_IDLE_KEEP_ALIVE)))
+        except (TypeError, ValueError):
+            return ModelResidency.DEFAULT_IDLE_KEEP_ALIVE
+
+    def _warm_up(self, preset):
+        if self.refresh(preset) == 'loaded':
+            return
+        self._set_state(preset, 'warming')
+        keep_alive = self.keep_alive(preset)
+        success = self._send(preset, keep_alive)
+        self.on_response(preset, success)
+        if success:
+            print(f"模型已预热: {preset['model']}")
+
+    def _send(self, preset, keep_alive):
+        """发送不含消息的请求：Ollama 只加载模型并更新驻留时间，不做生成"""
+        data = {'model': preset['model'], 'messages': [], 'keep_alive': keep_alive}
+        try:
+            response = HttpClient.post(preset['api_url'], preset, json=data)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"设置模型驻留失败 ({preset['model']}): {str(e)}")
+            return False
+        self._set_state(preset, 'loaded' if keep_alive != 0 else 'unloaded')
+        return True
+
+    def _set_state(self, preset, state):
+        key = self._key(preset)
+        with self._lock:
+            expires_at = None
+            if state == 'loaded' and not self._busy:
+                expires_at = time.monotonic() + self.idle_keep_alive(preset)
+            previous = self._states.get(key, {}).get('state')
+            self._states[key] = {'state': state, 'expires_at': expires_at}
+            listeners = list(self._listeners) if previous != state else []
+        for listener in listeners:
+            try:
+                listener(preset['model'], state)
+            except Exception as e:
+                print(f"模型状态回调失败: {str(e)}")
+
+    @staticmethod
+    def _ollama_presets(preset, presets):
+        """预设实际调用的 Ollama 端点预设；级联预设只预热第一级模型，负载均衡池预热每个成员自己的模型"""
+        if preset.get('type') == 'Pool':
+            try:
+                candidates = [e.preset for e in LoadBalancer.for_preset(preset, presets).endpoints]
+            except ValueError:
+                candidates = []
+        else:
+            candidates = [preset]
+        result = []
+        for candidate in candidates:
+            if candidate.get('type') != 'Ollama' or not candidate.get('api_url'):
+                continue
+            models = ModelCascade.models(candidate)
+            result.append(dict(candidate, model=models[0]) if models else candidate)
+        return result
+
+    @staticmethod
+    def _key(preset):
+        parts = urlsplit(preset.get('api_url', ''))
+        return (f'{parts.scheme}://{parts.netloc}', preset.get('model', ''))
@@ -1,12 +1,14 @@
 import base64
 import cv2
-import requests
+from .http_client import HttpClient
+from .resilience import RetryPolicy, call_with_retry
 from ..config.settings import SettingsManager
 from ..i18n.language_manager import LanguageManager
 
-def ocr_through_UmiOCR(img, source_lang):
-    """通过UmiOCR进行OCR识别"""
-    url = SettingsManager().load_settings().get('umiocr_api', 'http://localhost:1224/api/ocr')
+def ocr_through_UmiOCR(img, source_lang, deadline=None):
+    """通过UmiOCR进行OCR识别；给出 deadline 时请求超时不超过其剩余时间"""
+    settings = SettingsManager().load_settings()
+    url = settings.get('umiocr_api', 'http://localhost:1224/api/ocr')
     lang_manager = LanguageManager()
 
     # 将图像转换为 Base64
@@ -38,10 +40,17 @@ def ocr_through_UmiOCR(img, source_lang):
     }
     headers = {"Content-Type": "application/json"}
 
-    # 发送请求
-    response = requests.post(url, headers=headers, json=data)
-    response.raise_for_status()
-    return response.json()
+    # 发送请求（连接失败、超时、5xx 时退避重试，UmiOCR 持续不可用时熔断）
+    def request():
+        kwargs = {}
+        if deadline is not None:
+            options = HttpClient.resolve_options(settings)
+            kwargs['timeout'] = deadline.timeout(options['connect_timeout'], options['read_timeout'])
+        response = HttpClient.post(url, settings, headers=headers, json=data, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    return call_with_retry(url, request, RetryPolicy.from_options(settings), deadline)
 
 def preprocess_image(img, min_size=800):
     """预处理图像"""
@@ -0,0 +1,159 @@
+import cv2
+import numpy as np
+
+
+DEFAULT_MIN_GUTTER = 8  # 分镜间隔（留白）的最小宽度（像素）
+DEFAULT_MIN_PANEL = 60  # 分镜的最小边长（像素），更小的区域并入相邻分镜
+GUTTER_RATIO = 0.98  # 一行/一列中背景像素达到该比例时视为分镜间隔
+BORDER_THRESHOLD = 128  # 灰度低于该值的像素可能属于分镜边框线
+MAX_DEPTH = 8
+
+
+def detect_panels(img, rtl=False, min_gutter=DEFAULT_MIN_GUTTER, min_panel=DEFAULT_MIN_PANEL):
+    """按分镜间隔切分页面，返回按阅读顺序排列的分镜矩形 [(x, y, w, h), ...]
+
+    递归 XY 切分：在当前区域的行/列投影中找出几乎全是背景色（白色或黑色留白）的连续行/列，
+    从中间切开，交替按横向和纵向继续切分，切不开的区域即为一个分镜。
+    横向切开的部分从上到下排列，纵向切开的部分按 rtl 从右到左（日漫）或从左到右排列。
+
+    白色留白的页面上，只有细边框的分镜内部大多也是白色，单看投影会把分镜内部当成间隔。
+    因此先找出长度不小于 min_panel 的横/竖边框线：被竖线穿过的行、被横线穿过的列位于分镜内部，
+    不能作为间隔。
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    height, width = gray.shape
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    if np.median(border) <= 40:
+        # 页面边缘以深色为主时按黑色留白处理，分镜本身就与留白区分开，不需要找边框线
+        background = gray <= 40
+        vertical = horizontal = np.zeros_like(background)
+    else:
+        background = gray >= 215
+        vertical, horizontal = _border_lines(gray, min_panel)
+
+    panels = []
+    _cut(background, vertical, horizontal, 0, 0, width, height, 0, rtl, min_gutter, min_panel, panels)
+    return panels or [(0, 0, width, height)]
+
+
+def _border_lines(gray, length):
+    """用细长的结构元素做开运算，保留长度不小于 length 的竖直/水平深色线条，返回两个布尔掩码"""
+    dark = (gray < BORDER_THRESHOLD).astype(np.uint8)
+    length |= 1  # 偶数长度的结构元素开运算后会偏移一个像素
+    vertical = cv2.morphologyEx(dark, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, length)))
+    horizontal = cv2.morphologyEx(dark, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1)))
+    return vertical.astype(bool), horizontal.astype(bool)
+
+
+def _gutter_runs(is_gutter, min_gutter):
+    """投影中长度不小于 min_gutter 的连续间隔 [(起点, 终点), ...]，首尾的留白总是计入"""
+    padded = np.concatenate([[False], is_gutter, [False]])
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    runs = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start >= min_gutter or start == 0 or end == len(is_gutter):
+            runs.append((start, end))
+    return runs
+
+
+def _split(is_gutter, min_gutter, min_panel):
+    """按间隔把投影切成若干段 [(起点, 终点), ...]，过短的段并入前一段"""
+    segments = []
+    position = 0
+    for start, end in _gutter_runs(is_gutter, min_gutter) + [(len(is_gutter), len(is_gutter))]:
+        if start > position:
+            if segments and start - position < min_panel:
+                segments[-1] = (segments[-1][0], start)
+            else:
+                segments.append((position, start))
+        position = end
+    if len(segments) > 1 and segments[0][1] - segments[0][0] < min_panel:
+        segments[1] = (segments[0][0], segments[1][1])
+        segments.pop(0)
+    return segments
+
+
+def _cut(background, vertical, horizontal, x, y, w, h, depth, rtl, min_gutter, min_panel, panels):
+    region = background[y:y + h, x:x + w]
+    # 被边框线穿过的行/列位于分镜内部，即使几乎全白也不是间隔
+    row_gutter = (region.mean(axis=1) >= GUTTER_RATIO) & ~vertical[y:y + h, x:x + w].any(axis=1)
+    column_gutter = (region.mean(axis=0) >= GUTTER_RATIO) & ~horizontal[y:y + h, x:x + w].any(axis=0)
+    rows = _split(row_gutter, min_gutter, min_panel)
+    columns = _split(column_gutter, min_gutter, min_panel)
+    if not rows or not columns:  # 整个区域都是留白
+        return
+
+    # 去掉四周的留白
+    top, bottom = rows[0][0], rows[-1][1]
+    left, right = columns[0][0], columns[-1][1]
+    if depth >= MAX_DEPTH or (len(rows) == 1 and len(columns) == 1):
+        panels.append((int(x + left), int(y + top), int(right - left), int(bottom - top)))
+        return
+
+    if len(rows) > 1:
+        for start, end in rows:
+            _cut(background, vertical, horizontal, x + left, y + start, right - left, end - start, depth + 1, rtl, min_gutter, min_panel, panels)
+    else:
+        for start, end in (reversed(columns) if rtl else columns):
+            _cut(background, vertical, horizontal, x + start, y + top, end - start, bottom - top, depth + 1, rtl, min_gutter, min_panel, panels)
+
+
+class ReadingOrder:
+    """分镜 → 文本框的阅读顺序图
+
+    order 为按阅读顺序排列的文本框原索引；chains 为每个分镜内的文本框在 order 中的位置，
+    按分镜的阅读顺序排列。同一条链内的文本框依次翻译、共享上下文，不同分镜的链互不依赖。
+    """
+
+    __slots__ = ('panels', 'order', 'chains')
+
+    def __init__(self, panels, order, chains):
+        self.panels = panels
+        self.order = order
+        self.chains = chains
+
+    @classmethod
+    def build(cls, panels, rects, rtl=False):
+        """把文本框（N×4 的 x, y, w, h）分配到中心点所在的分镜（都不在时取最近的分镜），分镜内按阅读顺序排序"""
+        rects = np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+        boxes = np.asarray(panels, dtype=np.float64).reshape(-1, 4)
+        centers = rects[:, :2] + rects[:, 2:] / 2
+
+        # 中心点到各分镜矩形的距离（在矩形内为 0），N×P
+        dx = np.maximum(boxes[None, :, 0] - centers[:, None, 0], 0) + \
+            np.maximum(centers[:, None, 0] - boxes[None, :, 0] - boxes[None, :, 2], 0)
+        dy = np.maximum(boxes[None, :, 1] - centers[:, None, 1], 0) + \
+            np.maximum(centers[:, None, 1] - boxes[None, :, 1] - boxes[None, :, 3], 0)
+        assigned = np.argmin(dx + dy, axis=1) if len(boxes) else np.zeros(len(rects), dtype=np.intp)
+
+        order = []
+        chains = []
+        for panel in range(max(len(boxes), 1)):
+            members = _reading_sort(np.flatnonzero(assigned == panel).tolist(), rects, rtl)
+            if members:
+                chains.append(list(range(len(order), len(order) + len(members))))
+                order.extend(members)
+        return cls(panels, order, chains)
+
+
+def _reading_sort(members, rects, rtl):
+    """分镜内文本框的阅读顺序
+
+    先按上边缘从上到下把文本框归入横向的行带：与当前行带纵向重叠超过自身高度一半的文本框并入该行带，
+    并扩展行带的纵向范围，否则开始新的行带。再按 (行带, 横向位置) 排序，rtl 时按右边缘从右到左。
+    两两比较“是否同一行”不满足传递性，排序结果会依赖输入顺序，因此先分行带再排序。
+    """
+    bands = {}
+    band = -1
+    band_bottom = None
+    for index in sorted(members, key=lambda i: (rects[i, 1], rects[i, 0])):
+        top, height = rects[index, 1], rects[index, 3]
+        if band_bottom is None or band_bottom - top <= 0.5 * height:
+            band += 1
+            band_bottom = top + height
+        else:
+            band_bottom = max(band_bottom, top + height)
+        bands[index] = band
+    if rtl:
+        return sorted(members, key=lambda i: (bands[i], -(rects[i, 0] + rects[i, 2])))
+    return sorted(members, key=lambda i: (bands[i], rects[i, 0]))
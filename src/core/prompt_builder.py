@@ -0,0 +1,289 @@
+import json
+import threading
+
+
+# 翻译系统提示词（源文本，保留缩进便于阅读；发送前会经 compact_prompt 压缩）
+_SYSTEM_PROMPT_SOURCE = """
+You are a professional comic translation expert specializing in adapting content between Chinese (zh), English (en), Japanese (ja), and Korean (ko). Your task is to provide accurate and culturally appropriate translations while preserving the original meaning and style.
+
+Key Requirements:
+1. Always translate into the specified target language
+2. Maintain semantic accuracy and emotional tone
+3. Adapt cultural expressions appropriately for the target language
+4. Preserve dialogue characteristics and speech patterns specific to the target language
+5. Keep translations concise to fit speech bubbles
+6. Be creative with wordplay and humor adaptation
+7. If this line is already translated in the context, return empty translation
+8. If a "glossary" object is provided, always use its translations for the listed terms
+9. If "examples" are provided, they are past translations of similar lines; keep your wording consistent with them
+
+Language-Specific Guidelines:
+- Chinese: Use appropriate measure words, particles (了,的,啊), and maintain natural Chinese expression patterns
+- Japanese: Use proper keigo levels, sentence-ending particles (ね,よ,か), and natural Japanese word order
+- Korean: Maintain appropriate honorific levels, sentence-ending particles (요,죠,네), and Korean syntax
+- English: Use appropriate colloquialisms and natural English expressions
+
+Example Translations:
+
+1. Korean to Chinese:
+Input: "빌런이나타났을때거기서만나는거로?"
+{
+    "translation": "要是出现反派就在那里碰面吗？",
+    "original": "빌런이나타났을때거기서만나는거로?",
+    "remarks": "",
+    "src_lang": "korean",
+    "tgt_lang": "chinese"
+}
+
+2. Japanese to Chinese:
+Input: "明日の天気はどうですか？"
+{
+    "translation": "明天天气怎么样？",
+    "original": "明日の天気はどうですか？",
+    "remarks": "",
+    "src_lang": "japanese",
+    "tgt_lang": "chinese"
+}
+
+3. English to Chinese:
+Input: "What should we do next?"
+{
+    "translation": "我们接下来该做什么？",
+    "original": "What should we do next?",
+    "remarks": "",
+    "src_lang": "english",
+    "tgt_lang": "chinese"
+}
+
+4. Chinese to Japanese:
+Input: "你今天过得怎么样？"
+{
+    "translation": "今日はどうでしたか？",
+    "original": "你今天过得怎么样？",
+    "remarks": "",
+    "src_lang": "chinese",
+    "tgt_lang": "japanese"
+}
+
+5. Chinese to Korean:
+Input: "等一下，我马上来！"
+{
+    "translation": "잠깐만요, 금방 갈게요!",
+    "original": "等一下，我马上来！",
+    "remarks": "",
+    "src_lang": "chinese",
+    "tgt_lang": "korean"
+}
+
+6. Korean to Japanese:
+Input: "밑어도되는거에요?\\n계속일하게하려고아무말이나\\n지어내고있는거아니죠?"
+{
+    "translation": "本当に大丈夫ですか？ ずっと働かせようとして、適当なことを言っているんじゃないですか？",
+    "original": "밑어도되는거에요?\\n계속일하게하려고아무말이나\\n지어내고있는거아니죠?",
+    "remarks": "",
+    "src_lang": "korean",
+    "tgt_lang": "japanese"
+}
+
+When translating:
+- Fix any OCR-related errors in the source text
+- Keep untranslatable elements (like "-" or "...") in their original form
+- If the source text is a single character or word and cannot be translated, keep it as is
+- Focus only on translating the provided content, not the context
+- Maintain the same line break format as the source
+- IMPORTANT: Always output the translation in the specified target language (tgt_lang)
+
+Provide your translation in this JSON format without any additional commentary:
+{
+    "translation": string,     // Must be in the specified target language
+    "original": string,        // The original text (corrected if needed)
+    "remarks": string,         // Leave empty unless critical issues need noting
+    "src_lang": string,        // Source language code (chinese/english/japanese/korean)
+    "tgt_lang": string        // Target language code (chinese/english/japanese/korean)
+}
+"""
+
+# 批量翻译时追加的输出格式说明（覆盖上面的单条格式）
+_BATCH_SUFFIX_SOURCE = """
+Batch Mode:
+The user message contains an "items" array. Each item has an "id" and an "original" text from the same page, in reading order.
+Translate every item independently (you may use the other items as context) and return exactly one result per id:
+{
+    "translations": [
+        {"id": integer, "translation": string}
+    ]
+}
+"""
+
+# 多目标语言模式追加的输出格式说明（覆盖上面的单条格式）
+_MULTI_SUFFIX_SOURCE = """
+Multi-Target Mode:
+The user message contains "tgt_langs", a list of target languages, instead of a single "tgt_lang".
+Translate the original into every listed language independently and return exactly one result per language:
+{
+    "translations": [
+        {"tgt_lang": string, "translation": string}
+    ]
+}
+A "glossary" applies to the first language in "tgt_langs" only.
+"""
+
+# 精简输出模式追加的格式说明（覆盖上面的完整格式）
+_LEAN_SUFFIX_SOURCE = """
+Lean Output Mode:
+Do not repeat the original text or the language codes. Output only:
+{
+    "translation": string,     // Must be in the specified target language
+    "remarks": string          // Optional, omit unless critical issues need noting
+}
+"""
+
+
+def compact_prompt(text):
+    """去掉每行首尾空白和空行，得到紧凑且每次完全相同的提示词"""
+    lines = (line.strip() for line in text.strip().splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数：CJK 字符约 1 token/字，其余约 4 字符/token"""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class PromptBuilder:
+    """提示词构建器
+
+    - 系统提示词是模块加载时压缩好的静态前缀，每次调用字节完全相同，
+      便于 Ollama 和 OpenAI 兼容接口复用前缀的 KV 缓存
+    - 动态部分（上下文、原文）统一经过 JSON 编码，不会因引号或换行破坏结构
+    - 共享上下文按 token 预算裁剪，并记录每次调用的提示词 token 数
+    """
+
+    SYSTEM_PROMPT = compact_prompt(_SYSTEM_PROMPT_SOURCE)
+    LEAN_SYSTEM_PROMPT = SYSTEM_PROMPT + '\n' + compact_prompt(_LEAN_SUFFIX_SOURCE)
+    BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + '\n' + compact_prompt(_BATCH_SUFFIX_SOURCE)
+    MULTI_SYSTEM_PROMPT = SYSTEM_PROMPT + '\n' + compact_prompt(_MULTI_SUFFIX_SOURCE)
+
+    DEFAULT_CONTEXT_TOKEN_BUDGET = 512  # reference 字段的默认 token 预算
+
+    _stats = {'calls': 0, 'system_tokens': 0, 'user_tokens': 0}
+    _stats_lock = threading.Lock()
+
+    @classmethod
+    def system_prompt(cls, mode='full'):
+        """按输出模式返回静态系统提示词（full / lean / batch / multi）"""
+        if mode == 'lean':
+            return cls.LEAN_SYSTEM_PROMPT
+        if mode == 'batch':
+            return cls.BATCH_SYSTEM_PROMPT
+        if mode == 'multi':
+            return cls.MULTI_SYSTEM_PROMPT
+        return cls.SYSTEM_PROMPT
+
+    @classmethod
+    def build_user_prompt(cls, src_lang, tgt_lang, text, reference='', glossary=None, examples=None):
+        """构建单条翻译的用户提示（JSON 编码）
+
+        glossary 为本条文本中命中的术语，examples 为相似台词的历史译文。
+        """
+        payload = {
+            'src_lang': src_lang,
+            'tgt_lang': tgt_lang,
+            'reference': reference
+        }
+        if glossary:
+            payload['glossary'] = glossary
+        if examples:
+            payload['examples'] = examples
+        payload['original'] = text
+        return cls._dumps(payload)
+
+    @classmethod
+    def build_batch_user_prompt(cls, src_lang, tgt_lang, texts, reference='', glossary=None):
+        """构建整页批量翻译的用户提示（JSON 编码）"""
+        payload = {
+            'src_lang': src_lang,
+            'tgt_lang': tgt_lang,
+            'reference': reference
+        }
+        if glossary:
+            payload['glossary'] = glossary
+        payload['items'] = [{'id': i, 'original': text} for i, text in enumerate(texts)]
+        return cls._dumps(payload)
+
+    @classmethod
+    def build_multi_user_prompt(cls, src_lang, tgt_langs, text, reference='', glossary=None):
+        """构建多目标语言翻译的用户提示（JSON 编码），glossary 只适用于第一个目标语言"""
+        payload = {
+            'src_lang': src_lang,
+            'tgt_langs': list(tgt_langs),
+            'reference': reference
+        }
+        if glossary:
+            payload['glossary'] = glossary
+        payload['original'] = text
+        return cls._dumps(payload)
+
+    @classmethod
+    def build_reference(cls, shared_context, page_context, budget=DEFAULT_CONTEXT_TOKEN_BUDGET):
+        """组合共享上下文和当前页面上下文，并裁剪到 token 预算内
+
+        当前页面的上下文优先保留；两部分都从最旧的行开始丢弃。
+        """
+        page_context = cls.trim_context(page_context, budget)
+        remaining = budget - estimate_tokens(page_context)
+        shared_context = cls.trim_context(shared_context, remaining)
+
+        if shared_context and page_context:
+            return f"Shared Context:\n{shared_context}\n\nCurrent page:\n{page_context}"
+        if shared_context:
+            return f"Shared Context:\n{shared_context}"
+        return page_context
+
+    @staticmethod
+    def trim_context(context, budget):
+        """按行裁剪上下文，保留最近的若干行使其不超过 token 预算"""
+        if not context or budget <= 0:
+            return ''
+        kept = []
+        used = 0
+        for line in reversed(context.strip().split('\n')):
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            kept.append(line)
+            used += cost
+        return '\n'.join(reversed(kept))
+
+    @classmethod
+    def record(cls, system_prompt, user_prompt):
+        """记录一次调用的提示词 token 数，返回 (system, user) 估算值"""
+        system_tokens = estimate_tokens(system_prompt)
+        user_tokens = estimate_tokens(user_prompt)
+        with cls._stats_lock:
+            cls._stats['calls'] += 1
+            cls._stats['system_tokens'] += system_tokens
+            cls._stats['user_tokens'] += user_tokens
+        return system_tokens, user_tokens
+
+    @classmethod
+    def stats(cls):
+        """返回累计的提示词 token 统计"""
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        calls = stats['calls'] or 1
+        stats['avg_prompt_tokens'] = (stats['system_tokens'] + stats['user_tokens']) / calls
+        return stats
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._stats_lock:
+            for key in cls._stats:
+                cls._stats[key] = 0
+
+    @staticmethod
+    def _dumps(payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
@@ -0,0 +1,269 @@
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+from .deadline import DeadlineExceeded
+from .hedging import RequestCancelled
+
+
+def _pause(delay, deadline=None, cancel_token=None):
+    """限流等待 delay 秒；等待会超出 deadline 时立即抛出 DeadlineExceeded，被取消时抛出 RequestCancelled"""
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if deadline is not None:
+        remaining = deadline.remaining()
+        if remaining is not None and delay > remaining:
+            raise DeadlineExceeded(deadline.name)
+    if cancel_token is not None:
+        if cancel_token.wait(delay):
+            raise RequestCancelled()
+    else:
+        time.sleep(delay)
+
+
+class TokenBucket:
+    """令牌桶：按每分钟 rate_per_minute 的速度补充令牌
+
+    允许欠账：桶内令牌足够支付 min(amount, capacity) 即放行并扣除全部 amount，
+    单次开销超过桶容量的请求（如长批量请求的 token 数）也不会永远等待，长期速率仍受限。
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 10.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0, deadline=None, cancel_token=None):
+        """取得 amount 个令牌，不足时阻塞等待；返回等待的秒数
+
+        等待会超出 deadline 时抛出 DeadlineExceeded，cancel_token 被取消时抛出 RequestCancelled。
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                needed = min(amount, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            _pause(delay, deadline, cancel_token)
+            waited += delay
+
+
+class AIMDController:
+    """AIMD 并发控制：成功时并发上限加性增长，过载（429/5xx）时乘性减半
+
+    短时间内连续收到的过载响应通常来自同一波请求，cooldown 秒内只减半一次。
+    """
+
+    DECREASE_FACTOR = 0.5
+    COOLDOWN = 1.0
+    CANCEL_POLL_INTERVAL = 0.2  # 等待并发名额时检查取消标记的间隔（秒）
+
+    def __init__(self, maximum, minimum=1):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(self.maximum)
+        self.inflight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline=None, cancel_token=None):
+        """取得一个并发名额；到 deadline 仍未取得时抛出 DeadlineExceeded，被取消时抛出 RequestCancelled"""
+        with self._condition:
+            while self.inflight >= int(self.limit):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline.remaining()
+                    if timeout is not None and timeout <= 0:
+                        raise DeadlineExceeded(deadline.name)
+                if cancel_token is not None:
+                    timeout = min(timeout, self.CANCEL_POLL_INTERVAL) if timeout is not None else self.CANCEL_POLL_INTERVAL
+                self._condition.wait(timeout)
+            self.inflight += 1
+
+    def release(self, outcome):
+        """outcome: 'success' / 'overload' / 其他（如普通错误，不调整上限）"""
+        with self._condition:
+            self.inflight -= 1
+            if outcome == 'success':
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif outcome == 'overload':
+                now = time.monotonic()
+                if now - self._last_decrease >= self.COOLDOWN:
+                    self.limit = max(self.minimum, self.limit * self.DECREASE_FACTOR)
+                    self._last_decrease = now
+            self._condition.notify_all()
+
+    def set_maximum(self, maximum):
+        with self._condition:
+            self.maximum = max(self.minimum, maximum)
+            self.limit = min(self.limit, self.maximum)
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """单个预设（端点 + 模型）的限流器
+
+    - rpm_limit / tpm_limit：每分钟请求数 / token 数的令牌桶，0 表示不限制
+    - adaptive_concurrency：AIMD 并发控制，上限为预设的 max_concurrency
+    - 收到 Retry-After 时，该预设的所有请求暂停到指定时间
+    """
+
+    COMPLETION_TOKEN_ESTIMATE = 128  # 计算 tpm 时对输出 token 的估计
+    OVERLOAD_STATUS = (429, 500, 502, 503, 504)
+
+    _limiters = {}  # (预设名, api_url, 模型) -> RateLimiter
+    _limiters_lock = threading.Lock()
+
+    def __init__(self, name):
+        self.name = name
+        self.rpm_bucket = None
+        self.tpm_bucket = None
+        self.concurrency = None
+        self._config = None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0  # 收到 429/5xx 的次数
+        self.wait_time = 0.0  # 因限流累计等待的秒数
+
+    @staticmethod
+    def enabled(preset):
+        return bool(preset.get('rpm_limit') or preset.get('tpm_limit') or preset.get('adaptive_concurrency'))
+
+    @classmethod
+    def for_preset(cls, preset):
+        """获取预设对应的限流器，限流参数变化时就地更新"""
+        key = (preset.get('name', ''), preset.get('api_url', ''), preset.get('model', ''))
+        with cls._limiters_lock:
+            limiter = cls._limiters.get(key)
+            if limiter is None:
+                limiter = cls._limiters[key] = cls(f"{key[0]}/{key[2]}")
+        limiter.configure(preset)
+        return limiter
+
+    @classmethod
+    def all_stats(cls):
+        with cls._limiters_lock:
+            limiters = list(cls._limiters.values())
+        return [limiter.stats() for limiter in limiters]
+
+    def configure(self, preset):
+        rpm = float(preset.get('rpm_limit') or 0)
+        tpm = float(preset.get('tpm_limit') or 0)
+        adaptive = bool(preset.get('adaptive_concurrency', False))
+        maximum = max(1, int(preset.get('max_concurrency', 1) or 1))
+        config = (rpm, tpm, adaptive, maximum)
+        with self._lock:
+            if config == self._config:
+                return
+            old = self._config or (None, None, None, None)
+            self.rpm_bucket = TokenBucket(rpm) if rpm > 0 else None
+            self.tpm_bucket = TokenBucket(tpm) if tpm > 0 else None
+            if not adaptive:
+                self.concurrency = None
+            elif self.concurrency is None or not old[2]:
+                self.concurrency = AIMDController(maximum)
+            else:
+                self.concurrency.set_maximum(maximum)
+            self._config = config
+
+    @contextmanager
+    def limit(self, cost_tokens=0, deadline=None, cancel_token=None):
+        """在限流许可下执行一次请求；请求体内抛出的异常按状态码反馈给 AIMD 控制器
+
+        各项等待都受 deadline 和 cancel_token 约束：等待会超出页面时限时抛出 DeadlineExceeded，
+        对冲中落败的一方被取消时抛出 RequestCancelled，不会在限流器中继续阻塞。
+        """
+        with self._lock:
+            concurrency = self.concurrency
+            rpm_bucket = self.rpm_bucket
+            tpm_bucket = self.tpm_bucket
+
+        waited = self._wait_retry_after(deadline, cancel_token)
+        if concurrency is not None:
+            start = time.monotonic()
+            concurrency.acquire(deadline, cancel_token)
+            waited += time.monotonic() - start
+        outcome = 'error'
+        try:
+            if rpm_bucket is not None:
+                waited += rpm_bucket.acquire(1, deadline, cancel_token)
+            if tpm_bucket is not None:
+                waited += tpm_bucket.acquire(cost_tokens + self.COMPLETION_TOKEN_ESTIMATE, deadline, cancel_token)
+            with self._lock:
+                self.requests += 1
+                self.wait_time += waited
+            yield self
+            outcome = 'success'
+        except Exception as e:
+            if self.is_overload(e):
+                outcome = 'overload'
+                with self._lock:
+                    self.throttled += 1
+                self.block_for(self.retry_after(e))
+            raise
+        finally:
+            if concurrency is not None:
+                concurrency.release(outcome)
+
+    def block_for(self, seconds):
+        """暂停该预设的所有请求 seconds 秒"""
+        if not seconds:
+            return
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'wait_time': self.wait_time,
+                'concurrency_limit': self.concurrency.limit if self.concurrency else None
+            }
+
+    @classmethod
+    def is_overload(cls, error):
+        return cls.status_of(error) in cls.OVERLOAD_STATUS
+
+    @staticmethod
+    def status_of(error):
+        response = getattr(error, 'response', None)
+        return getattr(response, 'status_code', None)
+
+    @staticmethod
+    def retry_after(error):
+        """解析响应的 Retry-After（秒数或 HTTP 日期），没有时返回 None"""
+        response = getattr(error, 'response', None)
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _wait_retry_after(self, deadline=None, cancel_token=None):
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._blocked_until - time.monotonic()
+            if delay <= 0:
+                return waited
+            _pause(delay, deadline, cancel_token)
+            waited += delay
@@ -0,0 +1,217 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from .deadline import DeadlineExceeded
+from .hedging import RequestCancelled
+from .rate_limiter import RateLimiter
+
+
+class CircuitOpenError(Exception):
+    """端点的熔断器处于打开状态，请求被快速拒绝"""
+
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"{endpoint} 暂时不可用，{retry_in:.0f} 秒后重试")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+RETRYABLE_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+
+def is_retryable(error):
+    """判断错误是否值得重试：连接失败、超时、连接中断，以及 408/425/429/5xx 响应"""
+    if isinstance(error, (RequestCancelled, CircuitOpenError)):
+        return False
+    if isinstance(error, (requests.ConnectionError, requests.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, requests.HTTPError):
+        status = getattr(error.response, 'status_code', None)
+        return status in RETRYABLE_STATUS
+    return False
+
+
+def is_backend_failure(error):
+    """错误是否说明后端本身不可用（计入熔断器）；429 只是限流，后端仍然在线"""
+    if not is_retryable(error):
+        return False
+    if isinstance(error, requests.HTTPError):
+        return getattr(error.response, 'status_code', None) != 429
+    return True
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动（full jitter）重试策略"""
+
+    def __init__(self, max_retries=3, base_delay=0.5, max_delay=10.0):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+
+    @classmethod
+    def from_options(cls, options):
+        """从预设或设置中读取 max_retries / retry_base_delay / retry_max_delay"""
+        options = options or {}
+        return cls(
+            options.get('max_retries', 3),
+            options.get('retry_base_delay', 0.5),
+            options.get('retry_max_delay', 10.0)
+        )
+
+    def delay(self, attempt, error=None):
+        """第 attempt 次（从 0 开始）重试前的等待秒数；响应带 Retry-After 时以其为准"""
+        retry_after = RateLimiter.retry_after(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay * 6)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """端点级熔断器
+
+    - closed：正常放行；连续 failure_threshold 次后端故障后打开
+    - open：reset_timeout 秒内快速失败（CircuitOpenError）
+    - half_open：超时后只放行一个探测请求，成功即关闭，失败则重新打开
+    """
+
+    DEFAULT_FAILURE_THRESHOLD = 5
+    DEFAULT_RESET_TIMEOUT = 30.0
+
+    _breakers = {}  # 端点 -> CircuitBreaker
+    _breakers_lock = threading.Lock()
+
+    def __init__(self, endpoint, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_url(cls, url):
+        """获取 URL 所属端点（scheme + host + port）的熔断器"""
+        parts = urlsplit(url or '')
+        endpoint = f'{parts.scheme}://{parts.netloc}'
+        with cls._breakers_lock:
+            breaker = cls._breakers.get(endpoint)
+            if breaker is None:
+                breaker = cls._breakers[endpoint] = cls(endpoint)
+            return breaker
+
+    @classmethod
+    def all_stats(cls):
+        with cls._breakers_lock:
+            breakers = list(cls._breakers.values())
+        return [breaker.stats() for breaker in breakers]
+
+    def before_call(self):
+        """请求前检查；打开状态下抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == 'open' and retry_in <= 0:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.endpoint, max(retry_in, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"熔断器打开: {self.endpoint}（连续失败 {self.failures} 次）")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """探测请求既未成功也未失败（如被取消）时释放探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def is_open(self):
+        """是否处于快速失败期（不含可以探测的 half_open）"""
+        with self._lock:
+            return self.state == 'open' and time.monotonic() < self.opened_at + self.reset_timeout
+
+    def retry_in(self):
+        """距离可以探测还有多少秒，关闭状态下为 0"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            return {'endpoint': self.endpoint, 'state': self.state, 'failures': self.failures}
+
+
+def should_park(error):
+    """错误是否说明后端暂时不可用：页面应暂存等待恢复，而不是显示原文
+
+    只有熔断器已经打开（请求被快速拒绝，或重试耗尽时的故障使熔断器打开）才暂存。
+    429 不计入熔断器，重试耗尽后由限流器降速、文本框显示原文，不暂存页面。
+    """
+    if isinstance(error, CircuitOpenError):
+        return True
+    if not is_backend_failure(error):
+        return False
+    url = getattr(getattr(error, 'request', None), 'url', None)
+    return bool(url) and CircuitBreaker.for_url(url).is_open()
+
+
+def call_with_retry(url, func, policy=None, deadline=None):
+    """在端点熔断器保护下执行 func()，可重试的错误按策略退避重试
+
+    不可重试的错误（如 400、解析错误）说明后端在线，不计入熔断器。
+    给出 deadline 时不会在时限之后发起重试；因时限到达而超时的请求抛出 DeadlineExceeded，
+    不计入熔断器。
+    """
+    policy = policy or RetryPolicy()
+    breaker = CircuitBreaker.for_url(url)
+    attempt = 0
+    while True:
+        if deadline is not None:
+            deadline.check()
+        breaker.before_call()
+        try:
+            result = func()
+        except RequestCancelled:
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            if deadline is not None and deadline.expired():
+                breaker.release_probe()
+                raise DeadlineExceeded(deadline.name) from e
+            if is_backend_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if not is_retryable(e) or attempt >= policy.max_retries:
+                raise
+            delay = policy.delay(attempt, e)
+            if deadline is not None and deadline.remaining() is not None and delay >= deadline.remaining():
+                raise DeadlineExceeded(deadline.name) from e
+            print(f"{breaker.endpoint} 请求失败（{type(e).__name__}），{delay:.1f} 秒后第 {attempt + 1} 次重试")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
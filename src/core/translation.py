@@ -1,20 +1,43 @@
 import numpy as np
-import requests
 import json
 import cv2
 from PyQt5.QtCore import QThread, pyqtSignal, QRect
 from urllib.request import urlretrieve
 import os
 from PIL import ImageFont, ImageDraw, Image
-from sklearn.cluster import OPTICS
+from .clustering import DEFAULT_GRID_EPS, cluster_centers
+from .layout import PageLayout
+from .bubble_segmentation import segment_bubbles
+from .panels import ReadingOrder, detect_panels
 from .ocr import ocr_through_UmiOCR, preprocess_image
+from .translation_memory import TranslationMemory
+from .fuzzy_memory import FuzzyMemory
+from .http_client import HttpClient
+from .json_stream import StreamingFieldParser, extract_field
+from .prompt_builder import PromptBuilder, estimate_tokens
+from .context_store import ContextStore, ContextSessionManager
+from .glossary import Glossary, GlossaryManager
 from ..config.settings import SettingsManager
+from .batcher import DynamicBatcher
+from .load_balancer import LoadBalancer
+from .hedging import Hedger, RequestCancelled
+from .cascade import ModelCascade
+from .rate_limiter import RateLimiter
+from .deadline import Deadline, DeadlineExceeded
+from .fast_path import FastPath
+from .model_residency import ModelResidency
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry, should_park
+import heapq
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FutureTimeoutError, wait, as_completed
 import threading
 from ..i18n.language_manager import LanguageManager
 
 class TranslationThread(QThread):
     finished = pyqtSignal(object, list)  # 发送原始图片和翻译信息
     progress = pyqtSignal(int, str, str)  # 发送翻译进度：文本索引、原文、译文
+    partial = pyqtSignal(int, str, str)  # 流式翻译的部分译文：文本索引、原文、当前译文
+    parked = pyqtSignal(str)  # 后端不可用，页面暂存等待恢复：端点
+    translations_ready = pyqtSignal(int, str, dict)  # 多目标语言模式：文本索引、原文、{目标语言: 译文}
     error = pyqtSignal(str)
 
     # 语言映射字典
@@ -26,11 +49,84 @@ class TranslationThread(QThread):
     }
 
     # 类级别的上下文存储
-    _shared_context = []  # 存储最近的翻译上下文
-    _context_lock = threading.Lock()  # 用于线程安全的上下文访问
-    MAX_CONTEXT_ITEMS = 10  # 保留最近10个文本框的上下文
+    _context_sessions = ContextSessionManager()  # 按来源隔离的上下文会话（线程安全）
+
+    # 跨页面动态批处理器（所有页面的翻译线程共享）
+    _batcher = None
+    _batcher_lock = threading.Lock()
+
+    # 单条翻译的输出结构
+    TRANSLATION_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'translation': {'type': 'string'},
+            'original': {'type': 'string'},
+            'remarks': {'type': 'string'},
+            'src_lang': {'type': 'string'},
+            'tgt_lang': {'type': 'string'}
+        },
+        'required': ['translation', 'original', 'src_lang', 'tgt_lang'],
+        'additionalProperties': False
+    }
+
+    # 精简输出结构：只包含译文和可选备注
+    LEAN_TRANSLATION_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'translation': {'type': 'string'},
+            'remarks': {'type': 'string'}
+        },
+        'required': ['translation'],
+        'additionalProperties': False
+    }
+
+    # 整页批量翻译的输出结构
+    BATCH_TRANSLATION_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'translations': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'integer'},
+                        'translation': {'type': 'string'}
+                    },
+                    'required': ['id', 'translation'],
+                    'additionalProperties': False
+                }
+            }
+        },
+        'required': ['translations'],
+        'additionalProperties': False
+    }
+
+    # 多目标语言翻译的输出结构
+    MULTI_TRANSLATION_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'translations': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'tgt_lang': {'type': 'string'},
+                        'translation': {'type': 'string'}
+                    },
+                    'required': ['tgt_lang', 'translation'],
+                    'additionalProperties': False
+                }
+            }
+        },
+        'required': ['translations'],
+        'additionalProperties': False
+    }
 
-    def __init__(self, image, source_lang, target_lang, parent=None):
+    DEFAULT_BATCH_TOKEN_BUDGET = 2048  # 单次批量请求的默认 token 预算
+    TRANSLATION_ERROR_TEXT = "翻译错误"
+
+    def __init__(self, image, source_lang, target_lang, parent=None, session_id=None, previous_emitted=None,
+                 allow_park=True):
         super().__init__(parent)
         self.lang_manager = LanguageManager()
         
@@ -53,6 +149,20 @@ class TranslationThread(QThread):
         self.image = image
         self.source_lang = source_lang  # 已经是英文标识符
         self.target_lang = target_lang  # 已经是英文标识符
+        self.session_id = session_id  # 上下文会话（如章节 URL、扩展页面来源），None 为默认会话
+        # 队列中上一页的 initial_emitted：多页并行处理时，本页的初始结果在上一页之后发送，保证结果窗口中的页面顺序。
+        # 只持有事件而不是上一页的线程，避免整个队列的图片和线程在队列结束前都无法释放
+        self.previous_emitted = previous_emitted
+        self.initial_emitted = threading.Event()
+        self.parked_endpoint = None  # 因后端不可用而暂存时记录的端点
+        self.allow_park = allow_park  # 为 False 时（页面暂存次数已达上限）后端不可用的文本框直接显示原文
+        self.deadline = Deadline()  # 页面处理时限，run() 开始时按输入来源设置
+        self.timed_out_boxes = 0  # 因超时显示原文的文本框数
+        self.fast_path_counts = {}  # 快速通道本地处理的文本框数：类别 -> 数量
+        self.target_langs = [target_lang]  # 多目标语言模式下的全部目标语言，第一个为 target_lang
+        self.multi_translations = {}  # 多目标语言模式：原文 -> {目标语言: 译文}
+        self.rendered_images = {}  # run_sync 多目标语言模式：目标语言 -> 渲染后的图片
+        self._page_stats_lock = threading.Lock()
         self.total_boxes = 0
         font_path = 'fonts/NotoSansCJK-Regular.ttc'
         if not os.path.exists(font_path):
@@ -62,121 +172,203 @@ class TranslationThread(QThread):
 
     def run(self):
         try:
+            # 后端熔断期间不做无用功，直接暂存页面
+            unavailable = self._unavailable_backend() if self.allow_park else None
+            if unavailable:
+                self._park(unavailable)
+                return
+
+            # 按输入来源设置整页时限，分配给各处理阶段
+            self.deadline = Deadline.for_source(self.session_id, SettingsManager().load_settings())
+            self.target_langs = self._get_target_langs()
+
             img = self.image
-            img = preprocess_image(img)
+            with self.deadline.stage('preprocess'):
+                img = preprocess_image(img)
 
             # OCR识别
-            result = ocr_through_UmiOCR(img, self.source_lang)
+            with self.deadline.stage('ocr') as ocr_deadline:
+                result = ocr_through_UmiOCR(img, self.source_lang, ocr_deadline)
             if result['code'] != 100:
                 self.error.emit("OCR failed: " + str(result))
                 return
 
-            # 合并文本框
-            result = self.merge_ocr_results(result)
-            if not result['data']:
+            # 气泡分割，合并文本框
+            with self.deadline.stage('segment'):
+                bubbles = self._segment_bubbles(img)
+            with self.deadline.stage('merge'):
+                layout = self.merge_ocr_results(result, bubbles)
+            if not len(layout):
                 self.error.emit("No text detected")
                 return
 
+            # 分镜检测：文本框按阅读顺序排列，每个分镜内的文本框组成一条上下文链
+            with self.deadline.stage('panels'):
+                layout, chains = self._reading_order(img, layout)
+
             # 设置总文本框数量
-            self.total_boxes = len(result['data'])
+            self.total_boxes = len(layout)
 
             # 准备翻译区域信息
-            translations = []
             context = ''
             
-            # 首先收集所有文本区域
-            for line in result['data']:
-                text = line['text'].strip()
-                points = line['box']
-                
-                # 计算文本框的矩形区域
-                x_coords = [points[i] for i in range(0, len(points), 2)]
-                y_coords = [points[i+1] for i in range(0, len(points), 2)]
-                x, y = min(x_coords), min(y_coords)
-                w = max(x_coords) - x
-                h = max(y_coords) - y
-                rect = QRect(x, y, w, h)
-                
-                # 添加到翻译列表，初始没有翻译结果
-                translations.append((rect, text, None))
+            # 首先收集所有文本区域（矩形区域由 PageLayout 整页计算），初始没有翻译结果
+            translations = [
+                (QRect(*rect), text.strip(), None)
+                for rect, text in zip(layout.rects().tolist(), layout.texts)
+            ]
+
+            # 跨页面批处理：先把文本框交给批处理器，与其他页面的文本框一起攒批
+            texts = [text for _, text, _ in translations]
+            multi_target = len(self.target_langs) > 1
+            cross_page = not multi_target and self._is_cross_page_batching()
+            if cross_page:
+                submitted = self.submit_cross_page(texts)
 
             # 发送原始图片和文本区域信息，开始显示界面
+            if self.previous_emitted is not None:
+                self.previous_emitted.wait()
+                self.previous_emitted = None
             self.finished.emit(img, translations)
-
-            # 逐个翻译文本
-            for i, (rect, text, _) in enumerate(translations):
-                try:
-                    translated = self.translate_text(text, context)
-                    # 更新上下文
-                    if translated:
-                        context += f"{text} -> {translated}\n"
-                    else:
-                        context += f"{text}\n"
-                    # 发送翻译进度
-                    self.progress.emit(i, text, translated or text)  # 如果翻译为空，使用原文
-                except Exception as e:
-                    print(f"Translation error for text '{text}': {str(e)}")
-                    self.progress.emit(i, text, "翻译错误")
+            self.initial_emitted.set()
+
+            # 翻译阶段使用整页剩余的全部时间，超时后未翻译的文本框显示原文
+            with self.deadline.stage('translate'):
+                if multi_target:
+                    # 多目标语言：每个文本框一次请求得到所有目标语言的译文
+                    self.translate_concurrently(
+                        texts, context, callback=self._emit_multi_progress, translate_func=self._translate_multi_text,
+                        chains=chains
+                    )
+                elif cross_page:
+                    self.collect_cross_page(texts, submitted, callback=self.progress.emit)
+                # 批量模式：整页一次（或按 token 预算分几次）请求
+                elif self._is_batch_mode():
+                    self.translate_batch(texts, context, callback=self.progress.emit)
+                else:
+                    # 逐个翻译文本（预设 max_concurrency > 1 时不同分镜的文本框并发翻译）
+                    self.translate_concurrently(
+                        texts, context, callback=self.progress.emit, partial_callback=self.partial.emit, chains=chains
+                    )
+
+            # 输出各阶段耗时
+            timings = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in self.deadline.timings.items())
+            budget = f"{self.deadline.budget:.0f}s" if self.deadline.budget else '不限'
+            print(f"页面耗时（{self.deadline.name}，时限 {budget}）: {timings}"
+                  + (f"，超时 {self.timed_out_boxes} 个文本框显示原文" if self.timed_out_boxes else ''))
+
+            # 输出快速通道的跳过率（本地处理、未调用 LLM 的文本框）
+            bypassed = sum(self.fast_path_counts.values())
+            kinds = ', '.join(f"{kind} {count}" for kind, count in self.fast_path_counts.items())
+            print(f"快速通道: 本地处理 {bypassed}/{self.total_boxes} 个文本框"
+                  f"（{bypassed / self.total_boxes:.0%}{'，' + kinds if kinds else ''}）")
+
+            # 输出翻译记忆命中统计
+            memory = self.get_translation_memory()
+            if memory:
+                stats = memory.stats()
+                print(f"翻译记忆: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, "
+                      f"合并请求 {stats['coalesced']} 次, 共 {stats['entries']} 条")
+            fuzzy = self.get_fuzzy_memory()
+            if fuzzy is not None:
+                stats = fuzzy.stats()
+                print(f"近似翻译记忆: 复用 {stats['hits']} 次, 提供示例 {stats['hints']} 次, "
+                      f"未命中 {stats['misses']} 次, 共 {stats['entries']} 条")
+
+            # 输出负载均衡池的端点统计
+            for pool_name, endpoints in LoadBalancer.all_stats().items():
+                for endpoint in endpoints:
+                    latency = endpoint['ewma_latency']
+                    print(f"负载均衡池 {pool_name} / {endpoint['name']}: "
+                          f"{'健康' if endpoint['healthy'] else '已摘除'}, 请求 {endpoint['requests']} 次, "
+                          f"失败 {endpoint['failures']} 次, 在途 {endpoint['outstanding']}, "
+                          f"EWMA 延迟 {latency if latency is None else round(latency, 2)} s")
+
+            # 输出对冲请求统计
+            hedge_stats = Hedger.get_instance().stats()
+            if hedge_stats['hedges_fired']:
+                print(f"对冲请求: 触发 {hedge_stats['hedges_fired']} 次, "
+                      f"备用请求胜出 {hedge_stats['hedges_won']} 次, 共 {hedge_stats['calls']} 次调用")
+
+            # 输出模型级联各级占比
+            cascade_stats = ModelCascade.stats()
+            if cascade_stats['total']:
+                shares = ', '.join(f"{model} {tier['share']:.0%}" for model, tier in cascade_stats['tiers'].items())
+                print(f"模型级联: {shares}（共 {cascade_stats['total']} 个文本框, 升级原因 {cascade_stats['escalations']}）")
+
+            # 输出限流统计
+            for limiter in RateLimiter.all_stats():
+                limit = limiter['concurrency_limit']
+                print(f"限流 {limiter['name']}: 请求 {limiter['requests']} 次, 触发限流 {limiter['throttled']} 次, "
+                      f"累计等待 {limiter['wait_time']:.1f} s"
+                      + (f", 并发上限 {limit:.1f}" if limit is not None else ''))
+
+            # 输出未关闭的熔断器
+            for breaker in CircuitBreaker.all_stats():
+                if breaker['state'] != 'closed':
+                    print(f"熔断器 {breaker['endpoint']}: {breaker['state']}（连续失败 {breaker['failures']} 次）")
+
+            # 输出提示词 token 统计
+            prompt_stats = PromptBuilder.stats()
+            print(f"提示词: 共 {prompt_stats['calls']} 次调用, 平均 {prompt_stats['avg_prompt_tokens']:.0f} tokens/次")
 
         except Exception as e:
-            self.error.emit(str(e))
-
-    def merge_ocr_results(self, result):
-        """合并OCR结果"""
-        result_data = result['data']
-        if not result_data:
-            return {'data': []}
-        
-        # 获取当前文本方向设置
+            if not self._should_park(e):
+                self.error.emit(str(e))
+            elif isinstance(e, CircuitOpenError):
+                self._park(e.endpoint)
+            else:
+                # 重试耗尽使熔断器打开（如 UmiOCR 正在重启），暂存页面等待恢复
+                self._park(CircuitBreaker.for_url(e.request.url).endpoint)
+        finally:
+            self.initial_emitted.set()
+            self.previous_emitted = None
+
+    def _unavailable_backend(self):
+        """OCR 或当前预设的端点处于熔断期时返回该端点；负载均衡池只有全部成员都熔断时才算不可用"""
         settings_manager = SettingsManager()
-        text_direction = settings_manager.load_settings().get('text_direction', 'horizontal')
-        
-        # 提取文本块基本信息
-        text_blocks = []
-        for line in result_data:
-            if line['score'] < 0.5:
-                continue
-                
-            box = line['box']
-            # 处理不同格式的边界框
+        urls = [settings_manager.load_settings().get('umiocr_api', 'http://localhost:1224/api/ocr')]
+        preset = settings_manager.get_current_preset()
+        if preset.get('type') == 'Pool':
             try:
-                if isinstance(box[0], (int, float)):  # 如果第一个元素是数字
-                    if len(box) == 8:  # x1,y1,x2,y2,x3,y3,x4,y4 格式
-                        center_x = sum(box[::2]) / 4  # 取所有x坐标的平均值
-                        center_y = sum(box[1::2]) / 4  # 取所有y坐标的平均值
-                    elif len(box) == 4:  # x,y,w,h 格式
-                        x, y, w, h = box
-                        center_x = x + w/2
-                        center_y = y + h/2
-                        # 转换为8点格式
-                        box = [x, y, x+w, y, x+w, y+h, x, y+h]
-                    else:
-                        print(f"Warning: Unexpected box length: {len(box)}")
-                        continue
-                elif isinstance(box[0], list):  # 如果是点的列表格式 [[x1,y1], [x2,y2], ...]
-                    if len(box) == 4:  # 四个角点
-                        center_x = sum(p[0] for p in box) / 4
-                        center_y = sum(p[1] for p in box) / 4
-                        # 转换为8点格式
-                        box = [p for point in box for p in point]
-                    else:
-                        print(f"Warning: Unexpected number of points: {len(box)}")
-                        continue
-                else:
-                    print(f"Warning: Unexpected box format: {box}")
-                    continue
-                    
-                text_blocks.append({
-                    'text': line['text'],
-                    'box': box,
-                    'center': (center_x, center_y)
-                })
-            except Exception as e:
-                print(f"Error processing box {box}: {str(e)}")
-                continue
-
-        if not text_blocks:
-            return {'data': []}
+                members = [e.preset.get('api_url') for e in LoadBalancer.for_preset(preset, settings_manager.presets).endpoints]
+            except ValueError:
+                members = []
+            breakers = [CircuitBreaker.for_url(url) for url in members if url]
+            if breakers and all(breaker.is_open() for breaker in breakers):
+                return breakers[0].endpoint
+        elif preset.get('api_url'):
+            urls.append(preset['api_url'])
+        for url in urls:
+            breaker = CircuitBreaker.for_url(url)
+            if breaker.is_open():
+                return breaker.endpoint
+        return None
+
+    def _should_park(self, error):
+        """错误是否应让整页暂存；暂存次数已达上限的页面不再暂存"""
+        return self.allow_park and should_park(error)
+
+    def _park(self, endpoint):
+        """标记页面因后端不可用而暂存，由队列在后端恢复后重新处理"""
+        print(f"后端 {endpoint} 不可用，页面已暂存")
+        self.parked_endpoint = endpoint
+        self.parked.emit(endpoint)
+
+    def merge_ocr_results(self, result, bubbles=None):
+        """合并OCR结果，返回合并后的 PageLayout
+
+        给出 bubbles（BubbleMap）时，中心点落在同一气泡内的文本行合并为一个文本框，
+        不在任何气泡内的文本行仍按距离聚类。
+        """
+        # OCR 返回的边界框在这里统一规范化为 N×8 数组，之后的流程都使用 PageLayout
+        layout = PageLayout.from_ocr(result['data'], min_score=0.5)
+        if not len(layout):
+            return layout
+        
+        # 获取当前文本方向设置
+        settings = SettingsManager().load_settings()
+        text_direction = settings.get('text_direction', 'horizontal')
 
         x_weight = 1.0
         y_weight = 1.0
@@ -191,261 +383,835 @@ class TranslationThread(QThread):
             x_weight = 0.75
             y_weight = 1.5
 
-        # 准备聚类数据
-        centers = np.array([block['center'] for block in text_blocks])
+        centers = layout.centers()
+        if bubbles is not None:
+            layout.bubbles = bubbles.lookup(centers)
+        outside = np.flatnonzero(layout.bubbles == 0)
 
-        def custom_metric(a, b):
-            dx = abs(a[0] - b[0])
-            dy = abs(a[1] - b[1])
-            
-            return dx * x_weight + dy * y_weight
-
-        # 使用OPTICS聚类
-        if len(text_blocks) > 1:
-            try:
-                clustering = OPTICS(
-                    min_samples=2,  # 修改为2，满足OPTICS要求
-                    metric= custom_metric,
-                    max_eps=100,
-                    xi = 0.05
-                    # cluster_method='dbscan',  # 使用DBSCAN方法
-                    # eps=50  # 设置eps阈值
-                ).fit(centers)  # 使用中心点坐标进行聚类
-                
-                labels = clustering.labels_
-            except Exception as e:
-                print(f"Clustering failed: {str(e)}")
-                # 如果聚类失败，将所有文本块视为一个簇
-                labels = [0] * len(text_blocks)
-        else:
-            labels = [0] * len(text_blocks)
+        # 聚类：加权 L1 距离等价于缩放坐标后的 cityblock 距离，由 clustering 模块向量化计算
+        labels = np.full(len(layout), -1, dtype=np.int64)
+        try:
+            labels[outside] = cluster_centers(
+                centers[outside], x_weight, y_weight,
+                engine=settings.get('clustering_engine', 'optics'),
+                eps=settings.get('cluster_eps', DEFAULT_GRID_EPS)
+            )
+        except Exception as e:
+            print(f"Clustering failed: {str(e)}")
+            # 如果聚类失败，将所有文本块视为一个簇
+            labels[outside] = 0
+        # 气泡内的文本行以气泡编号为簇标签（排在聚类标签之后）
+        in_bubble = layout.bubbles > 0
+        labels[in_bubble] = labels.max(initial=-1) + layout.bubbles[in_bubble]
 
         # 合并聚类结果
-        merged_results = []
-        for label in set(labels):
-            if label == -1:  # 跳过噪声点
-                # 将噪声点作为单独的文本块
-                for i, block in enumerate(text_blocks):
-                    if labels[i] == -1:
-                        merged_results.append({
-                            'text': block['text'],
-                            'box': block['box']
-                        })
+        groups = []
+        for label in set(labels.tolist()):
+            indices = np.flatnonzero(labels == label)
+            if label == -1:  # 噪声点作为单独的文本块
+                groups.extend([i] for i in indices)
                 continue
             
-            cluster = [block for i, block in enumerate(text_blocks) if labels[i] == label]
-            
             # 根据文本方向排序
             if text_direction == 'vertical': #从上到下，从右到左
-                cluster.sort(key=lambda x: (x['center'][1], -x['center'][0]))
+                order = np.lexsort((-centers[indices, 0], centers[indices, 1]))
             else: #从上到下，从左到右
-                cluster.sort(key=lambda x: (x['center'][1], x['center'][0]))
-            
-            # 合并文本和边界框
-            merged_text = '\n'.join(block['text'] for block in cluster)
-            
-            # 合并边界框
-            try:
-                all_points = []
-                for block in cluster:
-                    box = block['box']
-                    if len(box) == 8:  # 确保是8点格式
-                        points = [(box[i], box[i+1]) for i in range(0, 8, 2)]
-                        all_points.extend(points)
-                
-                if all_points:
-                    # 计算边界多边形
-                    hull = cv2.convexHull(np.array(all_points))
-                    merged_box = hull.flatten().tolist()
-                else:
-                    # 如果没有有效点，使用第一个文本块的边界框
-                    merged_box = cluster[0]['box']
-            except Exception as e:
-                print(f"Error merging boxes: {str(e)}")
-                merged_box = cluster[0]['box']
-            
-            merged_results.append({
-                'text': merged_text,
-                'box': merged_box
-            })
+                order = np.lexsort((centers[indices, 0], centers[indices, 1]))
+            groups.append(indices[order])
 
-        return {'data': merged_results}
+        # 按组内最早的 OCR 行排列文本框，保持大致的阅读顺序
+        groups.sort(key=min)
 
-    def translate_text(self, text, current_context):
+        # 合并文本和边界框（边界框取组内所有角点的外接四边形）
+        return layout.merge(groups)
+
+    def translate_text(self, text, current_context, on_partial=None):
+        if self.deadline.expired():
+            return self._timed_out(text)
+        fast = self._fast_path(text)
+        if fast is not None:
+            return fast
         try:
             # 获取当前预设
             settings_manager = SettingsManager()
             current_preset = settings_manager.get_current_preset()
-            
-            # 获取源语言和目标语言的内部名称
-            src_name = self.source_lang  # 已经是英文标识符
-            target_name = self.target_lang  # 已经是英文标识符
-            
-            # 获取共享上下文
-            with self._context_lock:
-                shared_context = "\n".join(self._shared_context)
-                if shared_context:
-                    #current_context = f"{shared_context}\n{current_context}"
-                    current_context = f"Shared Context:\n{shared_context}\n\nCurrent page:\n{text}"
-
-            system_prompt = """
-                                You are a professional comic translation expert specializing in adapting content between Chinese (zh), English (en), Japanese (ja), and Korean (ko). Your task is to provide accurate and culturally appropriate translations while preserving the original meaning and style.
-
-                                Key Requirements:
-                                1. Always translate into the specified target language
-                                2. Maintain semantic accuracy and emotional tone
-                                3. Adapt cultural expressions appropriately for the target language
-                                4. Preserve dialogue characteristics and speech patterns specific to the target language
-                                5. Keep translations concise to fit speech bubbles
-                                6. Be creative with wordplay and humor adaptation
-                                7. If this line is already translated in the context, return empty translation
-
-                                Language-Specific Guidelines:
-                                - Chinese: Use appropriate measure words, particles (了,的,啊), and maintain natural Chinese expression patterns
-                                - Japanese: Use proper keigo levels, sentence-ending particles (ね,よ,か), and natural Japanese word order
-                                - Korean: Maintain appropriate honorific levels, sentence-ending particles (요,죠,네), and Korean syntax
-                                - English: Use appropriate colloquialisms and natural English expressions
-
-                                Example Translations:
-
-                                1. Korean to Chinese:
-                                Input: "빌런이나타났을때거기서만나는거로?"
-                                {
-                                    "translation": "要是出现反派就在那里碰面吗？",
-                                    "original": "빌런이나타났을때거기서만나는거로?",
-                                    "remarks": "",
-                                    "src_lang": "korean",
-                                    "tgt_lang": "chinese"
-                                }
-
-                                2. Japanese to Chinese:
-                                Input: "明日の天気はどうですか？"
-                                {
-                                    "translation": "明天天气怎么样？",
-                                    "original": "明日の天気はどうですか？",
-                                    "remarks": "",
-                                    "src_lang": "japanese",
-                                    "tgt_lang": "chinese"
-                                }
-
-                                3. English to Chinese:
-                                Input: "What should we do next?"
-                                {
-                                    "translation": "我们接下来该做什么？",
-                                    "original": "What should we do next?",
-                                    "remarks": "",
-                                    "src_lang": "english",
-                                    "tgt_lang": "chinese"
-                                }
-
-                                4. Chinese to Japanese:
-                                Input: "你今天过得怎么样？"
-                                {
-                                    "translation": "今日はどうでしたか？",
-                                    "original": "你今天过得怎么样？",
-                                    "remarks": "",
-                                    "src_lang": "chinese",
-                                    "tgt_lang": "japanese"
-                                }
-
-                                5. Chinese to Korean:
-                                Input: "等一下，我马上来！"
-                                {
-                                    "translation": "잠깐만요, 금방 갈게요!",
-                                    "original": "等一下，我马上来！",
-                                    "remarks": "",
-                                    "src_lang": "chinese",
-                                    "tgt_lang": "korean"
-                                }
-                                
-                                6. Korean to Japanese:
-                                Input: "밑어도되는거에요?\n계속일하게하려고아무말이나\n지어내고있는거아니죠?"
-                                {
-                                    "translation": "本当に大丈夫ですか？ ずっと働かせようとして、適当なことを言っているんじゃないですか？",
-                                    "original": "밑어도되는거에요?\n계속일하게하려고아무말이나\n지어내고있는거아니죠?",
-                                    "remarks": "",
-                                    "src_lang": "korean",
-                                    "tgt_lang": "japanese"
-                                }
-
-                                When translating:
-                                - Fix any OCR-related errors in the source text
-                                - Keep untranslatable elements (like "-" or "...") in their original form
-                                - If the source text is a single character or word and cannot be translated, keep it as is
-                                - Focus only on translating the provided content, not the context
-                                - Maintain the same line break format as the source
-                                - IMPORTANT: Always output the translation in the specified target language (tgt_lang)
-
-                                Provide your translation in this JSON format without any additional commentary:
-                                {
-                                    "translation": string,     // Must be in the specified target language
-                                    "original": string,        // The original text (corrected if needed)
-                                    "remarks": string,         // Leave empty unless critical issues need noting
-                                    "src_lang": string,        // Source language code (chinese/english/japanese/korean)
-                                    "tgt_lang": string        // Target language code (chinese/english/japanese/korean)
-                                }
-                                """
-
-            # 构建用户提示
-            user_prompt = (
-                f'{{"src_lang":"{src_name}","tgt_lang":"{target_name}",'
-                f'"reference":"{current_context}","original":"{text}"}}'
-            )
-            #print("user_prompt:", user_prompt)
-
-            # 根据预设类型选择处理器
-            if current_preset['type'] == 'Ollama':
-                response = self.ollama_handler(system_prompt, user_prompt, current_preset)
-                print("Ollama response:", response)
-            else:  # Remote API
-                response = self.openai_handler(system_prompt, user_prompt, current_preset)
-                print("OpenAI response:", response)
 
-            # 尝试多种方式提取翻译内容
-            try:
-                # 1. 尝试直接解析 JSON
-                result = json.loads(response)
-                translated = result.get('translation', '')
-            except json.JSONDecodeError:
-                try:
-                    # 2. 尝试使用正则表达式匹配 JSON 格式的翻译
-                    import re
-                    json_pattern = r'\{[^}]*"translation"\s*:\s*"([^"]+)"[^}]*\}'
-                    match = re.search(json_pattern, response)
-                    if match:
-                        translated = match.group(1)
-                    else:
-                        # 3. 尝试匹配引号内的任何内容
-                        quote_pattern = r'"([^"]+)"'
-                        matches = re.findall(quote_pattern, response)
-                        # 选择最长的匹配作为翻译结果
-                        translated = max(matches, key=len) if matches else text
-                except Exception as e:
-                    print(f"正则提取失败: {e}")
-                    translated = text
-
-            translated = translated.strip().replace('">', '').replace('</', '')
+            # 优先查询翻译记忆，相同文本的并发请求只会发出一次
+            memory = self.get_translation_memory(settings_manager)
+            translate = lambda: self._translate_uncached(
+                text, current_context, current_preset, settings_manager, on_partial
+            )
+            if memory:
+                translated = memory.get_or_translate(
+                    text, self.source_lang, self.target_lang, current_preset.get('model', ''), translate
+                )
+            else:
+                translated = translate()
 
             # 更新共享上下文
-            if translated and translated != text:  # 只有成功翻译且内容不同时才添加到上下文
-                with self._context_lock:
-                    context_entry = f"{text} -> {translated}"
-                    self._shared_context.append(context_entry)
-                    # 保持上下文在限定大小内
-                    if len(self._shared_context) > self.MAX_CONTEXT_ITEMS:
-                        self._shared_context.pop(0)
+            self._add_shared_context(text, translated)
 
             return translated or text  # 如果翻译为空则返回原文
 
+        except DeadlineExceeded:
+            return self._timed_out(text)
         except Exception as e:
+            if self._should_park(e):
+                # 后端不可用：交给 run() 暂存整页，恢复后重新处理，而不是显示原文
+                raise
             import traceback
             print(f"翻译异常: {str(e)}")
             print("详细异常信息:")
             traceback.print_exc()
             return text
 
-    def ollama_handler(self, system_prompt, user_prompt, preset):
-        """Ollama API 处理器"""
+    def _fast_path(self, text, target_lang=None):
+        """标点、数字、常见拟声词在本地处理，返回结果；需要调用 LLM 时返回 None
+
+        target_lang 默认为 self.target_lang，只有主目标语言计入跳过率统计。
+        """
+        if not SettingsManager().load_settings().get('fast_path', True):
+            return None
+        target_lang = target_lang or self.target_lang
+        result = FastPath.get_instance().classify(text, self.source_lang, target_lang)
+        if result is None:
+            return None
+        kind, translated = result
+        if target_lang == self.target_lang:
+            with self._page_stats_lock:
+                self.fast_path_counts[kind] = self.fast_path_counts.get(kind, 0) + 1
+        return translated
+
+    def _segment_bubbles(self, img):
+        """分割页面中的对话气泡，未启用、失败或整页已超时时返回 None（只按距离聚类）"""
+        if not SettingsManager().load_settings().get('bubble_segmentation', True):
+            return None
+        if self.deadline.expired():
+            print("页面已超时，跳过气泡分割")
+            return None
+        try:
+            return segment_bubbles(img)
+        except Exception as e:
+            print(f"气泡分割失败: {str(e)}")
+            return None
+
+    def _reading_order(self, img, layout):
+        """检测分镜并按阅读顺序重排文本框
+
+        Returns:
+            tuple: (重排后的 PageLayout, 每个分镜内文本框索引的链)；未启用、失败或整页已超时时链为 None
+        """
+        settings = SettingsManager().load_settings()
+        if not settings.get('panel_detection', True) or not len(layout):
+            return layout, None
+        if self.deadline.expired():
+            print("页面已超时，跳过分镜检测")
+            return layout, None
+        direction = settings.get('reading_direction', 'auto')
+        rtl = direction == 'rtl' or (direction == 'auto' and self.source_lang == 'Japanese')
+        try:
+            panels = detect_panels(img, rtl)
+            reading_order = ReadingOrder.build(panels, layout.rects(), rtl)
+        except Exception as e:
+            print(f"分镜检测失败: {str(e)}")
+            return layout, None
+        print(f"分镜: {len(panels)} 个，{len(reading_order.chains)} 条上下文链")
+        return layout.take(reading_order.order), reading_order.chains
+
+    def _get_target_langs(self):
+        """目标语言列表：target_lang 加上设置中的 extra_target_langs"""
+        extra = SettingsManager().load_settings().get('extra_target_langs') or []
+        return [self.target_lang] + [lang for lang in extra if lang and lang != self.target_lang]
+
+    def _translate_multi_text(self, text, current_context, on_partial=None):
+        """多目标语言模式：一次请求得到所有目标语言的译文，返回主目标语言的译文
+
+        快速通道和翻译记忆按语言分别查询，只请求未命中的语言；
+        各语言的译文记录在 self.multi_translations 中。
+        """
+        settings_manager = SettingsManager()
+        current_preset = settings_manager.get_current_preset()
+        model = current_preset.get('model', '')
+        memory = self.get_translation_memory(settings_manager)
+
+        results = {}
+        missing = []
+        for lang in self.target_langs:
+            translated = self._fast_path(text, lang)
+            if translated is None and memory:
+                translated = memory.get(memory.make_key(text, self.source_lang, lang, model))
+            if translated is None:
+                missing.append(lang)
+            else:
+                results[lang] = translated
+
+        if missing:
+            translated = {}
+            if self.deadline.expired():
+                self._timed_out(text)
+            else:
+                try:
+                    translated = self._request_multi(text, current_context, current_preset, missing)
+                except DeadlineExceeded:
+                    self._timed_out(text)
+                except Exception as e:
+                    if self._should_park(e):
+                        raise
+                    print(f"多目标语言翻译失败: {str(e)}")
+            for lang in missing:
+                value = translated.get(lang)
+                if value and memory and value != text:
+                    memory.put(memory.make_key(text, self.source_lang, lang, model), value)
+                results[lang] = value or text
+
+        with self._page_stats_lock:
+            self.multi_translations[text] = results
+        primary = results[self.target_lang]
+        self._add_shared_context(text, primary)
+        return primary
+
+    def _request_multi(self, text, current_context, current_preset, targets):
+        """一次请求把文本翻译成 targets 中的所有语言，返回 {目标语言: 译文}（模型漏掉的语言不在其中）"""
+        reference = PromptBuilder.build_reference(
+            self._get_shared_context(text, current_preset), current_context,
+            self._get_context_budget(current_preset)
+        )
+        # 术语表针对主目标语言
+        glossary = self._get_glossary_terms(text) if targets[0] == self.target_lang else None
+        system_prompt = PromptBuilder.system_prompt('multi')
+        user_prompt = PromptBuilder.build_multi_user_prompt(
+            self.source_lang, targets, text, reference, glossary
+        )
+
+        response = self._call_handler(system_prompt, user_prompt, current_preset, schema=self.MULTI_TRANSLATION_SCHEMA)
+
+        # 模型返回的语言名大小写可能不同
+        names = {lang.lower(): lang for lang in targets}
+        translated = {}
+        for item in json.loads(response).get('translations', []):
+            lang = names.get(str(item.get('tgt_lang', '')).strip().lower())
+            if lang:
+                translated[lang] = self._clean_translation(item.get('translation') or '')
+        return translated
+
+    def _emit_multi_progress(self, index, text, translated):
+        """多目标语言模式下的进度回调：主语言走 progress 信号，全部语言走 translations_ready 信号"""
+        self.progress.emit(index, text, translated)
+        with self._page_stats_lock:
+            translations = dict(self.multi_translations.get(text) or {self.target_lang: translated})
+        self.translations_ready.emit(index, text, translations)
+
+    def _timed_out(self, text):
+        """页面超时：放弃该文本框的翻译，显示原文"""
+        with self._page_stats_lock:
+            self.timed_out_boxes += 1
+        return text
+
+    def _translate_uncached(self, text, current_context, current_preset, settings_manager, on_partial=None):
+        """精确缓存未命中时：先查近似翻译记忆，足够相似则直接复用，否则带上相似示例请求 LLM"""
+        settings = settings_manager.load_settings()
+        fuzzy = self.get_fuzzy_memory(settings_manager)
+        examples = []
+        if fuzzy is not None:
+            reused, examples = fuzzy.lookup(
+                text,
+                settings.get('fuzzy_reuse_threshold', FuzzyMemory.DEFAULT_REUSE_THRESHOLD),
+                settings.get('fuzzy_hint_threshold', FuzzyMemory.DEFAULT_HINT_THRESHOLD)
+            )
+            if reused is not None:
+                return reused
+
+        translated = self._request_translation(text, current_context, current_preset, on_partial, examples)
+        if fuzzy is not None and translated:
+            fuzzy.add(text, translated)
+        return translated
+
+    def _request_translation(self, text, current_context, current_preset, on_partial=None, examples=None):
+        """构建提示词并调用 LLM 翻译单个文本框，返回提取出的译文（可能为空）
+
+        examples 为近似翻译记忆给出的相似台词译文，作为 few-shot 示例放入用户提示。
+        """
+        # 共享上下文与当前页面上下文合并后按 token 预算裁剪
+        reference = PromptBuilder.build_reference(
+            self._get_shared_context(text, current_preset), current_context,
+            self._get_context_budget(current_preset)
+        )
+
+        mode = 'full'
+        schema = None
+        if current_preset.get('output_mode', 'full') == 'lean':
+            # 精简输出：只要求译文，不再让模型回显原文和语言代码
+            mode = 'lean'
+            schema = self.LEAN_TRANSLATION_SCHEMA
+
+        # 系统提示词为静态前缀，动态内容全部放在 JSON 编码的用户提示中
+        system_prompt = PromptBuilder.system_prompt(mode)
+        user_prompt = PromptBuilder.build_user_prompt(
+            self.source_lang, self.target_lang, text, reference, self._get_glossary_terms(text), examples
+        )
+
+        # 模型级联：从便宜的模型开始，结果不合格再升级
+        models = ModelCascade.models(current_preset)
+        if models:
+            return self._request_cascade(text, system_prompt, user_prompt, current_preset, models, schema, on_partial)
+
+        # 根据预设类型选择处理器
+        response = self._call_handler(system_prompt, user_prompt, current_preset, schema, on_partial)
+
+        # 容错提取 translation 字段（兼容被截断或提前终止的 JSON）
+        return self._clean_translation(extract_field(response, 'translation', default=''))
+
+    def _request_cascade(self, text, system_prompt, user_prompt, preset, models, schema=None, on_partial=None):
+        """按 cascade_models 逐级调用模型，直到结果合格或到达最后一级"""
+        reasons = []
+        start = ModelCascade.start_tier(text, preset)
+        if start:
+            reasons.append('length')
+
+        last = len(models) - 1
+        for tier in range(start, len(models)):
+            tier_preset = dict(preset, model=models[tier])
+            try:
+                response = self._call_handler(system_prompt, user_prompt, tier_preset, schema, on_partial)
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                if tier == last:
+                    raise
+                print(f"模型 {models[tier]} 调用失败，升级到下一级: {str(e)}")
+                reasons.append('error')
+                continue
+
+            translated = self._clean_translation(extract_field(response, 'translation', default=''))
+            reason = ModelCascade.escalation_reason(response, translated, text, self.target_lang)
+            if reason is None or tier == last:
+                ModelCascade.record(models[tier], reasons)
+                return translated
+            reasons.append(reason)
+
+    @staticmethod
+    def _clean_translation(translated):
+        return translated.strip().replace('">', '').replace('</', '')
+
+    def translate_concurrently(self, texts, current_context, callback=None, partial_callback=None,
+                               translate_func=None, chains=None):
+        """使用线程池并发翻译一页中的文本框
+
+        同时在途的请求数不超过预设的 max_concurrency。每个请求提交时，
+        页面上下文按阅读顺序由已完成的文本框拼接，保证上下文始终一致；
+        给出 chains（ReadingOrder.chains，每个分镜内文本框的索引）时，同一条链内的文本框
+        在前一个完成后才提交，上下文只包含阅读顺序在它之前的文本框，不同分镜之间并发；
+        每个文本框完成后立即调用 callback(index, 原文, 译文)；
+        流式模式下生成过程中的部分译文通过 partial_callback(index, 原文, 部分译文) 推送。
+        translate_func(原文, 上下文, on_partial) 默认为 translate_text。
+
+        Returns:
+            list: 与 texts 一一对应的译文
+        """
+        max_concurrency = self._get_max_concurrency()
+        translate = translate_func or self.translate_text
+        results = [None] * len(texts)
+
+        # 可以提交的文本框（按阅读顺序取出）；分链时每条链只有链首可以提交，完成后接着提交链中的下一个
+        successors = {}
+        if chains:
+            ready = [chain[0] for chain in chains if chain]
+            for chain in chains:
+                successors.update(zip(chain, chain[1:]))
+            chained = {i for chain in chains for i in chain}
+            ready += [i for i in range(len(texts)) if i not in chained]
+        else:
+            ready = list(range(len(texts)))
+        heapq.heapify(ready)
+
+        def page_context(index):
+            # 按阅读顺序拼接已完成的文本框，失败的文本框不计入上下文
+            context = current_context
+            limit = index if chains else len(texts)
+            for text, translated in zip(texts[:limit], results[:limit]):
+                if translated is None or translated == self.TRANSLATION_ERROR_TEXT:
+                    continue
+                if translated:
+                    context += f"{text} -> {translated}\n"
+                else:
+                    context += f"{text}\n"
+            return context
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            pending = {}
+            while ready or pending:
+                # 补满并发窗口
+                while ready and len(pending) < max_concurrency:
+                    index = heapq.heappop(ready)
+                    on_partial = None
+                    if partial_callback:
+                        on_partial = lambda partial, i=index: partial_callback(i, texts[i], partial)
+                    future = executor.submit(translate, texts[index], page_context(index), on_partial)
+                    pending[future] = index
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = pending.pop(future)
+                    text = texts[i]
+                    try:
+                        translated = future.result() or text  # 如果翻译为空，使用原文
+                    except Exception as e:
+                        if self._should_park(e):
+                            raise
+                        print(f"Translation error for text '{text}': {str(e)}")
+                        translated = self.TRANSLATION_ERROR_TEXT
+                    results[i] = translated
+                    if i in successors:
+                        heapq.heappush(ready, successors[i])
+                    # 发送翻译进度
+                    if callback:
+                        callback(i, text, translated)
+
+        return results
+
+    def _get_max_concurrency(self):
+        """当前预设允许的最大并发请求数"""
+        try:
+            return max(1, int(SettingsManager().get_current_preset().get('max_concurrency', 1)))
+        except (TypeError, ValueError):
+            return 1
+
+    def translate_batch(self, texts, current_context, callback=None):
+        """整页批量翻译，按 token 预算拆分为若干次请求
+
+        Args:
+            texts (list): 按阅读顺序排列的文本框原文
+            current_context (str): 当前页面已有的上下文
+            callback (callable): 每个文本框得到译文后调用 callback(index, 原文, 译文)
+
+        Returns:
+            list: 与 texts 一一对应的译文
+        """
+        settings_manager = SettingsManager()
+        current_preset = settings_manager.get_current_preset()
+        budget = current_preset.get('batch_token_budget', self.DEFAULT_BATCH_TOKEN_BUDGET)
+        model = current_preset.get('model', '')
+
+        results = [None] * len(texts)
+
+        # 翻译记忆命中的文本框不再发送给 LLM
+        memory = self.get_translation_memory(settings_manager)
+        fuzzy = self.get_fuzzy_memory(settings_manager)
+        pending = []
+        for i, text in enumerate(texts):
+            fast = self._fast_path(text)
+            if fast is not None:
+                results[i] = fast
+                if callback:
+                    callback(i, text, fast)
+                continue
+            cached = memory.get(memory.make_key(text, self.source_lang, self.target_lang, model)) if memory else None
+            if cached is None:
+                pending.append(i)
+                continue
+            results[i] = cached
+            self._add_shared_context(text, cached)
+            current_context += f"{text} -> {cached}\n"
+            if callback:
+                callback(i, text, cached)
+
+        for batch in self._split_batches([texts[i] for i in pending], budget):
+            chunk = [pending[j] for j in batch]
+            try:
+                chunk_results = self._translate_chunk(
+                    [texts[i] for i in chunk], current_context, current_preset
+                )
+            except Exception as e:
+                print(f"批量翻译失败，回退到逐条翻译: {str(e)}")
+                chunk_results = {}
+
+            for local_id, i in enumerate(chunk):
+                text = texts[i]
+                translated = chunk_results.get(local_id)
+                if translated is None:
+                    # 模型漏掉的条目单独补翻
+                    translated = self.translate_text(text, current_context)
+                else:
+                    self._add_shared_context(text, translated)
+                    if memory and translated != text:
+                        memory.put(memory.make_key(text, self.source_lang, self.target_lang, model), translated)
+                    if fuzzy is not None:
+                        fuzzy.add(text, translated)
+                translated = translated or text
+                results[i] = translated
+
+                if translated != text:
+                    current_context += f"{text} -> {translated}\n"
+                else:
+                    current_context += f"{text}\n"
+                if callback:
+                    callback(i, text, translated)
+
+        return results
+
+    def submit_cross_page(self, texts):
+        """把本页未命中翻译记忆的文本框提交给跨页面批处理器
+
+        Returns:
+            list: 与 texts 一一对应，快速通道处理或翻译记忆命中的为译文，其余为 Future
+        """
+        settings_manager = SettingsManager()
+        current_preset = settings_manager.get_current_preset()
+        model = current_preset.get('model', '')
+        memory = self.get_translation_memory(settings_manager)
+
+        submitted = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            fast = self._fast_path(text)
+            if fast is not None:
+                submitted[i] = fast
+                continue
+            cached = memory.get(memory.make_key(text, self.source_lang, self.target_lang, model)) if memory else None
+            if cached is None:
+                pending.append(i)
+            else:
+                submitted[i] = cached
+
+        if pending:
+            batcher = self.get_batcher(current_preset)
+            # 同一语言对、同一上下文会话的文本框才能合并到一个请求中
+            key = (self.source_lang, self.target_lang, self.session_id)
+            futures = batcher.submit_many(
+                key, [(self, texts[i]) for i in pending],
+                [estimate_tokens(texts[i]) * 2 + 16 for i in pending]
+            )
+            for i, future in zip(pending, futures):
+                submitted[i] = future
+        return submitted
+
+    def collect_cross_page(self, texts, submitted, callback=None):
+        """收取跨页面批处理的结果，每个文本框完成后立即调用 callback(index, 原文, 译文)
+
+        批次失败或模型漏掉的文本框回退到逐条翻译。
+
+        Returns:
+            list: 与 texts 一一对应的译文
+        """
+        settings_manager = SettingsManager()
+        model = settings_manager.get_current_preset().get('model', '')
+        memory = self.get_translation_memory(settings_manager)
+        fuzzy = self.get_fuzzy_memory(settings_manager)
+        results = [None] * len(texts)
+
+        def page_context():
+            lines = []
+            for text, translated in zip(texts, results):
+                if translated is not None:
+                    lines.append(f"{text} -> {translated}" if translated != text else text)
+            return '\n'.join(lines)
+
+        futures = {}
+        for i, value in enumerate(submitted):
+            if isinstance(value, str):
+                # 翻译记忆命中
+                results[i] = value
+                self._add_shared_context(texts[i], value)
+                if callback:
+                    callback(i, texts[i], value)
+            else:
+                futures[value] = i
+
+        try:
+            for future in as_completed(futures, timeout=self.deadline.remaining()):
+                i = futures[future]
+                text = texts[i]
+                try:
+                    translated = future.result()
+                except Exception as e:
+                    print(f"跨页面批量翻译失败，回退到逐条翻译: {str(e)}")
+                    translated = None
+
+                if translated is None:
+                    translated = self.translate_text(text, page_context())
+                else:
+                    self._add_shared_context(text, translated)
+                    if memory and translated != text:
+                        memory.put(memory.make_key(text, self.source_lang, self.target_lang, model), translated)
+                    if fuzzy is not None:
+                        fuzzy.add(text, translated)
+                translated = translated or text
+                results[i] = translated
+                if callback:
+                    callback(i, text, translated)
+        except FutureTimeoutError:
+            # 页面超时：仍在批处理器中的文本框显示原文
+            for i in futures.values():
+                if results[i] is None:
+                    results[i] = self._timed_out(texts[i])
+                    if callback:
+                        callback(i, texts[i], results[i])
+
+        return results
+
+    @classmethod
+    def get_batcher(cls, preset):
+        """获取共享的跨页面批处理器，并按当前预设更新其参数"""
+        with cls._batcher_lock:
+            if cls._batcher is None:
+                cls._batcher = DynamicBatcher(cls._process_cross_page_batch)
+            batcher = cls._batcher
+        try:
+            batcher.configure(
+                max_items=preset.get('batch_max_items', DynamicBatcher.DEFAULT_MAX_ITEMS),
+                max_wait_ms=preset.get('batch_max_wait_ms', DynamicBatcher.DEFAULT_MAX_WAIT_MS),
+                max_inflight=preset.get('max_concurrency', 1),
+                max_cost=preset.get('batch_token_budget', cls.DEFAULT_BATCH_TOKEN_BUDGET)
+            )
+        except (TypeError, ValueError) as e:
+            print(f"批处理参数无效: {str(e)}")
+        return batcher
+
+    @staticmethod
+    def _process_cross_page_batch(items):
+        """处理一个跨页面批次：items 为 [(提交的线程, 原文)]，返回与之对应的译文（漏掉的为 None）
+
+        条目按 (会话, 源语言, 目标语言) 分组，同组共用上下文和术语表；每组由时限最晚的页面发出请求，
+        某一页已超时不会拖累其他页面的条目。失败或超时的组返回 None，由各页面回退到逐条翻译。
+        """
+        preset = SettingsManager().get_current_preset()
+        groups = {}
+        for index, (owner, _) in enumerate(items):
+            groups.setdefault((owner.session_id, owner.source_lang, owner.target_lang), []).append(index)
+
+        results = [None] * len(items)
+        for indices in groups.values():
+            owner = max(
+                (items[i][0] for i in indices),
+                key=lambda thread: thread.deadline.expires_at if thread.deadline.expires_at is not None else float('inf')
+            )
+            if owner.deadline.expired():
+                continue
+            try:
+                translated = owner._translate_chunk([items[i][1] for i in indices], '', preset)
+            except Exception as e:
+                print(f"跨页面批量翻译失败: {str(e)}")
+                continue
+            for position, index in enumerate(indices):
+                results[index] = translated.get(position)
+        return results
+
+    def _is_cross_page_batching(self):
+        """当前预设是否启用跨页面动态批处理"""
+        return bool(SettingsManager().get_current_preset().get('cross_page_batching', False))
+
+    def _translate_chunk(self, texts, current_context, preset):
+        """发送一次批量请求，返回 {条目序号: 译文}"""
+        reference = PromptBuilder.build_reference(
+            self._get_shared_context('\n'.join(texts), preset), current_context,
+            self._get_context_budget(preset)
+        )
+        system_prompt = PromptBuilder.system_prompt('batch')
+        user_prompt = PromptBuilder.build_batch_user_prompt(
+            self.source_lang, self.target_lang, texts, reference, self._get_glossary_terms('\n'.join(texts))
+        )
+
+        response = self._call_handler(
+            system_prompt, user_prompt, preset, schema=self.BATCH_TRANSLATION_SCHEMA
+        )
+
+        result = json.loads(response)
+        translated = {}
+        for item in result.get('translations', []):
+            try:
+                item_id = int(item['id'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= item_id < len(texts):
+                text = (item.get('translation') or '').strip()
+                translated[item_id] = text or texts[item_id]
+        return translated
+
+    def _split_batches(self, texts, budget):
+        """按 token 预算把文本框序号切分成若干批（预算只计页面内容，不含系统提示词）"""
+        batches = []
+        current = []
+        used = 0
+        for i, text in enumerate(texts):
+            # 原文 + 译文 + JSON 结构开销
+            cost = estimate_tokens(text) * 2 + 16
+            if current and used + cost > budget:
+                batches.append(current)
+                current = []
+                used = 0
+            current.append(i)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _get_context_budget(preset):
+        """参考上下文（reference 字段）的 token 预算"""
+        try:
+            return int(preset.get('context_token_budget', PromptBuilder.DEFAULT_CONTEXT_TOKEN_BUDGET))
+        except (TypeError, ValueError):
+            return PromptBuilder.DEFAULT_CONTEXT_TOKEN_BUDGET
+
+    def _is_batch_mode(self):
+        """当前预设是否启用整页批量翻译"""
+        return bool(SettingsManager().get_current_preset().get('batch_mode', False))
+
+    def _call_handler(self, system_prompt, user_prompt, preset, schema=None, on_partial=None):
+        """根据预设类型选择处理器"""
+        system_tokens, user_tokens = PromptBuilder.record(system_prompt, user_prompt)
+        print(f"Prompt tokens (estimated): system={system_tokens}, user={user_tokens}")
+
+        if preset.get('hedging', False):
+            return self._call_hedged(system_prompt, user_prompt, preset, schema, on_partial)
+        return self._call_preset(system_prompt, user_prompt, preset, schema, on_partial)
+
+    def _call_hedged(self, system_prompt, user_prompt, preset, schema=None, on_partial=None):
+        """对冲调用：主请求超过观测到的 p95 时向 hedge_preset（未设置时为同一预设）再发一份
+
+        两份请求都以流式发出，以便取消落败的一方；部分译文只显示先开始输出的一方。
+        """
+        settings_manager = SettingsManager()
+        secondary = preset
+        if preset.get('hedge_preset'):
+            secondary = settings_manager.get_preset(preset['hedge_preset'])
+
+        leader = []
+        leader_lock = threading.Lock()
+
+        def leg(leg_preset, name):
+            leg_preset = dict(leg_preset, stream=True)
+            if on_partial:
+                def leg_partial(partial):
+                    with leader_lock:
+                        if not leader:
+                            leader.append(name)
+                    if leader[0] == name:
+                        on_partial(partial)
+            else:
+                leg_partial = None
+            return lambda token: self._call_preset(
+                system_prompt, user_prompt, leg_preset, schema, leg_partial, token
+            )
+
+        return Hedger.get_instance().call(
+            preset.get('name', ''), leg(preset, 'primary'), leg(secondary, 'secondary'),
+            secondary_key=secondary.get('name', ''),
+            percentile=preset.get('hedge_percentile', Hedger.DEFAULT_PERCENTILE),
+            min_delay=preset.get('hedge_min_delay', Hedger.DEFAULT_MIN_DELAY)
+        )
+
+    def _call_preset(self, system_prompt, user_prompt, preset, schema=None, on_partial=None, cancel_token=None):
+        """调用单个预设；负载均衡池预设先选出端点，再按端点自身的类型调用"""
+        if preset['type'] == 'Pool':
+            balancer = LoadBalancer.for_preset(preset, SettingsManager().presets)
+            return balancer.call(
+                lambda endpoint_preset: self._dispatch_handler(
+                    system_prompt, user_prompt, endpoint_preset, schema, on_partial, cancel_token
+                )
+            )
+        return self._dispatch_handler(system_prompt, user_prompt, preset, schema, on_partial, cancel_token)
+
+    def _dispatch_handler(self, system_prompt, user_prompt, preset, schema=None, on_partial=None, cancel_token=None):
+        """按单个端点的类型调用 Ollama 或 OpenAI 兼容接口
+
+        请求经过端点熔断器，连接失败、超时、429/5xx 按预设的 max_retries 退避重试
+        （429 优先遵循 Retry-After）；预设配置了 rpm_limit / tpm_limit / adaptive_concurrency
+        时每次尝试都经过限流器，限流等待同样受页面时限和取消标记约束。
+        """
+        if RateLimiter.enabled(preset):
+            limiter = RateLimiter.for_preset(preset)
+            cost = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+
+            def attempt():
+                with limiter.limit(cost, self.deadline, cancel_token):
+                    return self._invoke_handler(system_prompt, user_prompt, preset, schema, on_partial, cancel_token)
+        else:
+            def attempt():
+                return self._invoke_handler(system_prompt, user_prompt, preset, schema, on_partial, cancel_token)
+
+        return call_with_retry(preset['api_url'], attempt, RetryPolicy.from_options(preset), self.deadline)
+
+    def _invoke_handler(self, system_prompt, user_prompt, preset, schema=None, on_partial=None, cancel_token=None):
+        """调用处理器；被取消的请求统一抛出 RequestCancelled"""
+        try:
+            if preset['type'] == 'Ollama':
+                response = self._invoke_ollama(system_prompt, user_prompt, preset, schema, on_partial, cancel_token)
+                print("Ollama response:", response)
+            else:  # Remote API
+                response = self.openai_handler(system_prompt, user_prompt, preset, schema, on_partial, cancel_token)
+                print("OpenAI response:", response)
+        except RequestCancelled:
+            raise
+        except Exception:
+            # 被取消的请求因连接被关闭而抛出的异常不算作失败
+            if cancel_token is not None and cancel_token.cancelled:
+                raise RequestCancelled()
+            raise
+        return response
+
+    def _invoke_ollama(self, system_prompt, user_prompt, preset, schema=None, on_partial=None, cancel_token=None):
+        """调用 Ollama 并更新模型驻留状态（模型未加载时状态栏显示 warming）"""
+        residency = ModelResidency.get_instance()
+        residency.on_request(preset)
+        try:
+            response = self.ollama_handler(system_prompt, user_prompt, preset, schema, on_partial, cancel_token)
+        except Exception:
+            residency.on_response(preset, success=False)
+            raise
+        residency.on_response(preset)
+        return response
+
+    @staticmethod
+    def get_translation_memory(settings_manager=None):
+        """获取翻译记忆；在设置中关闭或初始化失败时返回 None"""
+        settings = (settings_manager or SettingsManager()).load_settings()
+        if not settings.get('translation_memory', True):
+            return None
+        try:
+            return TranslationMemory.get_instance(
+                max_entries=settings.get('translation_memory_max_entries', TranslationMemory.DEFAULT_MAX_ENTRIES)
+            )
+        except Exception as e:
+            print(f"翻译记忆不可用: {str(e)}")
+            return None
+
+    def get_fuzzy_memory(self, settings_manager=None):
+        """获取当前语言对的近似翻译记忆，首次使用时从翻译记忆中预热；关闭时返回 None"""
+        settings_manager = settings_manager or SettingsManager()
+        if not settings_manager.load_settings().get('fuzzy_memory', True):
+            return None
+        memory = self.get_translation_memory(settings_manager)
+        loader = None
+        if memory:
+            loader = lambda: memory.iter_entries(self.source_lang, self.target_lang)
+        return FuzzyMemory.get_instance(self.source_lang, self.target_lang, loader)
+
+    def _get_shared_context(self, query, preset):
+        """在当前会话中按与 query 的相关性挑选共享上下文"""
+        top_k = preset.get('context_top_k', ContextStore.DEFAULT_TOP_K)
+        context_store = self._context_sessions.get(self.session_id)
+        return context_store.select(query, self._get_context_budget(preset), top_k)
+
+    def _get_glossary_terms(self, text):
+        """取出文本中出现的术语及其固定译法，未配置术语表时返回空字典"""
+        try:
+            settings = SettingsManager().load_settings()
+            glossary = GlossaryManager.get_instance().for_session(self.session_id, settings)
+            if glossary is None:
+                return {}
+            return glossary.match(text, settings.get('glossary_max_terms', Glossary.DEFAULT_MAX_TERMS))
+        except Exception as e:
+            print(f"术语表匹配失败: {str(e)}")
+            return {}
+
+    def _add_shared_context(self, text, translated):
+        """把一条翻译结果加入共享上下文"""
+        # 只有成功翻译且内容不同时才添加到上下文
+        self._context_sessions.get(self.session_id).add(text, translated)
+
+    def ollama_handler(self, system_prompt, user_prompt, preset, schema=None, on_partial=None, cancel_token=None):
+        """Ollama API 处理器（预设 stream 为 True 时按 NDJSON 流式读取）"""
         url = preset['api_url']
         model = preset['model']
         
@@ -465,25 +1231,28 @@ class TranslationThread(QThread):
                 'num_predict': 2048
             },
             'stream': False,
-            'format': {
-                'type': 'object',
-                'properties': {
-                    'translation': {'type': 'string'},
-                    'original': {'type': 'string'},
-                    'remarks': {'type': 'string'},
-                    'src_lang': {'type': 'string'},
-                    'tgt_lang': {'type': 'string'}
-                },
-                'required': ['translation', 'original', 'src_lang', 'tgt_lang']
-            }
+            'format': schema or self.TRANSLATION_SCHEMA,
+            # 队列忙碌时模型常驻显存，空闲后按 keep_alive_idle 释放
+            'keep_alive': ModelResidency.get_instance().keep_alive(preset)
         }
+
+        if preset.get('stream', False):
+            data['stream'] = True
+            response = HttpClient.post(url, preset, json=data, stream=True, timeout=self._request_timeout(preset))
+            if cancel_token is not None:
+                cancel_token.bind(response)
+            response.raise_for_status()
+            return self._consume_stream(
+                self._iter_ollama_stream(response), on_partial, self._stops_after_translation(schema),
+                cancel_token, self.deadline
+            )
         
-        response = requests.post(url, json=data)
+        response = HttpClient.post(url, preset, json=data, timeout=self._request_timeout(preset))
         response.raise_for_status()
         return response.json()['message']['content']
 
-    def openai_handler(self, system_prompt, user_prompt, preset):
-        """OpenAI 兼容 API 处理器"""
+    def openai_handler(self, system_prompt, user_prompt, preset, schema=None, on_partial=None, cancel_token=None):
+        """OpenAI 兼容 API 处理器（预设 stream 为 True 时按 SSE 流式读取）"""
         url = preset['api_url']
         model = preset['model']
         bearer_token = preset['bearer_token']
@@ -493,6 +1262,7 @@ class TranslationThread(QThread):
         }
         if bearer_token:
             headers['Authorization'] = f'Bearer {bearer_token}'
+        schema = schema or self.TRANSLATION_SCHEMA
 
         data = {
             'model': model,
@@ -517,29 +1287,114 @@ class TranslationThread(QThread):
                 'type': 'json_schema',
                 "json_schema": {
                     "name": "translation_schema",
-                    "strict": True,
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "translation": {"type": "string"},
-                            "original": {"type": "string"},
-                            "remarks": {"type": "string"},
-                            "src_lang": {"type": "string"},
-                            "tgt_lang": {"type": "string"}
-                        },
-                        "required": ["translation", "original", "src_lang", "tgt_lang"],
-                        "additionalProperties": False
-                    }
+                    # 精简模式的 remarks 为可选字段，不满足 strict 模式的要求；其余结构保持 strict
+                    "strict": schema is not self.LEAN_TRANSLATION_SCHEMA,
+                    "schema": schema
                 }
             }
         }
 
-        response = requests.post(url, json=data, headers=headers)
+        if preset.get('stream', False):
+            data['stream'] = True
+            response = HttpClient.post(
+                url, preset, json=data, headers=headers, stream=True, timeout=self._request_timeout(preset)
+            )
+            if cancel_token is not None:
+                cancel_token.bind(response)
+            response.raise_for_status()
+            return self._consume_stream(
+                self._iter_openai_stream(response), on_partial, self._stops_after_translation(schema),
+                cancel_token, self.deadline
+            )
+
+        response = HttpClient.post(url, preset, json=data, headers=headers, timeout=self._request_timeout(preset))
         response.raise_for_status()
         return response.json()['choices'][0]['message']['content']
 
-    def replace_text(self, img, points, translated_text):
-        """替换图像中的文本"""
+    def _request_timeout(self, preset):
+        """预设的 (连接, 读取) 超时，限制在页面剩余时间内"""
+        options = HttpClient.resolve_options(preset)
+        return self.deadline.timeout(options['connect_timeout'], options['read_timeout'])
+
+    @staticmethod
+    def _iter_ollama_stream(response):
+        """逐行解析 Ollama 的 NDJSON 流，产出每段文本"""
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise Exception(chunk['error'])
+                yield chunk.get('message', {}).get('content', '')
+                if chunk.get('done'):
+                    break
+        finally:
+            response.close()
+
+    @staticmethod
+    def _iter_openai_stream(response):
+        """解析 OpenAI 兼容接口的 SSE 流，产出每段文本"""
+        try:
+            for line in response.iter_lines():
+                if not line or not line.startswith(b'data:'):
+                    continue
+                payload = line[len(b'data:'):].strip()
+                if payload == b'[DONE]':
+                    break
+                chunk = json.loads(payload)
+                choices = chunk.get('choices') or []
+                if choices:
+                    yield (choices[0].get('delta') or {}).get('content') or ''
+        finally:
+            response.close()
+
+    def _stops_after_translation(self, schema):
+        """单条翻译的输出以 translation 字段开头，该字段闭合后即可结束生成"""
+        schema = schema or self.TRANSLATION_SCHEMA
+        return next(iter(schema['properties']), None) == 'translation'
+
+    @staticmethod
+    def _consume_stream(chunks, on_partial=None, stop_on_complete=False, cancel_token=None, deadline=None):
+        """拼接流式输出，同时把 translation 字段的部分内容推送给 on_partial
+
+        stop_on_complete 为 True 时，translation 的值一闭合就停止读取并关闭连接，
+        让服务端停止生成剩余字段（返回的 JSON 因此可能不完整）。
+        cancel_token 被取消时关闭连接并抛出 RequestCancelled；超过 deadline 时关闭连接并抛出
+        DeadlineExceeded（读取超时只限制单次读取，持续慢速输出的流需要在这里截断）。
+        """
+        parser = StreamingFieldParser('translation')
+        parts = []
+        last_partial = ''
+        for chunk in chunks:
+            if cancel_token is not None and cancel_token.cancelled:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+                raise RequestCancelled()
+            if deadline is not None and deadline.expired():
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+                raise DeadlineExceeded(deadline.name)
+            if not chunk:
+                continue
+            parts.append(chunk)
+            partial = parser.feed(chunk)
+            if on_partial and partial != last_partial:
+                last_partial = partial
+                on_partial(partial)
+            if stop_on_complete and parser.complete:
+                # 关闭生成器会关闭底层连接，服务端随之取消生成
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+                break
+        return ''.join(parts)
+
+    def replace_text(self, img, rect, translated_text, polygon=None, bubble_mask=None):
+        """替换图像中的文本
+
+        rect 为 PageLayout.rects() 给出的 (x, y, w, h)，polygon 为需要填充白色背景的轮廓，默认为 rect；
+        bubble_mask 为 BubbleMap.crop() 给出的 rect 区域内的气泡掩码，给出时只擦除轮廓与气泡内部的交集
+        """
         try:
             # 获取文本方向设置
             settings_manager = SettingsManager()
@@ -548,12 +1403,8 @@ class TranslationThread(QThread):
             img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
             draw = ImageDraw.Draw(img_pil)
 
-            # 计算文本框的尺寸
-            x_coords = [points[i] for i in range(0, len(points), 2)]
-            y_coords = [points[i+1] for i in range(0, len(points), 2)]
-            x, y = min(x_coords), min(y_coords)
-            w = max(x_coords) - x
-            h = max(y_coords) - y
+            # 文本框的尺寸
+            x, y, w, h = rect
 
             # 根据文本方向调整文本框和渲染参数
             if text_direction == 'vertical':
@@ -665,7 +1516,14 @@ class TranslationThread(QThread):
                 best_columns = split_text(translated_text, selected_font, w)
 
             # 绘制白色背景
-            draw.polygon([(points[i], points[i+1]) for i in range(0, len(points), 2)], fill=(255, 255, 255))
+            if polygon is None:
+                polygon = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+            if bubble_mask is not None and w > 0 and h > 0:
+                region = np.zeros((h, w), dtype=np.uint8)
+                cv2.fillPoly(region, [np.round(np.asarray(polygon) - (x, y)).astype(np.int32)], 255)
+                img_pil.paste((255, 255, 255), (x, y, x + w, y + h), Image.fromarray(region & bubble_mask))
+            else:
+                draw.polygon([tuple(point) for point in np.asarray(polygon).tolist()], fill=(255, 255, 255))
 
             # 计算文本位置并绘制
             if text_direction == 'vertical':
@@ -705,31 +1563,85 @@ class TranslationThread(QThread):
             return img
 
     @classmethod
-    def clear_context(cls):
-        """清除所有共享上下文"""
-        with cls._context_lock:
-            cls._shared_context.clear() 
+    def clear_context(cls, session_id=None):
+        """清除指定会话的共享上下文；不指定会话时清除所有上下文"""
+        cls._context_sessions.clear(session_id)
+
+    @classmethod
+    def cancel_pending_batches(cls):
+        """取消跨页面批处理器中尚未发出的文本框（如停止任务、清空队列时）"""
+        if cls._batcher is not None:
+            cls._batcher.cancel_all()
 
     def run_sync(self):
         """同步运行翻译（用于 Streamlit）"""
+        self.deadline = Deadline.for_source(self.session_id, SettingsManager().load_settings())
         img = cv2.imread(self.image) if isinstance(self.image, str) else self.image
-        img = preprocess_image(img)
+        with self.deadline.stage('preprocess'):
+            img = preprocess_image(img)
 
-        result = ocr_through_UmiOCR(img, self.source_lang)
+        with self.deadline.stage('ocr') as ocr_deadline:
+            result = ocr_through_UmiOCR(img, self.source_lang, ocr_deadline)
         if result['code'] != 100:
             raise Exception("OCR failed: " + str(result))
 
-        result = self.merge_ocr_results(result)
+        with self.deadline.stage('segment'):
+            bubbles = self._segment_bubbles(img)
+        with self.deadline.stage('merge'):
+            layout = self.merge_ocr_results(result, bubbles)
+        with self.deadline.stage('panels'):
+            layout, chains = self._reading_order(img, layout)
+        self.target_langs = self._get_target_langs()
         context = ''
         translation_dict = {}
-        total_boxes = len(result['data'])
+        total_boxes = len(layout)
+        texts = [text.strip() for text in layout.texts]
+        rects = layout.rects().tolist()
+        polygons = layout.polygons()
+        # 位于气泡内的文本框只擦除气泡内部，不覆盖气泡轮廓和画面
+        masks = [
+            bubbles.crop(bubble_id, rect) if bubbles is not None and bubble_id else None
+            for rect, bubble_id in zip(rects, layout.bubbles.tolist())
+        ]
         
-        for line in result['data']:
-            translation_dict[line['text']] = ''
+        for text in layout.texts:
+            translation_dict[text] = ''
+
+        # 多目标语言：一次翻译得到所有语言，再为每种语言分别渲染
+        if len(self.target_langs) > 1:
+            self.translate_concurrently(
+                texts, context, callback=lambda i, text, translated: self.progress.emit(i + 1, text, translated),
+                translate_func=self._translate_multi_text, chains=chains
+            )
+            self.rendered_images = {}
+            for lang in self.target_langs:
+                rendered = img.copy()
+                for rect, polygon, mask, text in zip(rects, polygons, masks, texts):
+                    translated = self.multi_translations.get(text, {}).get(lang, text)
+                    rendered = self.replace_text(rendered, rect, translated, polygon, mask)
+                self.rendered_images[lang] = rendered
+            return self.rendered_images[self.target_lang]
+
+        # 批量模式：先整页翻译，再逐个渲染
+        if self._is_batch_mode():
+            translated_list = self.translate_batch(texts, context)
+            for i, (rect, polygon, mask, text, translated) in enumerate(
+                    zip(rects, polygons, masks, texts, translated_list), 1):
+                img = self.replace_text(img, rect, translated, polygon, mask)
+                self.progress.emit(i, text, translated)  # 发送进度信号
+            return img
+
+        # 并发模式：先并发翻译，再按顺序渲染
+        if self._get_max_concurrency() > 1:
+            translated_list = self.translate_concurrently(
+                texts, context, callback=lambda i, text, translated: self.progress.emit(i + 1, text, translated),
+                chains=chains
+            )
+            for rect, polygon, mask, translated in zip(rects, polygons, masks, translated_list):
+                img = self.replace_text(img, rect, translated, polygon, mask)
+            return img
 
-        for i, line in enumerate(result['data'], 1):
-            text = line['text'].strip()
-            points = line['box']
+        for i, (rect, polygon, mask, text) in enumerate(zip(rects, polygons, masks, texts), 1):
             translated = self.translate_text(text, context)
             translation_dict[text] = translated
             
@@ -740,7 +1652,7 @@ class TranslationThread(QThread):
                 else:
                     context += f"{key}\n"
                     
-            img = self.replace_text(img, points, translated)
+            img = self.replace_text(img, rect, translated, polygon, mask)
             self.progress.emit(i, text, translated)  # 发送进度信号
 
         return img 
\ No newline at end of file
@@ -0,0 +1,211 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+class TranslationMemory:
+    """持久化翻译记忆（SQLite），按 (规范化原文, 源语言, 目标语言, 模型) 缓存译文
+
+    - 超过 max_entries 条时按最近使用时间淘汰（LRU）
+    - 相同键的并发查询会合并，只有一个请求真正发往 LLM
+    - 记录命中/未命中次数，便于统计每章节省的 LLM 调用
+    """
+
+    DEFAULT_DB_PATH = '~/.config/manga_translator/translation_memory.db'
+    DEFAULT_MAX_ENTRIES = 50000
+    EVICT_RATIO = 0.1  # 超出容量时一次淘汰的比例，避免每次写入都触发清理
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = os.path.expanduser(db_path or self.DEFAULT_DB_PATH)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()  # 保护数据库连接和计数器
+        self._inflight = {}  # 正在请求中的键 -> _InflightRequest
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS memory (
+                source_text TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source_text, source_lang, target_lang, model)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_memory_last_used ON memory (last_used)')
+        self._conn.commit()
+        # 条目数只在启动时统计一次，之后随写入和淘汰更新，写入时不必扫描整张表
+        self._count = self._conn.execute('SELECT COUNT(*) FROM memory').fetchone()[0]
+
+    @classmethod
+    def get_instance(cls, db_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """获取进程内共享的翻译记忆实例"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(db_path, max_entries)
+            else:
+                cls._instance.max_entries = max_entries
+            return cls._instance
+
+    @staticmethod
+    def normalize(text):
+        """规范化原文：统一全半角、去除首尾空白并合并连续空白"""
+        text = unicodedata.normalize('NFKC', text or '')
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def make_key(self, text, source_lang, target_lang, model):
+        """生成缓存键"""
+        return (self.normalize(text), source_lang or '', target_lang or '', model or '')
+
+    def get(self, key):
+        """查询译文，命中时刷新最近使用时间；未命中返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT translation FROM memory WHERE source_text=? AND source_lang=? '
+                'AND target_lang=? AND model=?', key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                'UPDATE memory SET last_used=? WHERE source_text=? AND source_lang=? '
+                'AND target_lang=? AND model=?', (time.time(),) + key
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, translation):
+        """写入译文，必要时按 LRU 淘汰旧条目"""
+        if not key[0] or not translation:
+            return
+        with self._lock:
+            now = time.time()
+            updated = self._conn.execute(
+                'UPDATE memory SET translation=?, last_used=? WHERE source_text=? AND source_lang=? '
+                'AND target_lang=? AND model=?', (translation, now) + key
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    'INSERT INTO memory '
+                    '(source_text, source_lang, target_lang, model, translation, last_used) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', key + (translation, now)
+                )
+                self._count += 1
+            if self._count > self.max_entries:
+                evict = self._count - self.max_entries + int(self.max_entries * self.EVICT_RATIO)
+                self._count -= self._conn.execute(
+                    'DELETE FROM memory WHERE rowid IN '
+                    '(SELECT rowid FROM memory ORDER BY last_used ASC LIMIT ?)', (evict,)
+                ).rowcount
+            self._conn.commit()
+
+    def get_or_translate(self, text, source_lang, target_lang, model, translate_func):
+        """先查翻译记忆，未命中时调用 translate_func() 并写回
+
+        同一个键同时只会有一个 translate_func 在执行，其余调用等待并共享结果。
+        translate_func 抛出的异常会传递给所有等待者，且结果不会被缓存。
+        """
+        key = self.make_key(text, source_lang, target_lang, model)
+        if not key[0]:
+            return translate_func()
+
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            request = self._inflight.get(key)
+            owner = request is None
+            if owner:
+                request = _InflightRequest()
+                self._inflight[key] = request
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return request.wait()
+
+        try:
+            translation = translate_func()
+            # 与原文相同的结果通常意味着翻译失败，不写入记忆
+            if translation and self.normalize(translation) != key[0]:
+                self.put(key, translation)
+            request.set_result(translation)
+            return translation
+        except Exception as e:
+            request.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def iter_entries(self, source_lang, target_lang):
+        """按最近使用顺序产出某语言对的 (原文, 译文)，用于预热近似翻译记忆"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT source_text, translation FROM memory WHERE source_lang=? AND target_lang=? '
+                'ORDER BY last_used ASC', (source_lang or '', target_lang or '')
+            ).fetchall()
+        return iter(rows)
+
+    def stats(self):
+        """返回命中统计"""
+        with self._lock:
+            entries = self._count
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': entries
+            }
+
+    def reset_stats(self):
+        """重置命中计数（例如开始新的章节时）"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+
+    def clear(self):
+        """清空翻译记忆"""
+        with self._lock:
+            self._conn.execute('DELETE FROM memory')
+            self._conn.commit()
+            self._count = 0
+
+
+class _InflightRequest:
+    """正在进行中的翻译请求，供合并的调用者等待结果"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def set_result(self, result):
+        self._result = result
+        self._event.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._event.set()
+
+    def wait(self):
+        self._event.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
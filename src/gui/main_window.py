@@ -14,18 +14,23 @@ from src.gui.preset_dialog import PresetDialog
 from src.i18n.language_manager import LanguageManager
 from PyQt5.QtCore import QLocale
 from src.core.web_scraper import WebScraper
+from src.core.context_store import session_id_from_url
+from src.core.resilience import CircuitBreaker
+from src.core.model_residency import ModelResidency
+import os
 import time
 
 # 修改CrawlerWorkerThread类
 class CrawlerWorkerThread(QThread):
     progress = pyqtSignal(int, int)  # current, total
     status = pyqtSignal(str, dict)   # status, data
-    image_ready = pyqtSignal(object, str)  # image, description
+    image_ready = pyqtSignal(object, str, str)  # image, description, session_id
     error = pyqtSignal(str)          # error message
     
     def __init__(self, url):
         super().__init__()
         self.url = url
+        self.session_id = session_id_from_url(url, 'crawler')  # 同一章节的图片共享上下文会话
         self.is_running = True
     
     def run(self):
@@ -40,7 +45,7 @@ class CrawlerWorkerThread(QThread):
             
             def image_callback(image, description):
                 if self.is_running:
-                    self.image_ready.emit(image, description)
+                    self.image_ready.emit(image, description, self.session_id)
             
             WebScraper.get_images_from_webpage(
                 self.url,
@@ -57,6 +62,10 @@ class CrawlerWorkerThread(QThread):
         self.is_running = False
 
 class MangaTranslator(QMainWindow):
+    CLIPBOARD_SESSION = 'clipboard'  # 剪贴板图片共用的上下文会话
+    MAX_PARK_ATTEMPTS = 3  # 同一页面最多暂存的次数，之后后端仍不可用的文本框显示原文
+    model_state_changed = pyqtSignal(str, str)  # 模型、驻留状态（从后台线程转到界面线程）
+
     def __init__(self):
         super().__init__()
         self.settings_manager = SettingsManager()
@@ -112,13 +121,18 @@ class MangaTranslator(QMainWindow):
         self.setup_image_server()
         self.processing_count = 0
         self.processed_hashes = set()
+        self.setup_model_residency()
         self.crawler_status_list = []
         self.max_status_records = 100  # 最大记录数量
         self.crawler_worker = None
 
     def setup_processing_queue(self):
-        self.worker = None
+        self.worker = None  # 最近启动的翻译线程
+        self.active_workers = []  # 正在处理的翻译线程（多页并行时不止一个）
         self.queue = []
+        # 后端不可用时暂存的页面 (img, session_id, 结果窗口中的页面索引, 已暂存次数)，恢复后放回队首并沿用原来的页面
+        self.parked_pages = []
+        self.resume_scheduled = False
         self.queue_mutex = QMutex()
         self.queue_condition = QWaitCondition()
         self.processing_thread = QThread()
@@ -126,6 +140,30 @@ class MangaTranslator(QMainWindow):
         self.processing_thread.start()
         self.last_image_data = None
 
+    def setup_model_residency(self):
+        """监听模型驻留状态，并预热当前预设的模型"""
+        self.model_state_changed.connect(self.show_model_state)
+        ModelResidency.get_instance().add_listener(self.model_state_changed.emit)
+        self.warm_up_models()
+
+    def warm_up_models(self):
+        """预热当前预设用到的 Ollama 模型"""
+        try:
+            ModelResidency.get_instance().warm_up(
+                self.settings_manager.get_current_preset(), self.settings_manager.presets
+            )
+        except Exception as e:
+            print(f"模型预热失败: {str(e)}")
+
+    def show_model_state(self, model, state):
+        """在状态栏显示模型加载状态，避免首次加载时看起来像卡住"""
+        if state == 'warming':
+            self.status_label.setText(self.lang_manager.get_text('model_warming').format(model=model))
+        elif state == 'error':
+            self.status_label.setText(self.lang_manager.get_text('model_load_failed').format(model=model))
+        elif state == 'loaded':
+            self.update_status()
+
     def setup_clipboard_monitoring(self):
         self.clipboard = QApplication.clipboard()
         self.clipboard.dataChanged.connect(self.on_clipboard_change)
@@ -425,16 +463,21 @@ class MangaTranslator(QMainWindow):
             'Image files (*.jpg *.jpeg *.png *.bmp)')
         if path:
             img = cv2.imread(path)
-            self.add_to_queue(img)
+            # 同一目录下的图片视为同一部漫画
+            self.add_to_queue(img, 'file:' + os.path.dirname(os.path.abspath(path)))
 
     def paste_image(self):
         clipboard = QApplication.clipboard()
         img = clipboard.image()
         if not img.isNull():
-            self.add_to_queue(qimage_to_cv(img))
+            self.add_to_queue(qimage_to_cv(img), self.CLIPBOARD_SESSION)
 
-    def add_to_queue(self, img):
-        """添加图片到处理队列"""
+    def add_to_queue(self, img, session_id=None):
+        """添加图片到处理队列
+
+        session_id 标识图片来源（爬虫章节、扩展页面来源、剪贴板等），
+        同一会话的图片共享翻译上下文
+        """
         # 计算图片哈希值以避免重复处理
         img_data = cv2.imencode('.png', img)[1].tobytes()
         img_hash = hash(img_data)
@@ -454,7 +497,7 @@ class MangaTranslator(QMainWindow):
 
             # 添加到队列
             self.queue_mutex.lock()
-            self.queue.append(img)
+            self.queue.append((img, session_id, None, 0))
             self.queue_mutex.unlock()
             self.queue_condition.wakeOne()
             
@@ -463,13 +506,21 @@ class MangaTranslator(QMainWindow):
             self.update_status()
 
     def process_queue(self):
-        """处理队列中的图片"""
+        """处理队列中的图片
+
+        预设 max_pages_in_flight > 1 时同时处理多页，配合跨页面批处理把多页的文本框合并请求；
+        各页的初始结果仍按入队顺序显示。
+        """
         while True:
+            img = None
             self.queue_mutex.lock()
             if not self.queue:
+                # 队列空闲：模型驻留时间改回 keep_alive_idle
+                ModelResidency.get_instance().set_busy(False)
                 self.queue_condition.wait(self.queue_mutex)
             if self.queue:
-                img = self.queue.pop(0)
+                ModelResidency.get_instance().set_busy(True)
+                img, session_id, image_index, parks = self.queue.pop(0)
                 self.last_image_data = img
             self.queue_mutex.unlock()
 
@@ -480,21 +531,93 @@ class MangaTranslator(QMainWindow):
                     source_lang = settings.get('source_lang', 'Japanese')
                     target_lang = settings.get('target_lang', 'Simplified Chinese')
 
+                    # 等待空闲的页面槽位
+                    max_pages = self.get_max_pages_in_flight()
+                    while True:
+                        self.active_workers = [w for w in self.active_workers if not w.isFinished()]
+                        if len(self.active_workers) < max_pages:
+                            break
+                        self.active_workers[0].wait(100)
+
                     # 创建并启动翻译线程
-                    self.worker = TranslationThread(img, source_lang, target_lang)
-                    self.worker.finished.connect(self.show_initial_result)
-                    self.worker.progress.connect(self.update_translation)
-                    self.worker.error.connect(self.show_error)
-                    self.worker.start()
-
-                    # 等待线程完成
-                    self.worker.wait()
-                    self.worker = None
+                    worker = TranslationThread(
+                        img, source_lang, target_lang, session_id=session_id,
+                        previous_emitted=self.worker.initial_emitted if self.worker is not None else None,
+                        allow_park=parks < self.MAX_PARK_ATTEMPTS
+                    )
+                    worker.parks = parks
+                    worker.finished.connect(self.show_initial_result)
+                    worker.progress.connect(self.update_translation)
+                    worker.partial.connect(self.update_partial_translation)
+                    worker.error.connect(self.show_error)
+                    worker.parked.connect(self.handle_page_parked)
+                    if image_index is not None:
+                        # 暂存后恢复的页面已经在结果窗口中，翻译进度发送到原来的页面
+                        worker.image_index = image_index
+                    self.worker = worker
+                    self.active_workers.append(worker)
+                    worker.start()
+
+                    if max_pages <= 1:
+                        # 逐页处理：等待线程完成
+                        worker.wait()
+                        self.active_workers.clear()
+                        self.worker = None
                     
                 except Exception as e:
                     self.status_label.setText(f"处理错误: {str(e)}")
                     self.worker = None
 
+    def get_max_pages_in_flight(self):
+        """当前预设允许同时处理的页面数"""
+        try:
+            return max(1, int(self.settings_manager.get_current_preset().get('max_pages_in_flight', 1)))
+        except (TypeError, ValueError):
+            return 1
+
+    def handle_page_parked(self, endpoint):
+        """后端熔断时暂存页面，待熔断器允许探测后重新入队，不丢弃已提交的页面"""
+        worker = self.sender()
+        self.queue_mutex.lock()
+        self.parked_pages.append(
+            (worker.image, worker.session_id, getattr(worker, 'image_index', None), getattr(worker, 'parks', 0) + 1)
+        )
+        count = len(self.parked_pages)
+        schedule = not self.resume_scheduled
+        self.resume_scheduled = True
+        self.queue_mutex.unlock()
+
+        self.status_label.setText(
+            self.lang_manager.get_text('backend_parked').format(endpoint=endpoint, count=count)
+        )
+        if schedule:
+            threading.Thread(target=self.resume_parked_pages, args=(endpoint,), daemon=True).start()
+
+    def resume_parked_pages(self, endpoint):
+        """等待熔断器进入可探测状态后，把暂存的页面按原顺序放回队首"""
+        time.sleep(max(CircuitBreaker.for_url(endpoint).retry_in(), 1.0))
+        self.queue_mutex.lock()
+        self.queue[0:0] = self.parked_pages
+        count = len(self.parked_pages)
+        self.parked_pages = []
+        self.resume_scheduled = False
+        self.queue_mutex.unlock()
+        if count:
+            print(f"恢复处理 {count} 个暂存页面")
+            self.queue_condition.wakeAll()
+
+    def stop_workers(self):
+        """终止所有正在处理的翻译线程，并取消尚未发出的跨页面批次"""
+        TranslationThread.cancel_pending_batches()
+        workers = list(self.active_workers)
+        if self.worker and self.worker not in workers:
+            workers.append(self.worker)
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+        self.active_workers = []
+        self.worker = None
+
     def show_result(self, img, translations):
         """显示翻译结果"""
         height, width, channel = img.shape
@@ -523,19 +646,17 @@ class MangaTranslator(QMainWindow):
         if mime.hasImage():
             img = qimage_to_cv(mime.imageData())
             if img is not None:
-                self.add_to_queue(img)
+                self.add_to_queue(img, self.CLIPBOARD_SESSION)
 
     def clear_results(self):
         """清除队列、结果窗口中的所有图片，并停止当前任务"""
         # 停止当前任务
-        if self.worker:
-            self.worker.terminate()
-            self.worker.wait()
-            self.worker = None
+        self.stop_workers()
 
         # 清除队列
         self.queue_mutex.lock()
         self.queue.clear()
+        self.parked_pages = []
         self.last_image_data = None
         self.queue_mutex.unlock()
         
@@ -547,6 +668,11 @@ class MangaTranslator(QMainWindow):
         
         # 清除翻译上下文
         TranslationThread.clear_context()
+
+        # 重置翻译记忆的命中统计（记忆本身保留）
+        memory = TranslationThread.get_translation_memory()
+        if memory:
+            memory.reset_stats()
         
         # 重置进度
         self.processing_count = 0
@@ -587,13 +713,11 @@ class MangaTranslator(QMainWindow):
         # 清空队列
         self.queue_mutex.lock()
         self.queue.clear()
+        self.parked_pages = []
         self.queue_mutex.unlock()
 
         # 如果有正在运行的任务，终止它
-        if self.worker:
-            self.worker.terminate()
-            self.worker.wait()
-            self.worker = None
+        self.stop_workers()
 
         # 重置进度
         self.processing_count = 0
@@ -617,12 +741,11 @@ class MangaTranslator(QMainWindow):
         # 清空任务队列
         if hasattr(self, 'queue'):
             self.queue.clear()
+            self.parked_pages = []
         
         # 停止当前正在进行的任务
-        if hasattr(self, 'worker') and self.worker:
-            self.worker.terminate()
-            self.worker.wait()
-            self.worker = None
+        if hasattr(self, 'worker'):
+            self.stop_workers()
         
         # 重置进度
         self.processing_count = 0
@@ -653,6 +776,7 @@ class MangaTranslator(QMainWindow):
         if preset_name:
             self.settings['current_preset'] = preset_name
             self.settings_manager.save_settings(self.settings)
+            self.warm_up_models()
 
     def add_preset(self):
         """添加新预设"""
@@ -857,26 +981,49 @@ class MangaTranslator(QMainWindow):
         
         # 添加图片和文本区域
         text_regions = [(rect, text) for rect, text, _ in translations]
+        worker = self.sender()
+        image_index = getattr(worker, 'image_index', None)
+        if image_index is not None:
+            # 暂存后恢复的页面：更新原来的页面，不重复添加
+            self.result_window.set_text_regions(image_index, text_regions)
+            self.current_image_index = image_index
+            return
         self.current_image_index = self.result_window.add_image(QPixmap.fromImage(q_img), text_regions)
+        # 记录发送方对应的页面，多页并行时按页面路由后续的翻译进度
+        if worker is not None:
+            worker.image_index = self.current_image_index
 
     def update_translation(self, index, original_text, translated_text):
         """更新单个文本的翻译结果"""
         try:
-            # 将新的翻译添加到结果窗口
+            # 将新的翻译添加到结果窗口（发送方所在的页面）
+            worker = self.sender()
+            image_index = getattr(worker, 'image_index', self.current_image_index)
             translations = {original_text: translated_text}
-            self.result_window.update_translations(self.current_image_index, translations)
+            self.result_window.update_translations(image_index, translations)
             
             # 更新状态
-            if hasattr(self.worker, 'total_boxes'):
+            if hasattr(worker, 'total_boxes'):
                 self.status_label.setText(
                     self.lang_manager.get_text('translating_progress').format(
                         current=index + 1,
-                        total=self.worker.total_boxes
+                        total=worker.total_boxes
                     )
                 )
         except Exception as e:
             print(f"更新翻译出错: {str(e)}")
 
+    def update_partial_translation(self, index, original_text, partial_text):
+        """流式翻译过程中更新单个文本的部分译文"""
+        try:
+            if self.result_window is not None:
+                image_index = getattr(self.sender(), 'image_index', self.current_image_index)
+                self.result_window.update_translations(
+                    image_index, {original_text: partial_text}, partial=True
+                )
+        except Exception as e:
+            print(f"更新部分译文出错: {str(e)}")
+
     def show_error(self, error_message):
         """显示翻译错误"""
         self.status_label.setText(
@@ -949,10 +1096,10 @@ class MangaTranslator(QMainWindow):
             self.status_label.setText(status_text)
             self.add_crawler_status(status_text)
     
-    def handle_crawler_image(self, image, description):
+    def handle_crawler_image(self, image, description, session_id):
         """处理爬虫获取到的单张图片"""
         self.add_crawler_status(f"获取到图片: {description}")
-        self.add_to_queue(image)
+        self.add_to_queue(image, session_id)
 
     def handle_crawler_error(self, error):
         """处理爬虫错误"""
@@ -23,7 +23,8 @@ class PresetDialog(QDialog):
 
         # API类型
         self.type_combo = QComboBox()
-        self.type_combo.addItems(['Ollama', 'Remote API'])
+        # Pool: 多端点负载均衡，端点列表（endpoints）在 presets.json 中配置
+        self.type_combo.addItems(['Ollama', 'Remote API', 'Pool'])
         if self.preset_data:
             self.type_combo.setCurrentText(self.preset_data.get('type', 'Ollama'))
         form.addRow(self.lang_manager.get_text('api_type') + ":", self.type_combo)
@@ -63,10 +64,13 @@ class PresetDialog(QDialog):
 
     def get_preset_data(self):
         """获取预设数据"""
-        return {
+        # 保留对话框中未展示的高级选项（如 batch_mode）
+        preset_data = dict(self.preset_data) if self.preset_data else {}
+        preset_data.update({
             'name': self.name_input.text(),
             'type': self.type_combo.currentText(),
             'api_url': self.api_input.text(),
             'model': self.model_input.text(),
             'bearer_token': self.token_input.text()
-        } 
\ No newline at end of file
+        })
+        return preset_data 
\ No newline at end of file
@@ -218,12 +218,46 @@ class ResultWindowWebview(QMainWindow):
             ]
             self._update_webpage()
 
-    def update_translations(self, image_index, translations):
-        """更新翻译结果"""
+    def update_translations(self, image_index, translations, partial=False):
+        """更新翻译结果
+
+        partial 为 True 时表示流式翻译中的部分译文，只修改对应文本区域的 DOM，
+        不重新生成整个页面
+        """
         if 0 <= image_index < len(self.current_images):
             # 合并新的翻译结果到现有的翻译字典中
             self.current_images[image_index]['translations'].update(translations)
-            self._update_webpage()
+            if partial:
+                self._patch_translations(image_index, translations)
+            else:
+                self._update_webpage()
+
+    def _patch_translations(self, image_index, translations):
+        """只更新指定文本区域显示的译文"""
+        regions = self.current_images[image_index]['regions']
+        updates = [
+            [region_index, translations[region['text']]]
+            for region_index, region in enumerate(regions)
+            if region['text'] in translations
+        ]
+        if not updates:
+            return
+
+        # 使用 JSON 传递文本，避免 JavaScript 注入
+        script = f'''
+            (function() {{
+                const container = document.querySelectorAll('.image-container')[{image_index}];
+                if (!container) return;
+                const regions = container.querySelectorAll('.text-region');
+                {json.dumps(updates, ensure_ascii=False)}.forEach(([index, text]) => {{
+                    const region = regions[index];
+                    if (!region) return;
+                    region.dataset.translation = text;
+                    region.querySelector('.translated-text').textContent = text;
+                }});
+            }})();
+        '''
+        self.web_view.page().runJavaScript(script)
 
     def _pixmap_to_base64(self, pixmap):
         """将QPixmap转换为base64字符串"""
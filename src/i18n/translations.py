@@ -59,6 +59,9 @@ TRANSLATIONS = {
         'processing_image': '正在处理第 {current}/{total} 张图片',
         'found_image_url': '找到图片URL: {url}',
         'crawling_finished': '爬取完成，共获取 {total} 张图片',
+        'backend_parked': '{endpoint} 暂时不可用，已暂存 {count} 页，恢复后自动继续',
+        'model_warming': '正在加载模型 {model}，首个文本框会稍慢…',
+        'model_load_failed': '模型 {model} 加载失败',
     },
     'zh_TW': {
         'window_title': 'Manga Translator',
@@ -117,6 +120,9 @@ TRANSLATIONS = {
         'image_error': '處理第 {index} 張圖片失敗: {error}',
         'browser_error': '瀏覽器操作失敗: {error}',
         'crawling_finished': '爬取完成，共獲取 {total} 張圖片',
+        'backend_parked': '{endpoint} 暫時無法使用，已暫存 {count} 頁，恢復後自動繼續',
+        'model_warming': '正在載入模型 {model}，第一個文字框會稍慢…',
+        'model_load_failed': '模型 {model} 載入失敗',
     },
     'ko_KR': {
         'window_title': '만화 번역기',
@@ -175,6 +181,9 @@ TRANSLATIONS = {
         'image_error': '이미지 {index} 처리 실패: {error}',
         'browser_error': '브라우저 작업 실패: {error}',
         'crawling_finished': '크롤링 완료, {total}개의 이미지를 가져왔습니다',
+        'backend_parked': '{endpoint}을(를) 일시적으로 사용할 수 없습니다. {count}페이지를 보류했으며 복구되면 자동으로 계속합니다',
+        'model_warming': '모델 {model} 로딩 중, 첫 번째 텍스트 상자는 조금 느릴 수 있습니다…',
+        'model_load_failed': '모델 {model} 로딩 실패',
     },
     'en_US': {
         'window_title': 'Manga Translator',
@@ -233,6 +242,9 @@ TRANSLATIONS = {
         'image_error': 'Failed to process image {index}: {error}',
         'browser_error': 'Browser operation failed: {error}',
         'crawling_finished': 'Crawling finished, {total} images retrieved',
+        'backend_parked': '{endpoint} is temporarily unavailable, {count} page(s) parked and will resume automatically',
+        'model_warming': 'Loading model {model}, the first text box will be slower…',
+        'model_load_failed': 'Failed to load model {model}',
     },
     'ja_JP': {
         'window_title': 'マンガ翻訳',
@@ -291,6 +303,9 @@ TRANSLATIONS = {
         'image_error': '画像 {index} の処理に失敗: {error}',
         'browser_error': 'ブラウザ操作に失敗: {error}',
         'crawling_finished': 'クローリング完了、{total}枚の画像を取得しました',
+        'backend_parked': '{endpoint} は一時的に利用できません。{count} ページを保留し、復旧後に自動で再開します',
+        'model_warming': 'モデル {model} を読み込み中、最初のテキストボックスは少し遅くなります…',
+        'model_load_failed': 'モデル {model} の読み込みに失敗しました',
     }
 }
 
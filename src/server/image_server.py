@@ -3,6 +3,7 @@ from flask_cors import CORS
 import base64
 import numpy as np
 import cv2
+from ..core.context_store import session_id_from_url
 
 class ImageServer:
     def __init__(self, manga_translator):
@@ -21,7 +22,9 @@ class ImageServer:
                 nparr = np.frombuffer(img_data, np.uint8)
                 img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
                 
-                self.manga_translator.add_to_queue(img)
+                # 按请求携带的会话 ID 或页面来源区分上下文会话
+                session_id = data.get('session') or session_id_from_url(data.get('page_url'), 'extension')
+                self.manga_translator.add_to_queue(img, session_id or 'extension')
                 
                 return {'status': 'success'}, 200
             except Exception as e:
@@ -5,6 +5,7 @@ import numpy as np
 from PIL import Image
 import io
 import base64
+import uuid
 from ..core.translation import TranslationThread
 from ..config.settings import SettingsManager
 
@@ -20,6 +21,12 @@ class WebMangaTranslator:
             st.session_state.processed_images = []
         if 'translation_context' not in st.session_state:
             st.session_state.translation_context = []
+        if 'language_images' not in st.session_state:
+            # 多目标语言模式下其他语言的渲染结果：目标语言 -> 图片列表
+            st.session_state.language_images = {}
+        if 'context_session' not in st.session_state:
+            # 每个浏览器会话使用独立的翻译上下文
+            st.session_state.context_session = f"streamlit:{uuid.uuid4().hex}"
 
     def run(self):
         """运行Web界面"""
@@ -127,7 +134,8 @@ class WebMangaTranslator:
                     worker = TranslationThread(
                         img,
                         self.settings['source_lang'],
-                        self.settings['target_lang']
+                        self.settings['target_lang'],
+                        session_id=st.session_state.context_session
                     )
 
                     # 更新进度的回调函数
@@ -144,6 +152,7 @@ class WebMangaTranslator:
                     worker.progress.connect(progress_callback)
                     result_img = worker.run_sync()
                     st.session_state.processed_images.append(result_img)
+                    self.store_language_images(worker)
                 
                 except Exception as e:
                     st.error(f'处理 {desc} 失败: {str(e)}')
@@ -153,6 +162,12 @@ class WebMangaTranslator:
         current_status.text(f"完成处理 {total_images} 张图片")
         st.success('所有图片处理完成！')
 
+    def store_language_images(self, worker):
+        """保存多目标语言模式下主语言以外的渲染结果"""
+        for lang, rendered in worker.rendered_images.items():
+            if lang != worker.target_lang:
+                st.session_state.language_images.setdefault(lang, []).append(rendered)
+
     def get_images_from_webpage(self, url):
         """使用 Selenium 从网页获取图片"""
         from selenium import webdriver
@@ -302,7 +317,8 @@ class WebMangaTranslator:
                                         worker = TranslationThread(
                                             img,
                                             self.settings['source_lang'],
-                                            self.settings['target_lang']
+                                            self.settings['target_lang'],
+                                            session_id=st.session_state.context_session
                                         )
                                         
                                         # 处理图片
@@ -312,6 +328,7 @@ class WebMangaTranslator:
                                         if 'processed_images' not in st.session_state:
                                             st.session_state.processed_images = []
                                         st.session_state.processed_images.append(result_img)
+                                        self.store_language_images(worker)
                                         
                                         # 更新进度条
                                         progress_bar.progress(i/total_found)
@@ -450,6 +467,13 @@ class WebMangaTranslator:
                             pil_img.save(img_buffer, format='PNG')
                             zip_file.writestr(f'translated_image_{i+1}.png', img_buffer.getvalue())
 
+                        # 多目标语言模式：其他语言的结果按语言分目录保存
+                        for lang, lang_images in st.session_state.language_images.items():
+                            for i, img in enumerate(lang_images):
+                                img_buffer = BytesIO()
+                                Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)).save(img_buffer, format='PNG')
+                                zip_file.writestr(f'{lang}/translated_image_{i+1}.png', img_buffer.getvalue())
+
                     # 提供ZIP下载
                     st.download_button(
                         label="保存ZIP",
@@ -461,7 +485,9 @@ class WebMangaTranslator:
         # 清除按钮
         if st.button("清除所有结果"):
             st.session_state.processed_images = []
+            st.session_state.language_images = {}
             st.session_state.translation_context = []
+            TranslationThread.clear_context(st.session_state.context_session)
             st.rerun() 
         
         time.sleep(3)